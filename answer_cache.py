@@ -0,0 +1,188 @@
+"""Persistent semantic cache of generated answers.
+
+Entries are keyed on the normalized query embedding, the response language and
+the fingerprint of the vector store they were generated from. A question whose
+embedding is close enough to a cached one, and that cites the same statutes
+and numbers, returns the stored answer and references without retrieval or an
+LLM call ("Section 302 IPC" and "Section 304 IPC" embed almost alike but must
+not share an answer). The cache is bounded in size
+(least-recently-used entries are evicted first), entries expire after a TTL,
+and everything generated against an older index is dropped automatically once
+the vector store is rebuilt.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from utils import CACHE_DIR, CHROMA_DIR, get_index_fingerprint
+
+ANSWER_CACHE_PATH = os.path.join(CACHE_DIR, "answer_cache.sqlite3")
+
+
+def normalize_question(question):
+    """Lower-case a question and collapse whitespace and trailing punctuation"""
+    question = re.sub(r"\s+", " ", question.strip().lower())
+    return question.rstrip(" ?.!")
+
+
+def citation_key(question):
+    """Return the statute references and numbers a question cites, which a cached answer must match"""
+    # Imported here: statutes pulls in langchain_core, and coalescing imports this module at app start
+    from statutes import find_statute_references
+
+    references, _ = find_statute_references(question)
+    # int() reads Devanagari and Bengali digits as well
+    numbers = sorted({int(number) for number in re.findall(r"\d+", question)})
+    return json.dumps({"references": sorted(references), "numbers": numbers})
+
+
+class SemanticAnswerCache:
+    """Size-bounded, TTL-limited answer cache with near-duplicate lookup"""
+
+    def __init__(self, embeddings, path=ANSWER_CACHE_PATH, max_entries=2000,
+                 ttl_seconds=7 * 24 * 3600, similarity_threshold=0.95,
+                 persist_directory=CHROMA_DIR):
+        self.embeddings = embeddings
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.persist_directory = persist_directory
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(answers)")}
+        if columns and "citation_key" not in columns:
+            # Entries written before the citation guard cannot be checked against it
+            self._conn.execute("DROP TABLE answers")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                question_key TEXT NOT NULL,
+                language TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                citation_key TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                references_json TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS answers_lookup ON answers (language, fingerprint)"
+        )
+        self._conn.commit()
+
+    def _embed(self, question):
+        """Return the unit-normalized float32 embedding of a question"""
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _purge(self, fingerprint, now):
+        """Drop entries from an older index or past their TTL"""
+        self._conn.execute(
+            "DELETE FROM answers WHERE fingerprint != ? OR created_at < ?",
+            (fingerprint, now - self.ttl_seconds),
+        )
+
+    def lookup(self, question, language="English"):
+        """Return {"answer", "references", "similarity"} for a cached near-duplicate, or None"""
+        now = time.time()
+        fingerprint = get_index_fingerprint(self.persist_directory)
+        question_key = hashlib.sha256(normalize_question(question).encode("utf-8")).hexdigest()
+
+        with self._lock:
+            self._purge(fingerprint, now)
+            row = self._conn.execute(
+                "SELECT id, answer, references_json FROM answers "
+                "WHERE question_key = ? AND language = ? AND fingerprint = ?",
+                (question_key, language, fingerprint),
+            ).fetchone()
+            similarity = 1.0
+
+            if row is None:
+                rows = self._conn.execute(
+                    "SELECT id, embedding FROM answers WHERE language = ? AND fingerprint = ? AND citation_key = ?",
+                    (language, fingerprint, citation_key(question)),
+                ).fetchall()
+                if rows:
+                    query_vector = self._embed(question)
+                    matrix = np.vstack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows])
+                    scores = matrix @ query_vector
+                    best = int(np.argmax(scores))
+                    if scores[best] >= self.similarity_threshold:
+                        similarity = float(scores[best])
+                        row = self._conn.execute(
+                            "SELECT id, answer, references_json FROM answers WHERE id = ?",
+                            (rows[best][0],),
+                        ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                self._conn.commit()
+                return None
+
+            self.hits += 1
+            self._conn.execute("UPDATE answers SET last_used_at = ? WHERE id = ?", (now, row[0]))
+            self._conn.commit()
+
+        return {
+            "answer": row[1],
+            "references": json.loads(row[2]),
+            "similarity": similarity,
+        }
+
+    def store(self, question, language, answer, references):
+        """Cache an answer, evicting least-recently-used entries beyond max_entries"""
+        now = time.time()
+        fingerprint = get_index_fingerprint(self.persist_directory)
+        question_key = hashlib.sha256(normalize_question(question).encode("utf-8")).hexdigest()
+        embedding = self._embed(question).tobytes()
+        citations = citation_key(question)
+
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM answers WHERE question_key = ? AND language = ?",
+                (question_key, language),
+            )
+            self._conn.execute(
+                "INSERT INTO answers (question_key, language, fingerprint, embedding, citation_key, answer, "
+                "references_json, created_at, last_used_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (question_key, language, fingerprint, embedding, citations, answer,
+                 json.dumps(references, ensure_ascii=False), now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM answers WHERE id NOT IN "
+                "(SELECT id FROM answers ORDER BY last_used_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def clear(self):
+        """Remove every cached answer"""
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+            self._conn.commit()
+
+    def stats(self):
+        """Return hit/miss counters and the current number of entries"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
@@ -0,0 +1,165 @@
+"""Async HTTP service exposing the RAG pipeline.
+
+The embedding model, vector store, retriever, answer cache and LLM client are
+created once at startup and shared by all requests. Newly published index
+versions are swapped in by a watcher thread without dropping requests in
+flight (see index_versions.py). Identical standalone questions asked at the
+same time share one answer computation (see coalescing.py). Retrieval and other
+blocking work run in worker threads so the event loop stays free, and LLM
+calls use the chat model's async API over one pooled client.
+
+Run with:
+    uvicorn api:app --host 0.0.0.0 --port 8000
+Set LLM_BACKEND=fake to serve deterministic offline answers for load tests,
+and TRACING=1 to log per-stage traces and export them at /metrics.
+"""
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional, Union
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+import tracing
+from answer_cache import SemanticAnswerCache
+from coalescing import AsyncSingleFlight, flight_key
+from index_versions import LiveIndex
+from retrievers import load_index
+from utils import (
+    LANGUAGES,
+    acreate_enhanced_rag_response,
+    astream_enhanced_rag_response,
+    get_llm,
+)
+
+# Shared resources, populated by the lifespan handler
+resources = {}
+
+
+@asynccontextmanager
+async def lifespan(app):
+    live_index = await asyncio.to_thread(LiveIndex, load_index)
+    resources["index"] = live_index.start()
+    resources["answer_cache"] = SemanticAnswerCache(live_index.resources["vector_store"].embeddings)
+    resources["llm"] = get_llm()
+    resources["single_flight"] = AsyncSingleFlight()
+    yield
+    await asyncio.to_thread(live_index.stop)
+    resources.clear()
+
+
+app = FastAPI(title="Indian Legal Assistant API", lifespan=lifespan)
+
+
+class ChatMessage(BaseModel):
+    role: Literal["user", "assistant"]
+    content: str
+
+
+class AskRequest(BaseModel):
+    question: str = Field(..., min_length=1)
+    language: str = "English"
+    # Preformatted history text, or messages to fit into the prompt's token budget
+    chat_history: Union[str, List[ChatMessage]] = ""
+
+    def history(self):
+        if isinstance(self.chat_history, str):
+            return self.chat_history
+        return [message.model_dump() for message in self.chat_history]
+
+
+class RetrieveRequest(BaseModel):
+    question: str = Field(..., min_length=1)
+    k: Optional[int] = Field(None, ge=1, le=50)
+
+
+def _validate_language(language):
+    if language not in LANGUAGES:
+        raise HTTPException(status_code=422, detail=f"Unsupported language: {language}")
+
+
+def _flight_key(request):
+    return flight_key(request.question, request.history(), request.language, resources["index"].version)
+
+
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        "index_version": resources["index"].version,
+        "cache": resources["answer_cache"].stats(),
+        "coalescing": resources["single_flight"].stats(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Per-stage latency histograms and token counters in Prometheus text format (TRACING=1)"""
+    return PlainTextResponse(tracing.render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/ask")
+async def ask(request: AskRequest):
+    """Answer a question and return the full answer with its references"""
+    _validate_language(request.language)
+
+    async def create():
+        with resources["index"].use() as index:
+            return await acreate_enhanced_rag_response(
+                index["retriever"],
+                request.question,
+                request.history(),
+                request.language,
+                answer_cache=resources["answer_cache"],
+                llm=resources["llm"],
+            )
+
+    return await resources["single_flight"].run(_flight_key(request), create)
+
+
+@app.post("/ask/stream")
+async def ask_stream(request: AskRequest):
+    """Answer a question as newline-delimited JSON events (tokens, then a final "done" event)"""
+    _validate_language(request.language)
+
+    async def produce():
+        # Held until the stream ends, so a hot swap cannot unload the index mid-answer
+        with resources["index"].use() as index:
+            async for event in astream_enhanced_rag_response(
+                index["retriever"],
+                request.question,
+                request.history(),
+                request.language,
+                answer_cache=resources["answer_cache"],
+                llm=resources["llm"],
+            ):
+                yield event
+
+    async def events():
+        async for event in resources["single_flight"].stream(_flight_key(request), produce):
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@app.post("/retrieve")
+async def retrieve(request: RetrieveRequest):
+    """Return the chunks the answer pipeline would use as context"""
+    with tracing.trace("retrieve"), resources["index"].use() as index:
+        documents = await asyncio.to_thread(index["retriever"].invoke, request.question)
+    if request.k is not None:
+        documents = documents[:request.k]
+    return {
+        "documents": [
+            {"content": doc.page_content, "metadata": doc.metadata}
+            for doc in documents
+        ]
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,6 +1,11 @@
 import streamlit as st
-from utils import load_vector_store, create_rag_chain, create_enhanced_rag_response, LANGUAGES
-import time
+from utils import stream_enhanced_rag_response, LANGUAGES
+from coalescing import SingleFlight, flight_key
+from chat_history import ChatHistoryManager
+from warmup import Warmup
+from contextlib import nullcontext
+import itertools
+import tracing
 
 # Set page configuration
 st.set_page_config(
@@ -22,6 +27,8 @@ if "messages" not in st.session_state:
     st.session_state.messages = []
 if "language" not in st.session_state:
     st.session_state.language = "English"
+if "history_manager" not in st.session_state:
+    st.session_state.history_manager = ChatHistoryManager()
 
 # Custom CSS for better styling with dark mode support
 st.markdown("""
@@ -144,26 +151,36 @@ with st.sidebar:
         st.session_state.language = selected_language
         st.rerun()
 
-# Load vector store and create retriever
+# Load the vector store, retriever and semantic answer cache once per process in a
+# background thread (see warmup.py), so the page renders while the model loads; a
+# watcher thread then swaps in newly published index versions without a restart
 @st.cache_resource
-def load_retriever():
-    try:
-        vector_store = load_vector_store()
-        retriever = vector_store.as_retriever(search_kwargs={"k": 5})
-        return retriever
-    except Exception as e:
-        st.error(f"Error loading vector store: {e}")
-        return None
+def start_warmup():
+    return Warmup().start()
 
-retriever = load_retriever()
+warmup = start_warmup()
 
-# Function to format chat history for the RAG chain
-def format_chat_history(messages):
-    chat_history = ""
-    for msg in messages:
-        role = "Human" if msg["role"] == "user" else "Assistant"
-        chat_history += f"{role}: {msg['content']}\n\n"
-    return chat_history
+# Readiness of the warm-up, refreshed on every rerun
+warmup_messages = {
+    "English": {"loading": "⏳ Loading legal documents...", "ready": "✅ Ready", "failed": "⚠️ Legal documents unavailable"},
+    "Hindi": {"loading": "⏳ कानूनी दस्तावेज़ लोड हो रहे हैं...", "ready": "✅ तैयार", "failed": "⚠️ कानूनी दस्तावेज़ उपलब्ध नहीं हैं"},
+    "Bengali": {"loading": "⏳ আইনি নথি লোড হচ্ছে...", "ready": "✅ প্রস্তুত", "failed": "⚠️ আইনি নথি পাওয়া যাচ্ছে না"}
+}
+with st.sidebar:
+    warmup_status = warmup.status()
+    st.caption(f"{warmup_messages.get(st.session_state.language, warmup_messages['English'])[warmup_status['state']]} "
+               f"({warmup_status['seconds']:.1f}s)")
+if warmup.state == "failed":
+    st.error(f"Error loading vector store: {warmup.error}")
+elif warmup.ready and warmup.resources["answer_cache_error"] is not None:
+    st.warning(f"Answer cache disabled: {warmup.resources['answer_cache_error']}")
+
+# Coalesces identical questions asked by different sessions at the same time
+@st.cache_resource
+def load_single_flight():
+    return SingleFlight()
+
+single_flight = load_single_flight()
 
 # Display chat messages with enhanced styling
 for message in st.session_state.messages:
@@ -219,85 +236,118 @@ if prompt := st.chat_input(chat_placeholders.get(st.session_state.language, "Ask
     
     # Generate response
     with st.chat_message("assistant"):
-        if retriever is None:
+        # A question asked during warm-up waits for it
+        if not warmup.ready:
+            with st.spinner(warmup_messages.get(st.session_state.language, warmup_messages["English"])["loading"]):
+                try:
+                    warmup.wait()
+                except Exception:
+                    # Shown below, from warmup.error
+                    pass
+        
+        if not warmup.ready:
             error_messages = {
-                "English": "Vector store not found. Please run the ingest.py script first.",
-                "Hindi": "वेक्टर स्टोर नहीं मिला। कृपया पहले ingest.py स्क्रिप्ट चलाएं।",
-                "Bengali": "ভেক্টর স্টোর পাওয়া যায়নি। দয়া করে প্রথমে ingest.py স্ক্রিপ্ট চালান।"
+                "English": f"Error loading vector store: {warmup.error}",
+                "Hindi": f"वेक्टर स्टोर लोड करने में त्रुटि: {warmup.error}",
+                "Bengali": f"ভেক্টর স্টোর লোড করতে ত্রুটি: {warmup.error}"
             }
-            st.markdown(error_messages.get(st.session_state.language, "Vector store not found. Please run the ingest.py script first."))
+            st.error(error_messages.get(st.session_state.language, f"Error loading vector store: {warmup.error}"))
         else:
+            live_index = warmup.resources["index"]
+            answer_cache = warmup.resources["answer_cache"]
             thinking_messages = {
-        "English": "Thinking...",
-        "Hindi": "सोच रहा हूँ...",
-        "Bengali": "ভাবছি..."
-    }
-    with st.spinner(thinking_messages.get(st.session_state.language, "Thinking...")):
-                # Format chat history for context
-                chat_history = format_chat_history(st.session_state.messages[:-1])  # Exclude current message
+                "English": "Thinking...",
+                "Hindi": "सोच रहा हूँ...",
+                "Bengali": "ভাবছি..."
+            }
+            # Previous messages; the history manager fits them into the prompt's token budget
+            chat_history = st.session_state.messages[:-1]  # Exclude current message
+            
+            try:
+                language = st.session_state.language
+                history_manager = st.session_state.history_manager
+                # Traces of this request only, for the debug panel (empty when it joined another session's flight)
+                traces = []
+                show_timings = st.session_state.get("show_timings", tracing.enabled())
+
+                def produce():
+                    # Requests in flight keep the index version they started with across a hot swap
+                    with live_index.use() as index, (tracing.collect(traces) if show_timings else nullcontext()):
+                        # Stream the enhanced RAG response with references
+                        yield from stream_enhanced_rag_response(
+                            index["retriever"], 
+                            prompt, 
+                            chat_history, 
+                            language,
+                            answer_cache=answer_cache,
+                            history_manager=history_manager
+                        )
+
+                # Sessions asking the same question at the same time share one answer
+                key = flight_key(prompt, chat_history, language, live_index.version)
+                events = single_flight.stream(key, produce)
                 
-                try:
-                    # Use enhanced RAG response with references
-                    response = create_enhanced_rag_response(
-                        retriever, 
-                        prompt, 
-                        chat_history, 
-                        st.session_state.language
-                    )
-                    answer = response["answer"]
-                    references = response["references"]
-                    
-                    # Create a placeholder for the typing animation
-                    message_placeholder = st.empty()
-                    full_response = ""
-                    
-                    # Simulate typing with a simple animation
-                    for chunk in answer.split():
-                        full_response += chunk + " "
+                # Show the spinner only until retrieval is done and the first token arrives
+                with st.spinner(thinking_messages.get(st.session_state.language, "Thinking...")):
+                    first_event = next(events)
+                
+                message_placeholder = st.empty()
+                full_response = ""
+                response = {}
+                
+                # Render tokens as the LLM produces them
+                for event in itertools.chain([first_event], events):
+                    if event["type"] == "token":
+                        full_response += event["content"]
                         message_placeholder.markdown(f"<div class='assistant-message' style='color: inherit;'>{full_response}▌</div>", unsafe_allow_html=True)
-                        time.sleep(0.05)  # Adjust speed as needed
-                    
-                    # Display the final answer
-                    message_placeholder.markdown(f"<div class='assistant-message' style='color: inherit;'>{answer}</div>", unsafe_allow_html=True)
+                    else:
+                        response = event
+                
+                answer = response["answer"]
+                references = response["references"]
+                
+                # Display the final answer
+                message_placeholder.markdown(f"<div class='assistant-message' style='color: inherit;'>{answer}</div>", unsafe_allow_html=True)
+                
+                # Display references in boxes
+                if references:
+                    reference_labels = {
+                        "English": "📚 References",
+                        "Hindi": "📚 संदर्भ",
+                        "Bengali": "📚 তথ্যসূত্র"
+                    }
+                    st.markdown(f"**{reference_labels.get(st.session_state.language, '📚 References')}:**")
                     
-                    # Display references in boxes
-                    if references:
-                        reference_labels = {
-                            "English": "📚 References",
-                            "Hindi": "📚 संदर्भ",
-                            "Bengali": "📚 তথ্যসূত্র"
-                        }
-                        st.markdown(f"**{reference_labels.get(st.session_state.language, '📚 References')}:**")
-                        
-                        for i, ref in enumerate(references, 1):
-                            with st.container():
-                                st.markdown(f"""
-                                <div style="
-                                    border: 1px solid #e0e0e0;
-                                    border-radius: 8px;
-                                    padding: 12px;
-                                    margin: 8px 0;
-                                    background-color: #f8f9fa;
-                                    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                                ">
-                                    <div style="font-weight: bold; color: #1f2937; margin-bottom: 8px;">
-                                        📖 {ref['document']}
-                                    </div>
-                                    <div style="color: #4b5563; font-size: 0.9em; line-height: 1.4;">
-                                        {ref['content']}
-                                    </div>
+                    for i, ref in enumerate(references, 1):
+                        with st.container():
+                            st.markdown(f"""
+                            <div style="
+                                border: 1px solid #e0e0e0;
+                                border-radius: 8px;
+                                padding: 12px;
+                                margin: 8px 0;
+                                background-color: #f8f9fa;
+                                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+                            ">
+                                <div style="font-weight: bold; color: #1f2937; margin-bottom: 8px;">
+                                    📖 {ref['document']}
                                 </div>
-                                """, unsafe_allow_html=True)
-                    
-                    # Add assistant response to chat history
-                    st.session_state.messages.append({"role": "assistant", "content": answer, "references": references})
-                except Exception as e:
-                    error_messages = {
-                        "English": f"Error generating response: {e}",
-                        "Hindi": f"उत्तर उत्पन्न करने में त्रुटि: {e}",
-                        "Bengali": f"উত্তর তৈরিতে ত্রুটি: {e}"
-                    }
-                    st.error(error_messages.get(st.session_state.language, f"Error generating response: {e}"))
+                                <div style="color: #4b5563; font-size: 0.9em; line-height: 1.4;">
+                                    {ref['content']}
+                                </div>
+                            </div>
+                            """, unsafe_allow_html=True)
+                
+                # Add assistant response to chat history
+                st.session_state.messages.append({"role": "assistant", "content": answer, "references": references})
+                st.session_state.last_trace = traces[-1] if traces else None
+            except Exception as e:
+                error_messages = {
+                    "English": f"Error generating response: {e}",
+                    "Hindi": f"उत्तर उत्पन्न करने में त्रुटि: {e}",
+                    "Bengali": f"উত্তর তৈরিতে ত্রুটি: {e}"
+                }
+                st.error(error_messages.get(st.session_state.language, f"Error generating response: {e}"))
 
 # Sidebar with information and enhanced styling
 with st.sidebar:
@@ -334,8 +384,27 @@ with st.sidebar:
         }
         if st.button(clear_button_text.get(st.session_state.language, "Clear Chat"), type="primary"):
             st.session_state.messages = []
+            st.session_state.history_manager.reset()
             st.rerun()
     
     # Language info
     st.markdown('<div class="sidebar-header">Supported Languages</div>', unsafe_allow_html=True)
-    st.markdown('<div class="sidebar-content">🇬🇧 English<br>🇮🇳 हिंदी (Hindi)<br>🇧🇩 বাংলা (Bengali)</div>', unsafe_allow_html=True)
\ No newline at end of file
+    st.markdown('<div class="sidebar-content">🇬🇧 English<br>🇮🇳 हिंदी (Hindi)<br>🇧🇩 বাংলা (Bengali)</div>', unsafe_allow_html=True)
+    
+    # Optional per-stage timing breakdown of the last answer; only this session's requests are traced
+    if st.checkbox("Show stage timings (debug)", value=tracing.enabled(), key="show_timings"):
+        last_trace = st.session_state.get("last_trace")
+        if last_trace:
+            st.caption(f"Last answer: {last_trace['duration_ms']:.0f} ms"
+                       + (" (cached)" if last_trace.get("cached") else ""))
+            st.table([
+                {
+                    "stage": span["name"],
+                    "ms": round(span["duration_ms"], 1),
+                    "tokens": " / ".join(f"{key[:-len('_tokens')]} {value}"
+                                         for key, value in span.items() if key.endswith("_tokens")),
+                }
+                for span in sorted(last_trace["spans"], key=lambda span: span["start_ms"])
+            ])
+        else:
+            st.caption("Ask a question to see where the time goes.")
\ No newline at end of file
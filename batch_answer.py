@@ -0,0 +1,262 @@
+"""Answer a JSONL file of questions in bulk, e.g. for FAQ pages or nightly regression runs.
+
+Each input line is a JSON object holding a question (field ``question`` by
+default) and optionally an ``id`` and a ``language``. Answers are appended to
+the output JSONL as they complete, one object per question with its answer,
+references and timing. The output doubles as the checkpoint: rerunning the
+same command skips questions already answered, so a crashed run resumes.
+
+Query embeddings are computed up front in batches, retrieval runs in a thread
+pool, and LLM calls run concurrently with a bound on in-flight requests and an
+optional requests-per-minute limit. With ``CROSS_LANGUAGE=1``, translating a
+Hindi or Bengali question into its English search query is one of those calls.
+
+Usage:
+    python batch_answer.py questions.jsonl answers.jsonl [--concurrency 8] [--rpm 500]
+    python batch_answer.py requests.jsonl answers.jsonl --question-field body --id-field request_id
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from citations import split_citations
+from index_versions import resolve_index_dir
+from multilingual import (
+    cached_retrieval_query,
+    get_translation_cache,
+    parse_query_translation,
+    query_translation_prompt,
+)
+from retrievers import build_retriever
+from utils import (
+    CHROMA_DIR,
+    LANGUAGES,
+    build_references,
+    count_tokens,
+    get_embeddings_model,
+    get_llm,
+    load_vector_store,
+    prepare_rag_prompt,
+)
+
+
+class PrecomputedQueryEmbeddings(Embeddings):
+    """Serves query embeddings computed in batches, delegating anything else"""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.queries = {}
+
+    def precompute(self, texts, batch_size=64):
+        """Embed texts in batches so later embed_query calls for them are lookups"""
+        pending = [text for text in dict.fromkeys(texts) if text not in self.queries]
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            self.queries.update(zip(batch, self.embeddings.embed_documents(batch)))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.queries.get(text)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+        return vector
+
+
+class RateLimiter:
+    """Spaces out calls to at most rpm per minute (no limit when rpm is 0)"""
+
+    def __init__(self, rpm):
+        self.interval = 60.0 / rpm if rpm else 0.0
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def load_questions(path, question_field, id_field, default_language):
+    """Read questions from a JSONL file as dicts with id, question and language"""
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            question = (record.get(question_field) or "").strip()
+            if not question:
+                print(f"Skipping line {line_number}: no '{question_field}' field")
+                continue
+            language = record.get("language", default_language)
+            if language not in LANGUAGES:
+                print(f"Skipping line {line_number}: unsupported language {language}")
+                continue
+            questions.append({
+                "id": str(record.get(id_field, line_number)),
+                "question": question,
+                "language": language,
+            })
+    return questions
+
+
+def load_completed(output_path):
+    """Return the IDs already answered in an existing output file"""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by a crash; that question is answered again
+                continue
+            if "answer" in record:
+                completed.add(record["id"])
+    return completed
+
+
+async def call_llm(llm, prompt, llm_slots, rate_limiter, max_retries):
+    """Invoke the LLM within the concurrency and rate limits, retrying failures with backoff"""
+    for attempt in range(max_retries + 1):
+        try:
+            async with llm_slots:
+                await rate_limiter.wait()
+                return await llm.ainvoke(prompt)
+        except Exception:
+            if attempt == max_retries:
+                raise
+            await asyncio.sleep(2 ** attempt)
+
+
+async def answer_question(item, retriever, llm, retrieval_slots, llm_slots, rate_limiter, max_retries):
+    """Retrieve, prompt and answer one question, retrying failed LLM calls with backoff"""
+    start = time.perf_counter()
+    question, language = item["question"], item["language"]
+    if await asyncio.to_thread(cached_retrieval_query, question, language) is None:
+        # Translated here rather than in prepare_rag_prompt, so the call is limited and retried like
+        # the answer; if it still fails the question fails, and a rerun tries it again
+        response = await call_llm(llm, query_translation_prompt(question), llm_slots, rate_limiter, max_retries)
+        query = parse_query_translation(response.content, question)
+        await asyncio.to_thread(get_translation_cache().put, question, language, query)
+
+    async with retrieval_slots:
+        prompt, retrieved_docs = await asyncio.to_thread(
+            prepare_rag_prompt, retriever, question, "", language, None, llm
+        )
+
+    response = await call_llm(llm, prompt, llm_slots, rate_limiter, max_retries)
+    answer, citations = split_citations(response.content)
+    return {
+        **item,
+        "answer": answer,
+        "references": build_references(retrieved_docs, answer, citations),
+        "prompt_tokens": count_tokens(prompt),
+        "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+async def run(questions, output_path, retriever, llm, concurrency, retrieval_workers, rpm, max_retries):
+    """Answer questions concurrently, appending each result to output_path as it completes"""
+    retrieval_slots = asyncio.Semaphore(retrieval_workers)
+    llm_slots = asyncio.Semaphore(concurrency)
+    rate_limiter = RateLimiter(rpm)
+    answered = failed = 0
+    start = time.perf_counter()
+
+    async def one(item):
+        try:
+            return item, await answer_question(
+                item, retriever, llm, retrieval_slots, llm_slots, rate_limiter, max_retries
+            ), None
+        except Exception as e:
+            return item, None, e
+
+    with open(output_path, "a+", encoding="utf-8") as out:
+        if out.tell() > 0:
+            out.seek(out.tell() - 1)
+            if out.read(1) != "\n":
+                # Start after a line cut short by a crash instead of appending to it
+                out.write("\n")
+        for task in asyncio.as_completed([one(item) for item in questions]):
+            item, result, error = await task
+            if error is not None:
+                failed += 1
+                print(f"Failed {item['id']}: {error}")
+                continue
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            answered += 1
+            if answered % 50 == 0:
+                elapsed = time.perf_counter() - start
+                print(f"  {answered}/{len(questions)} answered, {answered / elapsed * 60:.1f} questions/min")
+
+    return answered, failed, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions in bulk")
+    parser.add_argument("input", help="JSONL file with one question per line")
+    parser.add_argument("output", help="JSONL file answers are appended to; also the resume checkpoint")
+    parser.add_argument("--question-field", default="question")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--language", default="English", help="language for lines without one")
+    parser.add_argument("--persist-dir", default=CHROMA_DIR)
+    parser.add_argument("--concurrency", type=int, default=8, help="maximum LLM calls in flight")
+    parser.add_argument("--retrieval-workers", type=int, default=4, help="threads running retrieval")
+    parser.add_argument("--rpm", type=int, default=0, help="LLM requests per minute (0 = unlimited)")
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=64, help="questions per embedding batch")
+    parser.add_argument("--limit", type=int, default=None, help="answer at most this many new questions")
+    args = parser.parse_args()
+
+    questions = load_questions(args.input, args.question_field, args.id_field, args.language)
+    completed = load_completed(args.output)
+    pending = [item for item in questions if item["id"] not in completed]
+    print(f"{len(questions)} questions, {len(questions) - len(pending)} already answered, {len(pending)} to answer")
+    pending = pending[:args.limit]
+    if not pending:
+        return
+
+    persist_dir = resolve_index_dir(args.persist_dir)
+    embeddings = PrecomputedQueryEmbeddings(get_embeddings_model())
+    try:
+        vector_store = load_vector_store(persist_dir, embeddings=embeddings)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    retriever = build_retriever(vector_store, persist_dir)
+    llm = get_llm()
+
+    start = time.perf_counter()
+    # Embed the queries retrieval will search with. With CROSS_LANGUAGE=1, Hindi and Bengali
+    # questions are searched in English; those not translated yet are embedded when answered
+    queries = [cached_retrieval_query(item["question"], item["language"]) for item in pending]
+    queries = [query for query in queries if query is not None]
+    embeddings.precompute(queries, args.batch_size)
+    print(f"Embedded {len(queries)} of {len(pending)} queries in {time.perf_counter() - start:.1f}s")
+
+    answered, failed, elapsed = asyncio.run(run(
+        pending, args.output, retriever, llm, args.concurrency, args.retrieval_workers,
+        args.rpm, args.max_retries,
+    ))
+    print(f"Answered {answered} questions ({failed} failed) in {elapsed:.1f}s: "
+          f"{answered / elapsed * 60:.1f} questions/min")
+    if failed:
+        print("Rerun the same command to retry the failed questions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+"""Benchmarks for the ingestion and answer pipeline.
+
+Run from the repository root, e.g. ``python -m benchmarks.bench_embeddings``.
+"""
@@ -0,0 +1,111 @@
+"""Compare embedding backends on ingestion throughput and query-encode latency.
+
+Usage:
+    python -m benchmarks.bench_embeddings [--pdf data/bns_data/bsa_2024.pdf]
+        [--backends huggingface onnx onnx-int8] [--output results.json]
+
+For each backend this reports the model load time, chunks/sec when embedding
+the chunks of one PDF, the same with a warm on-disk embedding cache, and
+p50/p95 latency for single-query encoding.
+"""
+import argparse
+import json
+import shutil
+import tempfile
+import time
+
+from benchmarks.stats import percentiles
+from utils import get_embeddings_model
+
+QUERIES = [
+    "What are my rights if I am arrested in India?",
+    "Explain Article 21 of the Indian Constitution",
+    "Section 103 BNS punishment for murder",
+    "What is the legal age of marriage in India?",
+    "Can the government restrict freedom of speech in India?",
+]
+
+
+def load_chunks(pdf_path, chunk_size=1000, chunk_overlap=200):
+    """Split one PDF into the chunk texts ingestion would embed"""
+    from langchain_community.document_loaders import PyPDFLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return [chunk.page_content for chunk in splitter.split_documents(PyPDFLoader(pdf_path).load())]
+
+
+def bench_backend(backend, texts, query_rounds):
+    """Measure one backend and return its results"""
+    import embedding_backends
+
+    start = time.perf_counter()
+    embeddings = get_embeddings_model(backend=backend)
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    embeddings.embed_documents(texts)
+    encode_seconds = time.perf_counter() - start
+
+    # Warm the cache in a scratch directory, then time a fully cached pass
+    cache_dir = tempfile.mkdtemp(prefix="embedding-cache-")
+    try:
+        cached = embedding_backends.with_embedding_cache(embeddings, backend, cache_dir=cache_dir)
+        cached.embed_documents(texts)
+        start = time.perf_counter()
+        cached.embed_documents(texts)
+        cached_seconds = time.perf_counter() - start
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    embeddings.embed_query(QUERIES[0])  # warm-up
+    latencies = []
+    for _ in range(query_rounds):
+        for query in QUERIES:
+            start = time.perf_counter()
+            embeddings.embed_query(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    latency = percentiles(latencies)
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 3),
+        "chunks": len(texts),
+        "chunks_per_second": round(len(texts) / encode_seconds, 1),
+        "cached_chunks_per_second": round(len(texts) / cached_seconds, 1),
+        "query_ms_p50": latency["p50"],
+        "query_ms_p95": latency["p95"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends")
+    parser.add_argument("--pdf", default="data/bns_data/bsa_2024.pdf", help="PDF whose chunks are embedded")
+    parser.add_argument("--backends", nargs="+", default=["huggingface", "onnx", "onnx-int8"])
+    parser.add_argument("--query-rounds", type=int, default=20)
+    parser.add_argument("--output", help="optional JSON file for the results")
+    args = parser.parse_args()
+
+    texts = load_chunks(args.pdf)
+    print(f"Embedding {len(texts)} chunks from {args.pdf}")
+
+    results = []
+    for backend in args.backends:
+        try:
+            result = bench_backend(backend, texts, args.query_rounds)
+        except Exception as e:
+            print(f"{backend}: skipped ({e})")
+            continue
+        results.append(result)
+        print(f"{backend:12s} load {result['load_seconds']:6.2f}s  "
+              f"{result['chunks_per_second']:8.1f} chunks/s  "
+              f"cached {result['cached_chunks_per_second']:9.1f} chunks/s  "
+              f"query p50 {result['query_ms_p50']:6.2f}ms  p95 {result['query_ms_p95']:6.2f}ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
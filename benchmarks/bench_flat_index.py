@@ -0,0 +1,170 @@
+"""Compare the memory-mapped flat index with Chroma: open time, memory per worker and query latency.
+
+Exports float16 and int8 snapshots of the collection into temporary
+directories, then starts --workers processes per backend at the same time.
+Each opens its store, runs the same top-k queries and reports its RSS and
+PSS (proportional set size, which splits shared pages between the processes
+mapping them). Queries are stored chunk vectors with a little noise, so no
+embedding model is needed.
+
+Usage:
+    python -m benchmarks.bench_flat_index [--workers 4] [--queries 200] [--k 20]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.stats import percentiles
+from flat_index import FLAT_INDEX_DIRNAME, export_flat_index, flat_index_path
+from ingest import MANIFEST_FILENAME
+from lexical_index import LEXICAL_INDEX_DIRNAME
+from statutes import STATUTE_INDEX_FILENAME
+from utils import CHROMA_DIR
+
+
+def memory_mb():
+    """Return (RSS, PSS) of this process in MB, read from /proc on Linux"""
+    values = {}
+    try:
+        with open("/proc/self/smaps_rollup", "r") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("Rss", "Pss"):
+                    values[key] = int(rest.split()[0]) / 1024
+    except OSError:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return rss, None
+    return values.get("Rss"), values.get("Pss")
+
+
+def _worker(backend, persist_directory, queries, k, barrier, results):
+    if backend == "chroma":
+        from langchain_chroma import Chroma
+    else:
+        from flat_index import FlatVectorStore
+    rss_before, pss_before = memory_mb()
+
+    start = time.perf_counter()
+    if backend == "chroma":
+        collection = Chroma(persist_directory=persist_directory)._collection
+        search = lambda vector: collection.query(query_embeddings=[vector], n_results=k)
+    else:
+        store = FlatVectorStore.load(persist_directory)
+        search = lambda vector: store.similarity_search_by_vector_with_score(vector, k)
+    open_seconds = time.perf_counter() - start
+
+    search(queries[0])
+    latencies = []
+    for vector in queries:
+        start = time.perf_counter()
+        search(vector)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    # Measure while every worker of this backend still has the index mapped
+    barrier.wait()
+    rss_after, pss_after = memory_mb()
+    barrier.wait()
+    latency = percentiles(latencies, digits=3)
+    results.put({
+        "open_seconds": open_seconds,
+        "query_ms_p50": latency["p50"],
+        "query_ms_p95": latency["p95"],
+        "rss_mb": rss_after - rss_before,
+        "pss_mb": pss_after - pss_before if pss_after is not None else None,
+    })
+
+
+def run_backend(backend, persist_directory, queries, k, workers):
+    """Run workers for one backend at the same time and average their measurements"""
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=_worker, args=(backend, persist_directory, queries, k, barrier, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    measurements = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    summary = {}
+    for key in measurements[0]:
+        values = [m[key] for m in measurements if m[key] is not None]
+        summary[key] = round(statistics.fmean(values), 3) if values else None
+    return summary
+
+
+def directory_mb(path, skip=()):
+    """Return the size of the files under path in MB, ignoring top-level entries named in skip"""
+    total = 0
+    for root, dirs, files in os.walk(path):
+        if root == path:
+            dirs[:] = [name for name in dirs if name not in skip]
+            files = [name for name in files if name not in skip]
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the flat index against Chroma")
+    parser.add_argument("--persist-dir", default=CHROMA_DIR)
+    parser.add_argument("--workers", type=int, default=4, help="concurrent worker processes per backend")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--output", help="optional JSON file for the results")
+    args = parser.parse_args()
+
+    from langchain_chroma import Chroma
+    collection = Chroma(persist_directory=args.persist_dir)._collection
+    count = collection.count()
+    rng = np.random.default_rng(0)
+    sample = collection.get(ids=None, include=["embeddings"], limit=min(count, 5000))["embeddings"]
+    sample = np.asarray(sample, dtype=np.float32)
+    picks = sample[rng.integers(0, len(sample), args.queries)]
+    noisy = picks + rng.normal(0, 0.02, picks.shape).astype(np.float32)
+    queries = (noisy / np.linalg.norm(noisy, axis=1, keepdims=True)).tolist()
+
+    results = {"chunks": count, "workers": args.workers, "k": args.k}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        stores = {"chroma": args.persist_dir}
+        for dtype in ("float16", "int8"):
+            directory = os.path.join(tmp_dir, dtype)
+            start = time.perf_counter()
+            export_flat_index(collection, directory, dtype)
+            print(f"Exported {dtype} snapshot in {time.perf_counter() - start:.1f}s")
+            stores[f"flat-{dtype}"] = directory
+
+        for name, directory in stores.items():
+            summary = run_backend(name.split("-")[0], directory, queries, args.k, args.workers)
+            if name == "chroma":
+                # Only Chroma's own files, not the lexical, statute or flat indexes kept alongside
+                size = directory_mb(directory, skip={FLAT_INDEX_DIRNAME, LEXICAL_INDEX_DIRNAME,
+                                                     STATUTE_INDEX_FILENAME, MANIFEST_FILENAME})
+            else:
+                size = directory_mb(flat_index_path(directory))
+            summary["size_mb"] = round(size, 2)
+            results[name] = summary
+
+    print(f"{count} chunks, {args.workers} workers per backend, k={args.k}")
+    print(f"{'backend':14s} {'open s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} {'RSS MB':>8s} {'PSS MB':>8s} {'disk MB':>8s}")
+    for name in ("chroma", "flat-float16", "flat-int8"):
+        row = results[name]
+        print(f"{name:14s} {row['open_seconds']:8.3f} {row['query_ms_p50']:8.2f} {row['query_ms_p95']:8.2f} "
+              f"{row['rss_mb']:8.1f} {row['pss_mb'] if row['pss_mb'] is not None else float('nan'):8.1f} "
+              f"{row['size_mb']:8.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
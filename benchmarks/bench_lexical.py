@@ -0,0 +1,110 @@
+"""Benchmark the BM25 lexical index: build time, size on disk and query latency.
+
+Usage:
+    python -m benchmarks.bench_lexical              # index built from chroma_db
+    python -m benchmarks.bench_lexical --from-pdfs  # chunk data/ directly, no vector store needed
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.stats import percentiles
+from ingest import DATA_DIR, discover_pdfs, file_sha256, split_pdf
+from lexical_index import LexicalIndex, lexical_index_path
+from utils import CHROMA_DIR
+
+QUERIES = [
+    "Kesavananda Bharati basic structure doctrine",
+    "habeas corpus illegal detention",
+    "res judicata civil suit",
+    "Maneka Gandhi passport personal liberty",
+    "punishment for murder",
+    "electronic record admissibility certificate",
+    "anticipatory bail conditions",
+    "sedition Section 124A",
+    "Citizenship Amendment Act 2019",
+    "mens rea criminal intention",
+]
+
+
+def _split(pdf_path):
+    result = split_pdf(pdf_path, file_sha256(pdf_path))
+    return result["ids"], result["texts"], result["pages"]
+
+
+def chunks_from_pdfs(data_dir):
+    """Chunk every PDF exactly as ingestion does, without embedding"""
+    ids, texts, pages = [], [], 0
+    with ProcessPoolExecutor() as executor:
+        for chunk_ids, chunk_texts, page_count in executor.map(_split, discover_pdfs(data_dir)):
+            ids.extend(chunk_ids)
+            texts.extend(chunk_texts)
+            pages += page_count
+    return ids, texts, pages
+
+
+def directory_size(path):
+    """Return the total size in bytes of the files under path"""
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, files in os.walk(path) for name in files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the BM25 lexical index")
+    parser.add_argument("--from-pdfs", action="store_true", help="chunk the PDFs instead of reading chroma_db")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--persist-dir", default=CHROMA_DIR)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--output", help="optional JSON file for the results")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.from_pdfs:
+        ids, texts, pages = chunks_from_pdfs(args.data_dir)
+        print(f"Chunked {pages} pages into {len(ids)} chunks in {time.perf_counter() - start:.1f}s")
+        start = time.perf_counter()
+        index = LexicalIndex.build(ids, texts)
+    else:
+        from langchain_chroma import Chroma
+        index = LexicalIndex.build_from_collection(Chroma(persist_directory=args.persist_dir)._collection)
+    build_seconds = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index.save(tmp_dir)
+        size_bytes = directory_size(lexical_index_path(tmp_dir))
+        start = time.perf_counter()
+        index = LexicalIndex.load(tmp_dir)
+        load_seconds = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(args.rounds):
+        for query in QUERIES:
+            start = time.perf_counter()
+            index.search(query, k=args.k)
+            latencies.append((time.perf_counter() - start) * 1000)
+    latency = percentiles(latencies, digits=3)
+
+    results = {
+        "chunks": len(index),
+        "vocabulary": len(index.vocabulary),
+        "postings": int(len(index.doc_indices)),
+        "build_seconds": round(build_seconds, 2),
+        "load_seconds": round(load_seconds, 3),
+        "size_mb": round(size_bytes / (1024 * 1024), 2),
+        "query_ms_p50": latency["p50"],
+        "query_ms_p95": latency["p95"],
+    }
+    for name, value in results.items():
+        print(f"{name:15s} {value}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
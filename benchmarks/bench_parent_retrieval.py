@@ -0,0 +1,102 @@
+"""Compare parent-document retrieval with fixed-size chunking: context size and recall.
+
+Ingests data/ twice into temporary stores, once per chunking mode (see
+parent_documents.py), and runs the labeled queries in benchmarks/queries.jsonl
+through the app's retriever for each. It reports recall@k and MRR with the
+relevance labels of bench_suite, plus the tokens and passages of context
+each query puts into the prompt.
+
+Usage:
+    python -m benchmarks.bench_parent_retrieval [--output results.json]
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+
+from benchmarks.bench_suite import QUERIES_PATH, evaluate_retriever, load_queries
+from benchmarks.stats import percentiles
+from ingest import DATA_DIR, ingest
+from parent_documents import ParentStore
+from retrievers import build_retriever
+from utils import count_tokens, load_vector_store
+
+MODES = ("window", "parent")
+
+
+def measure_context(retriever, queries):
+    """Return the context tokens and passages each query retrieves"""
+    tokens, passages = [], []
+    for item in queries:
+        docs = retriever.invoke(item["query"])
+        tokens.append(sum(count_tokens(doc.page_content) for doc in docs))
+        passages.append(len(docs))
+    return {
+        "context_tokens": percentiles(tokens),
+        "passages_mean": round(statistics.fmean(passages), 2),
+    }
+
+
+def evaluate_mode(mode, data_dir, queries, embeddings=None):
+    """Ingest data_dir with one chunking mode into a temporary store and evaluate its retriever"""
+    with tempfile.TemporaryDirectory() as persist_directory:
+        start = time.perf_counter()
+        manifest = ingest(data_dir=data_dir, persist_directory=persist_directory, full=True, chunking_mode=mode)
+        ingest_seconds = time.perf_counter() - start
+
+        vector_store = load_vector_store(persist_directory, embeddings=embeddings)
+        retriever = build_retriever(vector_store, persist_directory)
+        parent_store = ParentStore.load(persist_directory)
+        retriever.invoke(queries[0]["query"])
+
+        retrieval = evaluate_retriever(retriever, queries)
+        retrieval.pop("first_relevant_rank")
+        results = {
+            "chunks": sum(entry["chunks"] for entry in manifest["files"].values()),
+            "parents": len(parent_store) if parent_store is not None else None,
+            "ingest_seconds": round(ingest_seconds, 2),
+            "retrieval": retrieval,
+            "context": measure_context(retriever, queries),
+        }
+        if parent_store is not None:
+            parent_store.close()
+        return results, vector_store.embeddings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare parent-document retrieval with fixed-size chunking")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--queries", default=QUERIES_PATH)
+    parser.add_argument("--output", help="optional JSON file for the results")
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries)
+    results = {}
+    embeddings = None
+    for mode in MODES:
+        print(f"Evaluating {mode} chunking on {len(queries)} labeled queries")
+        results[mode], embeddings = evaluate_mode(mode, args.data_dir, queries, embeddings)
+
+    print(f"{'':24s}" + "".join(f"{mode:>12s}" for mode in MODES))
+    rows = [
+        ("chunks", lambda r: r["chunks"]),
+        ("recall@1", lambda r: r["retrieval"]["recall@1"]),
+        ("recall@3", lambda r: r["retrieval"]["recall@3"]),
+        ("recall@5", lambda r: r["retrieval"]["recall@5"]),
+        ("mrr", lambda r: r["retrieval"]["mrr"]),
+        ("context tokens p50", lambda r: r["context"]["context_tokens"]["p50"]),
+        ("context tokens p95", lambda r: r["context"]["context_tokens"]["p95"]),
+        ("passages per query", lambda r: r["context"]["passages_mean"]),
+        ("retrieval ms p50", lambda r: r["retrieval"]["latency_ms"]["p50"]),
+    ]
+    for name, value in rows:
+        print(f"{name:24s}" + "".join(f"{value(results[mode]):>12}" for mode in MODES))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
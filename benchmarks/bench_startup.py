@@ -0,0 +1,154 @@
+"""Cold-start benchmark of the Streamlit app: import time, first rendered page and first answer.
+
+Every measurement runs in a fresh Python process, so nothing is imported or
+cached in memory beforehand (the OS page cache still is: run it twice and
+report the second run for warm-disk numbers).
+
+  - import: the modules app.py imports before drawing anything, and the
+    retriever stack the warm-up loads (see warmup.py)
+  - first_render: starting app.py with streamlit.testing.v1.AppTest until its
+    first script run has drawn the page, including importing Streamlit
+  - first_answer: from the same start until a question asked straight after
+    the first render has been answered, warm-up included. Answers come from
+    the fake LLM (LLM_BACKEND=fake), so no network access is needed
+  - warmup: the stages of the background warm-up, once it has finished
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 5] [--output results.json] [--compare <earlier results>]
+    python -m benchmarks.bench_startup --max-first-render 3 --max-first-answer 20   # exit 1 if slower
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.bench_suite import compare, git_commit
+from benchmarks.stats import percentiles
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUESTION = "What is the punishment for murder under the IPC?"
+
+IMPORT_TARGETS = {
+    "app_modules": "import utils, coalescing, chat_history, warmup, tracing",
+    "utils": "import utils",
+    "retrievers": "import retrievers",
+}
+
+IMPORT_SCRIPT = """
+import time
+start = time.perf_counter()
+{statement}
+print(time.perf_counter() - start)
+"""
+
+APP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+
+app = AppTest.from_file("app.py", default_timeout={timeout})
+app.run()
+first_render = time.perf_counter() - start
+assert not app.exception, app.exception
+app.chat_input[0].set_value({question!r}).run()
+first_answer = time.perf_counter() - start
+assert not app.exception, app.exception
+messages = app.session_state["messages"]
+assert messages[-1]["role"] == "assistant", "no answer was rendered"
+print(json.dumps({{"first_render": first_render, "first_answer": first_answer}}))
+"""
+
+
+def run_python(code, env=None, timeout=300):
+    """Run code in a fresh interpreter in the repository and return its last line of output"""
+    completed = subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR, env=env, capture_output=True,
+                               text=True, timeout=timeout)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else
+                           f"exit code {completed.returncode}")
+    return completed.stdout.strip().splitlines()[-1]
+
+
+def measure_imports(runs):
+    """Return import-time percentiles in ms per target"""
+    results = {}
+    for name, statement in IMPORT_TARGETS.items():
+        times = [float(run_python(IMPORT_SCRIPT.format(statement=statement))) * 1000 for _ in range(runs)]
+        results[name] = percentiles(times)
+    return results
+
+
+def measure_app(runs, timeout):
+    """Return first-render and first-answer percentiles in ms over cold starts of app.py"""
+    env = dict(os.environ, LLM_BACKEND="fake")
+    script = APP_SCRIPT.format(timeout=timeout, question=QUESTION)
+    renders, answers = [], []
+    for _ in range(runs):
+        measured = json.loads(run_python(script, env=env, timeout=timeout + 60))
+        renders.append(measured["first_render"] * 1000)
+        answers.append(measured["first_answer"] * 1000)
+    return {"first_render_ms": percentiles(renders), "first_answer_ms": percentiles(answers)}
+
+
+def measure_warmup():
+    """Return the stage timings of one background warm-up in this process"""
+    from warmup import Warmup
+
+    warmup = Warmup().start()
+    warmup.wait()
+    warmup.resources["index"].stop()
+    return warmup.status()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold start of the Streamlit app")
+    parser.add_argument("--runs", type=int, default=5, help="cold starts per measurement")
+    parser.add_argument("--timeout", type=int, default=180, help="seconds allowed per app script run")
+    parser.add_argument("--skip-app", action="store_true", help="only measure imports and warm-up")
+    parser.add_argument("--max-first-render", type=float, help="fail if first render p50 exceeds these seconds")
+    parser.add_argument("--max-first-answer", type=float, help="fail if first answer p50 exceeds these seconds")
+    parser.add_argument("--output", help="optional JSON file for the results")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {"commit": git_commit(), "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "runs": args.runs}
+    print(f"Measuring cold imports ({args.runs} runs each)")
+    results["import_ms"] = measure_imports(args.runs)
+    for name, value in results["import_ms"].items():
+        print(f"  import {name:14s} p50 {value['p50']:>9} ms  p95 {value['p95']:>9} ms")
+
+    if not args.skip_app:
+        print(f"Measuring app cold starts ({args.runs} runs)")
+        results["app"] = measure_app(args.runs, args.timeout)
+        for name, value in results["app"].items():
+            print(f"  {name:21s} p50 {value['p50']:>9} ms  p95 {value['p95']:>9} ms")
+
+    print("Measuring background warm-up")
+    results["warmup"] = measure_warmup()
+    print(f"  ready after {results['warmup']['seconds']} s, stages started at {results['warmup']['stages']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if baseline is not None:
+        compare(results, baseline, args.compare)
+
+    failures = []
+    app = results.get("app", {})
+    for limit, name in ((args.max_first_render, "first_render_ms"), (args.max_first_answer, "first_answer_ms")):
+        if limit is not None and name in app and app[name]["p50"] > limit * 1000:
+            failures.append(f"{name} p50 {app[name]['p50']} ms exceeds {limit * 1000:.0f} ms")
+    if failures:
+        print("\n".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
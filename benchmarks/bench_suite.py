@@ -0,0 +1,288 @@
+"""Offline retrieval-quality and latency benchmark suite.
+
+Measures, against the current vector store:
+  - recall@k and MRR over the labeled queries in benchmarks/queries.jsonl,
+    for the app's retriever and for plain dense search
+  - per-stage latency percentiles of create_enhanced_rag_response, answered
+    by the deterministic fake LLM so no network access is needed
+  - ingestion throughput (pages/sec), re-ingesting data/ into a temporary store
+  - index size on disk
+
+Results are written as JSON (by default benchmarks/results/<commit>.json) so
+runs can be compared across commits:
+    python -m benchmarks.bench_suite
+    python -m benchmarks.bench_suite --skip-ingestion --compare benchmarks/results/abc1234.json
+
+A query's labels list the source PDFs that answer it and text that a relevant
+chunk must contain; a retrieved chunk counts as a hit when both match.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import tempfile
+import time
+
+from benchmarks.stats import percentiles
+from fake_llm import FakeLegalChatModel
+from index_versions import resolve_index_dir
+from ingest import DATA_DIR, ingest
+from lexical_index import LEXICAL_INDEX_DIRNAME
+from page_cache import PAGE_CACHE_DIR
+from reranker import RERANK_ENABLED
+from retrievers import build_retriever
+from statutes import STATUTE_INDEX_FILENAME
+from utils import (
+    CHROMA_DIR,
+    EMBEDDING_BACKEND,
+    EMBEDDING_MODEL_NAME,
+    create_enhanced_rag_response,
+    load_vector_store,
+)
+
+QUERIES_PATH = os.path.join(os.path.dirname(__file__), "queries.jsonl")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+RECALL_KS = (1, 3, 5, 10)
+
+
+def load_queries(path=QUERIES_PATH):
+    """Load the labeled query set"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _normalize(text):
+    return re.sub(r"\s+", " ", text).lower()
+
+
+def is_relevant(doc, label):
+    """Return True if a retrieved document satisfies one relevance label"""
+    source = os.path.basename((doc.metadata or {}).get("source", ""))
+    if source not in label["sources"]:
+        return False
+    text = _normalize(doc.page_content)
+    return any(_normalize(fragment) in text for fragment in label["contains"])
+
+
+def evaluate_retriever(retriever, queries):
+    """Return recall@k, MRR, latency and the first relevant rank per query"""
+    recall = {k: [] for k in RECALL_KS}
+    reciprocal_ranks, latencies, ranks = [], [], {}
+    for item in queries:
+        start = time.perf_counter()
+        docs = retriever.invoke(item["query"])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        first_rank = None
+        found_at = []
+        for label in item["relevant"]:
+            rank = next((i + 1 for i, doc in enumerate(docs) if is_relevant(doc, label)), None)
+            found_at.append(rank)
+            if rank is not None and (first_rank is None or rank < first_rank):
+                first_rank = rank
+        for k in RECALL_KS:
+            recall[k].append(sum(1 for rank in found_at if rank is not None and rank <= k) / len(found_at))
+        reciprocal_ranks.append(1.0 / first_rank if first_rank else 0.0)
+        ranks[item["id"]] = first_rank
+
+    results = {f"recall@{k}": round(statistics.fmean(values), 4) for k, values in recall.items()}
+    results["mrr"] = round(statistics.fmean(reciprocal_ranks), 4)
+    results["latency_ms"] = percentiles(latencies)
+    results["first_relevant_rank"] = ranks
+    return results
+
+
+class _Timed:
+    """Proxy recording how long each invoke() of the wrapped object takes"""
+
+    def __init__(self, target):
+        self.target = target
+        self.timings = []
+
+    def invoke(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self.target.invoke(*args, **kwargs)
+        finally:
+            self.timings.append((time.perf_counter() - start) * 1000)
+
+
+def measure_pipeline(retriever, queries, rounds):
+    """Time each stage of create_enhanced_rag_response with a zero-latency fake LLM"""
+    timed_retriever = _Timed(retriever)
+    timed_llm = _Timed(FakeLegalChatModel(first_token_latency=0.0, token_latency=0.0))
+    totals, prompt_tokens = [], []
+    for _ in range(rounds):
+        for item in queries:
+            start = time.perf_counter()
+            response = create_enhanced_rag_response(timed_retriever, item["query"], llm=timed_llm)
+            totals.append((time.perf_counter() - start) * 1000)
+            prompt_tokens.append(response["prompt_tokens"])
+
+    other = [total - retrieval - llm
+             for total, retrieval, llm in zip(totals, timed_retriever.timings, timed_llm.timings)]
+    return {
+        "requests": len(totals),
+        "retrieval_ms": percentiles(timed_retriever.timings),
+        "llm_ms": percentiles(timed_llm.timings),
+        "prompt_and_references_ms": percentiles(other),
+        "total_ms": percentiles(totals),
+        "prompt_tokens_mean": round(statistics.fmean(prompt_tokens), 1),
+    }
+
+
+def measure_ingestion(data_dir, embedding_cache, page_cache):
+    """Ingest data_dir from scratch into a temporary store and return throughput"""
+    with tempfile.TemporaryDirectory() as persist_directory:
+        start = time.perf_counter()
+        manifest = ingest(data_dir=data_dir, persist_directory=persist_directory, full=True,
+                          embedding_cache=embedding_cache, page_cache_dir=PAGE_CACHE_DIR if page_cache else None)
+        seconds = time.perf_counter() - start
+    files = manifest["files"].values()
+    pages = sum(entry["pages"] for entry in files)
+    return {
+        "files": len(files),
+        "pages": pages,
+        "chunks": sum(entry["chunks"] for entry in files),
+        "seconds": round(seconds, 2),
+        "pages_per_sec": round(pages / seconds, 2) if seconds else None,
+        "embedding_cache": embedding_cache,
+        "page_cache": page_cache,
+    }
+
+
+def _size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, files in os.walk(path) for name in files)
+
+
+def measure_index(vector_store, persist_directory):
+    """Return chunk count and on-disk size of each index under persist_directory"""
+    mb = lambda size: round(size / (1024 * 1024), 2)
+    lexical = _size(os.path.join(persist_directory, LEXICAL_INDEX_DIRNAME))
+    statute_path = os.path.join(persist_directory, STATUTE_INDEX_FILENAME)
+    statute = _size(statute_path) if os.path.exists(statute_path) else 0
+    total = _size(persist_directory)
+    return {
+        "chunks": vector_store._collection.count(),
+        "total_mb": mb(total),
+        "vector_store_mb": mb(total - lexical - statute),
+        "lexical_index_mb": mb(lexical),
+        "statute_index_mb": mb(statute),
+    }
+
+
+def git_commit():
+    """Return the short commit hash, marked -dirty with uncommitted changes"""
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=repo, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=repo,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("-dirty" if dirty else "")
+
+
+def _flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        if key == "first_relevant_rank":
+            continue
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(results, baseline, baseline_path):
+    """Print every numeric metric next to its value in a baseline run"""
+    baseline = _flatten(baseline)
+    print(f"\nCompared with {baseline_path}:")
+    for key, value in _flatten(results).items():
+        if key in baseline:
+            print(f"  {key:50s} {baseline[key]:>10} -> {value:>10}  ({value - baseline[key]:+.4g})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline retrieval and latency benchmark suite")
+    parser.add_argument("--persist-dir", default=CHROMA_DIR)
+    parser.add_argument("--data-dir", default=DATA_DIR, help="PDFs re-ingested for the ingestion benchmark")
+    parser.add_argument("--queries", default=QUERIES_PATH)
+    parser.add_argument("--rounds", type=int, default=3, help="passes over the queries for stage latency")
+    parser.add_argument("--skip-ingestion", action="store_true", help="skip the (slow) ingestion benchmark")
+    parser.add_argument("--embedding-cache", action="store_true",
+                        help="let the ingestion benchmark reuse cached chunk embeddings")
+    parser.add_argument("--page-cache", action="store_true",
+                        help="let the ingestion benchmark reuse cached PDF page text")
+    parser.add_argument("--rerank", action="store_true", help="add the cross-encoder rerank stage (same as RERANK=1)")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries)
+    baseline = None
+    if args.compare:
+        # Read before writing, in case the output overwrites the baseline
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    persist_dir = resolve_index_dir(args.persist_dir)
+    vector_store = load_vector_store(persist_dir)
+
+    results = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "embedding_model": EMBEDDING_MODEL_NAME,
+            "embedding_backend": EMBEDDING_BACKEND,
+            "queries": len(queries),
+            "rerank": bool(args.rerank or RERANK_ENABLED),
+        },
+    }
+
+    print(f"Evaluating retrieval on {len(queries)} labeled queries")
+    retriever = build_retriever(vector_store, persist_dir, rerank=args.rerank or None)
+    dense_retriever = vector_store.as_retriever(search_kwargs={"k": max(RECALL_KS)})
+    # Warm up models and caches so the first query does not skew latency
+    retriever.invoke(queries[0]["query"])
+    results["retrieval"] = {
+        "pipeline": evaluate_retriever(retriever, queries),
+        "dense": evaluate_retriever(dense_retriever, queries),
+    }
+
+    print("Measuring answer pipeline stage latency (fake LLM)")
+    results["latency"] = measure_pipeline(retriever, queries, args.rounds)
+    results["index"] = measure_index(vector_store, persist_dir)
+
+    if not args.skip_ingestion:
+        print(f"Measuring ingestion throughput on {args.data_dir}")
+        results["ingestion"] = measure_ingestion(args.data_dir, args.embedding_cache, args.page_cache)
+
+    for name, metrics in results["retrieval"].items():
+        summary = "  ".join(f"{key} {value}" for key, value in metrics.items() if key.startswith(("recall", "mrr")))
+        print(f"{name:10s} {summary}  p50 {metrics['latency_ms']['p50']}ms")
+    latency = results["latency"]
+    print(f"stages p50 ms: retrieval {latency['retrieval_ms']['p50']}  llm {latency['llm_ms']['p50']}  "
+          f"prompt+references {latency['prompt_and_references_ms']['p50']}  total {latency['total_ms']['p50']}")
+    print(f"index {results['index']}")
+    if "ingestion" in results:
+        print(f"ingestion {results['ingestion']}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{results['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if baseline is not None:
+        compare(results, baseline, args.compare)
+
+
+if __name__ == "__main__":
+    main()
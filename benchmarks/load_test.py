@@ -0,0 +1,94 @@
+"""Concurrent load test for the HTTP service in api.py.
+
+Start the service (offline: ``LLM_BACKEND=fake uvicorn api:app``), then:
+    python -m benchmarks.load_test --endpoint /ask --requests 200 --concurrency 20
+
+Reports throughput and p50/p95/p99 latency; for /ask/stream it also reports
+time to first token.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from benchmarks.stats import percentiles
+
+QUESTIONS = [
+    "What are my rights if I am arrested in India?",
+    "Explain Article 21 of the Indian Constitution",
+    "What is the punishment for murder under Section 103 BNS?",
+    "What is the legal age of marriage in India?",
+    "Can the government restrict freedom of speech in India?",
+    "Is it legal to protest in public in India?",
+    "What are the laws regarding property inheritance in India?",
+    "What is anticipatory bail?",
+]
+
+
+async def one_request(client, endpoint, question, unique):
+    """Send one request and return (latency, time_to_first_token, ok)"""
+    if unique:
+        # Defeat the answer cache so every request exercises the full pipeline
+        question = f"{question} (request {time.perf_counter_ns()})"
+    payload = {"question": question}
+    start = time.perf_counter()
+    first_token = None
+    try:
+        if endpoint == "/ask/stream":
+            async with client.stream("POST", endpoint, json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if first_token is None and line and json.loads(line)["type"] == "token":
+                        first_token = time.perf_counter() - start
+        else:
+            response = await client.post(endpoint, json=payload)
+            response.raise_for_status()
+    except httpx.HTTPError:
+        return time.perf_counter() - start, first_token, False
+    return time.perf_counter() - start, first_token, True
+
+
+async def run(base_url, endpoint, total, concurrency, unique):
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        async def bounded(i):
+            async with semaphore:
+                return await one_request(client, endpoint, QUESTIONS[i % len(QUESTIONS)], unique)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(bounded(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies = percentiles([latency * 1000 for latency, _, ok in results if ok])
+    first_tokens = percentiles([ttft * 1000 for _, ttft, ok in results if ok and ttft is not None])
+    succeeded = sum(1 for _, _, ok in results if ok)
+    errors = sum(1 for _, _, ok in results if not ok)
+
+    print(f"endpoint      {endpoint}")
+    print(f"requests      {total} ({errors} errors), concurrency {concurrency}")
+    print(f"throughput    {succeeded / elapsed:.2f} req/s")
+    if latencies:
+        print(f"latency ms    p50 {latencies['p50']:.0f}  p95 {latencies['p95']:.0f}  p99 {latencies['p99']:.0f}")
+    if first_tokens:
+        print(f"first token   p50 {first_tokens['p50']:.0f}  p95 {first_tokens['p95']:.0f}  "
+              f"p99 {first_tokens['p99']:.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the legal assistant API")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", default="/ask", choices=["/ask", "/ask/stream", "/retrieve"])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--unique", action="store_true", help="make every question unique to bypass the answer cache")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.base_url, args.endpoint, args.requests, args.concurrency, args.unique))
+
+
+if __name__ == "__main__":
+    main()
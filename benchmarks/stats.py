@@ -0,0 +1,12 @@
+"""Summary statistics shared by the benchmarks, kept free of the app's dependencies"""
+import statistics
+
+
+def percentiles(values, digits=2):
+    """Return p50/p95/p99 and the mean of a list of measurements, e.g. milliseconds"""
+    if not values:
+        return {}
+    values = sorted(values)
+    pick = lambda pct: values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+    return {"p50": round(pick(50), digits), "p95": round(pick(95), digits), "p99": round(pick(99), digits),
+            "mean": round(statistics.fmean(values), digits)}
@@ -0,0 +1,201 @@
+"""Token-budgeted chat history with a rolling summary.
+
+Formatting the whole conversation into every prompt makes prompt size, cost
+and latency grow linearly with the conversation. ``ChatHistoryManager`` keeps
+the most recent turns verbatim and, once the history would exceed its token
+budget, folds older turns into a running summary. The summary is kept on the
+manager and only extended with the turns that newly fell out of the window,
+so each turn costs at most one small summarization call.
+
+Summaries are also cached in ``cache/history_summaries.sqlite3``, keyed by a
+hash of the messages they cover. A manager created per request, as the API
+does for the history a client sends, picks up the summary of the longest
+cached prefix of the conversation and only summarizes the turns after it.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from utils import CACHE_DIR, count_tokens, get_llm
+
+logger = logging.getLogger(__name__)
+
+HISTORY_SUMMARIES_PATH = os.path.join(CACHE_DIR, "history_summaries.sqlite3")
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and an Indian legal assistant.
+Update the summary with the new messages below. Keep the facts of the user's situation, the legal
+provisions, sections, articles and cases discussed, and any open questions. Write at most {max_words} words.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}
+
+Updated summary:"""
+
+
+def format_messages(messages):
+    """Format chat messages as the "Human:/Assistant:" transcript used in prompts"""
+    chat_history = ""
+    for msg in messages:
+        role = "Human" if msg["role"] == "user" else "Assistant"
+        chat_history += f"{role}: {msg['content']}\n\n"
+    return chat_history
+
+
+def prefix_keys(messages, summary_max_words):
+    """Return one key per prefix of messages: keys[i] identifies messages[:i + 1]"""
+    keys = []
+    digest = hashlib.sha256(f"summary:{summary_max_words}".encode("utf-8")).hexdigest()
+    for msg in messages:
+        # Chained, so each prefix is hashed once however long the conversation gets
+        digest = hashlib.sha256(f"{digest}\n{msg['role']}\n{msg['content']}".encode("utf-8")).hexdigest()
+        keys.append(digest)
+    return keys
+
+
+class SummaryCache:
+    """Persistent map from a conversation prefix (see prefix_keys) to its summary"""
+
+    def __init__(self, path=HISTORY_SUMMARIES_PATH, max_entries=20000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS summaries (
+                prefix_key TEXT PRIMARY KEY,
+                message_count INTEGER NOT NULL,
+                summary TEXT NOT NULL,
+                last_used_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def longest(self, keys):
+        """Return (message_count, summary) for the longest prefix in keys that is cached, or None"""
+        if not keys:
+            return None
+        with self._lock:
+            # Bounded by SQLite's variable limit; older prefixes are not worth looking up
+            keys = keys[-500:]
+            row = self._conn.execute(
+                "SELECT prefix_key, message_count, summary FROM summaries "
+                f"WHERE prefix_key IN ({', '.join('?' * len(keys))}) ORDER BY message_count DESC LIMIT 1",
+                keys,
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE summaries SET last_used_at = ? WHERE prefix_key = ?", (time.time(), row[0]))
+            self._conn.commit()
+        return row[1], row[2]
+
+    def put(self, key, message_count, summary):
+        """Cache a summary, evicting least-recently-used entries beyond max_entries"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (prefix_key, message_count, summary, last_used_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, message_count, summary, time.time()),
+            )
+            self._conn.execute(
+                "DELETE FROM summaries WHERE rowid NOT IN "
+                "(SELECT rowid FROM summaries ORDER BY last_used_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+
+_summary_cache = None
+_summary_cache_lock = threading.Lock()
+
+
+def get_summary_cache():
+    """Return the process-wide chat history summary cache"""
+    global _summary_cache
+    if _summary_cache is None:
+        with _summary_cache_lock:
+            if _summary_cache is None:
+                _summary_cache = SummaryCache()
+    return _summary_cache
+
+
+class ChatHistoryManager:
+    """Renders chat history for the prompt within a fixed token budget"""
+
+    def __init__(self, max_tokens=1500, keep_last_turns=3, summary_max_words=150, llm=None, summary_cache=None):
+        self.max_tokens = max_tokens
+        self.keep_last_messages = keep_last_turns * 2
+        self.summary_max_words = summary_max_words
+        self.llm = llm
+        self.summary_cache = summary_cache
+        self.summary = ""
+        self.summarized_count = 0
+
+    def reset(self):
+        """Forget the rolling summary, e.g. when the chat is cleared"""
+        self.summary = ""
+        self.summarized_count = 0
+
+    def _transcript(self, pending):
+        text = format_messages(pending)
+        if self.summary:
+            text = f"Summary of earlier conversation: {self.summary}\n\n" + text
+        return text
+
+    def _restore(self, messages, keys):
+        """Start from the cached summary of the longest prefix still outside the verbatim window"""
+        folded = len(messages) - self.keep_last_messages
+        cached = (self.summary_cache or get_summary_cache()).longest(keys[:folded])
+        if cached is not None:
+            self.summarized_count, self.summary = cached
+
+    def _fold(self, messages, key):
+        """Extend the rolling summary with messages that left the verbatim window"""
+        llm = self.llm or get_llm()
+        prompt = SUMMARY_PROMPT.format(
+            max_words=self.summary_max_words,
+            summary=self.summary or "(none)",
+            messages=format_messages(messages),
+        )
+        try:
+            self.summary = llm.invoke(prompt).content.strip()
+        except Exception as e:
+            # Losing old turns is better than failing the user's question
+            logger.warning("Chat history summarization failed, dropping %d messages: %s", len(messages), e)
+            return
+        (self.summary_cache or get_summary_cache()).put(key, self.summarized_count + len(messages), self.summary)
+
+    def render(self, messages):
+        """Return the prompt transcript for messages (oldest first) within the token budget"""
+        if len(messages) < self.summarized_count:
+            self.reset()
+
+        keys = None
+        if not self.summarized_count and len(messages) > self.keep_last_messages:
+            keys = prefix_keys(messages, self.summary_max_words)
+            self._restore(messages, keys)
+
+        pending = list(messages[self.summarized_count:])
+        window_start = max(0, len(pending) - self.keep_last_messages)
+        if window_start and count_tokens(self._transcript(pending)) > self.max_tokens:
+            keys = keys or prefix_keys(messages, self.summary_max_words)
+            self._fold(pending[:window_start], keys[self.summarized_count + window_start - 1])
+            self.summarized_count += window_start
+            pending = pending[window_start:]
+
+        transcript = self._transcript(pending)
+        while count_tokens(transcript) > self.max_tokens and pending:
+            # The recent turns alone are too long: halve the longest message until they fit
+            longest = max(range(len(pending)), key=lambda i: len(pending[i]["content"]))
+            content = pending[longest]["content"]
+            if len(content) < 200:
+                break
+            pending[longest] = dict(pending[longest], content=content[:len(content) // 2] + " ...")
+            transcript = self._transcript(pending)
+        return transcript
@@ -0,0 +1,98 @@
+"""Structured citations in the answer stream.
+
+The answer prompt numbers each context passage and asks the model to end its
+answer with one block such as::
+
+    <citations>{"chunks": [1, 3], "provisions": ["Section 103 BNS"]}</citations>
+
+so the answer and what it cites arrive in a single LLM call.
+``CitationStreamParser`` splits a streamed answer into the visible text, which
+can be shown token by token, and this trailing block.
+"""
+import json
+import re
+
+CITATIONS_OPEN = "<citations>"
+CITATIONS_CLOSE = "</citations>"
+INLINE_CITATION_PATTERN = re.compile(r"\[(\d{1,2})\]")
+
+CITATION_INSTRUCTIONS = f"""Cite the numbered context passages you rely on inline, e.g. [2].
+After your answer, on a new line, write exactly one citations block and nothing after it:
+{CITATIONS_OPEN}{{"chunks": [numbers of the passages you used], "provisions": ["sections, articles or cases you cited from general knowledge"]}}{CITATIONS_CLOSE}
+Use empty lists if you cited nothing."""
+
+
+def parse_citations(block):
+    """Parse the JSON inside a citations block, returning {"chunks": [...], "provisions": [...]}"""
+    citations = {"chunks": [], "provisions": []}
+    match = re.search(r"\{.*\}", block or "", re.DOTALL)
+    if not match:
+        return citations
+    try:
+        data = json.loads(match.group(0))
+    except ValueError:
+        return citations
+    if not isinstance(data, dict):
+        return citations
+    for number in data.get("chunks") or []:
+        try:
+            citations["chunks"].append(int(number))
+        except (TypeError, ValueError):
+            continue
+    citations["provisions"] = [str(item) for item in data.get("provisions") or [] if item]
+    return citations
+
+
+class CitationStreamParser:
+    """Separates the visible answer from the trailing citations block as tokens arrive"""
+
+    def __init__(self):
+        self.pending = ""
+        self.block = None
+
+    def feed(self, text):
+        """Add streamed text and return the part that is safe to show"""
+        if self.block is not None:
+            self.block += text
+            return ""
+        self.pending += text
+        start = self.pending.find(CITATIONS_OPEN)
+        if start >= 0:
+            visible = self.pending[:start]
+            self.block = self.pending[start + len(CITATIONS_OPEN):]
+            self.pending = ""
+            return visible
+        # Hold back a suffix that may be the beginning of the opening tag
+        held = 0
+        for size in range(min(len(CITATIONS_OPEN) - 1, len(self.pending)), 0, -1):
+            if CITATIONS_OPEN.startswith(self.pending[-size:]):
+                held = size
+                break
+        visible = self.pending[:len(self.pending) - held]
+        self.pending = self.pending[len(self.pending) - held:]
+        return visible
+
+    def finish(self):
+        """Return (remaining visible text, parsed citations) once the stream has ended"""
+        visible, self.pending = self.pending, ""
+        block = (self.block or "").split(CITATIONS_CLOSE, 1)[0]
+        return visible, parse_citations(block)
+
+
+def split_citations(text):
+    """Split a complete model response into (answer, citations)"""
+    parser = CitationStreamParser()
+    visible = parser.feed(text)
+    rest, citations = parser.finish()
+    return (visible + rest).strip(), citations
+
+
+def cited_chunks(answer, citations, count):
+    """Return the 1-based passage numbers cited in the block or inline, in citation order"""
+    numbers = list(citations["chunks"])
+    numbers.extend(int(number) for number in INLINE_CITATION_PATTERN.findall(answer))
+    seen = []
+    for number in numbers:
+        if 1 <= number <= count and number not in seen:
+            seen.append(number)
+    return seen
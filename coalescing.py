@@ -0,0 +1,225 @@
+"""Single-flight coalescing of identical questions answered at the same time.
+
+When news breaks, many users ask the same question within seconds. The first
+request for a key (normalized question, language, index version) starts the
+answer pipeline. Duplicates that arrive while it is still running subscribe to
+its events instead of embedding, retrieving and calling the LLM again.
+Streaming subscribers replay the tokens produced so far and then follow the
+live stream. Once the answer is complete the flight ends, and later duplicates
+are served by the semantic answer cache.
+
+Only standalone questions are coalesced, since chat history changes the answer.
+The pipeline runs apart from the request that started it, so one client
+disconnecting does not fail the others waiting on it. Flights and coalesced
+requests are counted in the ``/metrics`` counters and in ``stats()``.
+"""
+import asyncio
+import threading
+
+import tracing
+from answer_cache import normalize_question
+
+
+def flight_key(question, chat_history, language, index_version=None):
+    """Return the key identical requests share, or None if the request must run on its own"""
+    if chat_history:
+        return None
+    return normalize_question(question), language, index_version
+
+
+class _Flight:
+    """One answer in flight and the events it has produced so far"""
+
+    def __init__(self, condition):
+        self.condition = condition
+        self.events = []
+        self.finished = False
+        self.error = None
+
+
+def _follower_event(event):
+    # Marks answers a request received from another request's flight
+    return dict(event, coalesced=True) if event.get("type") == "done" else event
+
+
+def _done_result(events):
+    for event in events:
+        if event.get("type") == "done":
+            return {key: value for key, value in event.items() if key != "type"}
+    raise RuntimeError("Coalesced answer ended without a result")
+
+
+class _SingleFlightBase:
+    def __init__(self):
+        self._flights = {}
+        self.flights = 0
+        self.coalesced = 0
+
+    def _record(self, mode, leader):
+        if leader:
+            self.flights += 1
+            tracing.metrics.increment(f"{tracing.METRIC_PREFIX}_answer_flights_total", {"mode": mode})
+        else:
+            self.coalesced += 1
+            tracing.metrics.increment(f"{tracing.METRIC_PREFIX}_coalesced_requests_total", {"mode": mode})
+
+    def stats(self):
+        """Return the number of flights started, requests coalesced onto them and flights running"""
+        return {"flights": self.flights, "coalesced": self.coalesced, "in_flight": len(self._flights)}
+
+
+class SingleFlight(_SingleFlightBase):
+    """Coalesces identical answers across threads, e.g. Streamlit sessions.
+
+    produce is a zero-argument function returning an iterator of answer events
+    (see utils.stream_enhanced_rag_response); the leader's runs in a daemon thread.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+
+    def _join(self, key, produce, mode):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight(threading.Condition())
+        self._record(mode, leader)
+        if leader:
+            threading.Thread(target=self._pump, args=(key, flight, produce), name="answer-flight",
+                             daemon=True).start()
+        return flight, leader
+
+    def _pump(self, key, flight, produce):
+        try:
+            for event in produce():
+                with flight.condition:
+                    flight.events.append(event)
+                    flight.condition.notify_all()
+        except BaseException as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            with flight.condition:
+                flight.finished = True
+                flight.condition.notify_all()
+
+    def _subscribe(self, flight):
+        position = 0
+        while True:
+            with flight.condition:
+                flight.condition.wait_for(lambda: len(flight.events) > position or flight.finished)
+                events = flight.events[position:]
+                finished = flight.finished
+            position += len(events)
+            yield from events
+            if finished:
+                if flight.error is not None:
+                    raise flight.error
+                return
+
+    def stream(self, key, produce):
+        """Yield the answer events for key, joining a running flight if there is one"""
+        if key is None:
+            yield from produce()
+            return
+        flight, leader = self._join(key, produce, "stream")
+        for event in self._subscribe(flight):
+            yield event if leader else _follower_event(event)
+
+    def run(self, key, create):
+        """Return the answer for key; create() computes it if no flight is running"""
+        if key is None:
+            return create()
+
+        def produce():
+            result = create()
+            yield {"type": "token", "content": result["answer"]}
+            yield dict(result, type="done")
+
+        flight, leader = self._join(key, produce, "answer")
+        result = _done_result(self._subscribe(flight))
+        return result if leader else dict(result, coalesced=True)
+
+
+class AsyncSingleFlight(_SingleFlightBase):
+    """Coalesces identical answers on one event loop (api.py).
+
+    produce is a zero-argument function returning an async iterator of answer
+    events (see utils.astream_enhanced_rag_response); the leader's runs as its own task.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # Strong references, since the event loop only keeps weak ones to running tasks
+        self._tasks = set()
+
+    def _join(self, key, produce, mode):
+        flight = self._flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = self._flights[key] = _Flight(asyncio.Condition())
+            task = asyncio.create_task(self._pump(key, flight, produce))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        self._record(mode, leader)
+        return flight, leader
+
+    async def _pump(self, key, flight, produce):
+        try:
+            async for event in produce():
+                async with flight.condition:
+                    flight.events.append(event)
+                    flight.condition.notify_all()
+        except BaseException as e:
+            flight.error = e
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            async with flight.condition:
+                flight.finished = True
+                flight.condition.notify_all()
+
+    async def _subscribe(self, flight):
+        position = 0
+        while True:
+            async with flight.condition:
+                await flight.condition.wait_for(lambda: len(flight.events) > position or flight.finished)
+                events = flight.events[position:]
+                finished = flight.finished
+            position += len(events)
+            for event in events:
+                yield event
+            if finished:
+                if flight.error is not None:
+                    raise flight.error
+                return
+
+    async def stream(self, key, produce):
+        """Yield the answer events for key, joining a running flight if there is one"""
+        if key is None:
+            async for event in produce():
+                yield event
+            return
+        flight, leader = self._join(key, produce, "stream")
+        async for event in self._subscribe(flight):
+            yield event if leader else _follower_event(event)
+
+    async def run(self, key, create):
+        """Return the answer for key; create() computes it if no flight is running"""
+        if key is None:
+            return await create()
+
+        async def produce():
+            result = await create()
+            yield {"type": "token", "content": result["answer"]}
+            yield dict(result, type="done")
+
+        flight, leader = self._join(key, produce, "answer")
+        result = _done_result([event async for event in self._subscribe(flight)])
+        return result if leader else dict(result, coalesced=True)
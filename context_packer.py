@@ -0,0 +1,119 @@
+"""Context assembly: choose which retrieved chunks go into the prompt.
+
+Retrieval over-fetches candidates; the packer orders them by maximal marginal
+relevance over their stored embeddings, drops near-duplicates, merges chunks
+that overlap on the same page (the splitter overlaps neighbours by 150-200
+characters) and stops adding chunks once the context token budget is spent.
+"""
+import os
+
+import numpy as np
+
+from utils import count_tokens
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1800"))
+
+
+def mmr_order(query_embedding, embeddings, lambda_mult=0.7, duplicate_threshold=0.95, relevance=None):
+    """Return candidate indices in maximal-marginal-relevance order, skipping near-duplicates.
+
+    relevance overrides the query similarity of each candidate, e.g. with
+    reranker scores in [0, 1].
+    """
+    if len(embeddings) == 0:
+        return []
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    if relevance is None:
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        relevance = matrix @ query
+    else:
+        relevance = np.asarray(relevance, dtype=np.float32)
+    # Highest similarity of each candidate to anything already selected
+    redundancy = np.full(len(matrix), -np.inf, dtype=np.float32)
+    remaining = np.ones(len(matrix), dtype=bool)
+    order = []
+    while remaining.any():
+        if order:
+            scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        else:
+            scores = relevance.copy()
+        scores[~remaining] = -np.inf
+        best = int(np.argmax(scores))
+        remaining[best] = False
+        if redundancy[best] >= duplicate_threshold:
+            continue
+        order.append(best)
+        redundancy = np.maximum(redundancy, matrix @ matrix[best])
+    return order
+
+
+def _span(doc):
+    """Return (source, page, start, end) for a chunk with a known position, else None"""
+    metadata = doc.metadata or {}
+    start = metadata.get("start_index")
+    if start is None or start < 0 or "source" not in metadata:
+        return None
+    return metadata["source"], metadata.get("page"), start, start + len(doc.page_content)
+
+
+def _merge_pair(first, second):
+    """Merge two overlapping chunks of the same page into one document"""
+    if _span(second)[2] < _span(first)[2]:
+        first, second = second, first
+    _, _, _, first_end = _span(first)
+    _, _, second_start, second_end = _span(second)
+    text = first.page_content
+    if second_end > first_end:
+        text += second.page_content[first_end - second_start:]
+    metadata = dict(first.metadata)
+    metadata["merged_chunks"] = first.metadata.get("merged_chunks", 1) + second.metadata.get("merged_chunks", 1)
+    return first.model_copy(update={"page_content": text, "metadata": metadata})
+
+
+def _find_overlap(merged, doc):
+    """Return the index of a merged chunk overlapping or touching doc on the same page, or None"""
+    span = _span(doc)
+    if span is None:
+        return None
+    for i, other in enumerate(merged):
+        other_span = _span(other)
+        if (other_span is not None and other_span[:2] == span[:2]
+                and span[2] <= other_span[3] and other_span[2] <= span[3]):
+            return i
+    return None
+
+
+def merge_adjacent(docs):
+    """Merge chunks that overlap or touch on the same page, keeping first-seen order"""
+    merged = []
+    for doc in docs:
+        position = len(merged)
+        target = _find_overlap(merged, doc)
+        # A merged chunk may reach further selected chunks, so keep merging
+        while target is not None:
+            position = min(position, target)
+            doc = _merge_pair(merged.pop(target), doc)
+            target = _find_overlap(merged, doc)
+        merged.insert(position, doc)
+    return merged
+
+
+def pack_context(pinned, candidates, max_tokens=CONTEXT_TOKEN_BUDGET, max_docs=6):
+    """Add pinned then candidate chunks, merged, until max_tokens or max_docs is reached.
+
+    Chunks that would overflow the budget are skipped so a smaller one further
+    down may still fit; the first chunk is always kept.
+    """
+    selected, packed = [], []
+    for doc in list(pinned) + list(candidates):
+        trial = merge_adjacent(selected + [doc])
+        tokens = sum(count_tokens(d.page_content) for d in trial)
+        if tokens > max_tokens and selected:
+            continue
+        selected.append(doc)
+        packed = trial
+        if len(packed) >= max_docs:
+            break
+    return packed
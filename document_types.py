@@ -0,0 +1,113 @@
+"""Document classification at ingestion and code detection in queries.
+
+Ingestion classifies each PDF once from its title page (many of the files are
+named only by a gazette number) and stores ``code``, ``document_type``,
+``year`` and ``document_name`` in every chunk's metadata. At query time
+``detect_query_code`` spots a question aimed at one code ("under the BNS",
+"Article 21", "Supreme Court judgments") so retrieval can restrict the
+vector and BM25 search to that code's chunks with a metadata filter.
+"""
+import os
+import re
+
+from statutes import CODE_ALIASES, CONSTITUTION
+
+SUPREME_COURT = "SC"
+
+# (code, document_type, display name, title pattern), checked in order against the
+# title page with whitespace removed and upper-cased ("BHARA TIY A" -> "BHARATIYA")
+DOCUMENT_RULES = [
+    (CONSTITUTION, "constitutional_amendment", "Constitution Amendment Act",
+     re.compile(r"CONSTITUTION\(\S{2,40}AMENDMENT\)ACT,?(\d{4})")),
+    (CONSTITUTION, "constitution", "Constitution of India",
+     re.compile(r"THECONSTITUTIONOFINDIA(?:\[ASON[^\]]*?(\d{4})\])?")),
+    ("BNSS", "bare_act", "Bharatiya Nagarik Suraksha Sanhita (BNSS) 2024",
+     re.compile(r"BHARATIYANAGARIKSURAKSHASANHITA,?(\d{4})?")),
+    ("BNS", "bare_act", "Bharatiya Nyaya Sanhita (BNS) 2024",
+     re.compile(r"BHARATIYANYAYASANHITA,?(\d{4})?")),
+    ("BSA", "bare_act", "Bharatiya Sakshya Adhiniyam (BSA) 2024",
+     re.compile(r"BHARATIYASAKSHYAADHINIYAM,?(\d{4})?")),
+    ("IPC", "bare_act", "Indian Penal Code (IPC) 1860",
+     re.compile(r"INDIANPENALCODE,?(\d{4})?")),
+    ("CrPC", "bare_act", "Code of Criminal Procedure (CrPC) 1973",
+     re.compile(r"CODEOFCRIMINALPROCEDURE,?(\d{4})?")),
+    (SUPREME_COURT, "case_law", "Supreme Court Judgments",
+     re.compile(r"SUPREMECOURT")),
+]
+# Where the title does not give a year
+DEFAULT_YEARS = {"IPC": 1860, "CrPC": 1973, "BNS": 2023, "BNSS": 2023, "BSA": 2023}
+# Characters of the first page searched for the title
+TITLE_CHARS = 160
+# Pages searched when the first page is a gazette cover or has no readable title
+TITLE_PAGES = 3
+GAZETTE_COVER = "PUBLISHEDBYAUTHORITY"
+MIN_TITLE_CHARS = 40
+YEAR_PATTERN = re.compile(r"\b(1[89]\d{2}|20\d{2})\b")
+
+
+def _match_rules(text):
+    for code, document_type, name, pattern in DOCUMENT_RULES:
+        match = pattern.search(text)
+        if match:
+            year = int(match.group(1)) if match.groups() and match.group(1) else DEFAULT_YEARS.get(code)
+            return code, document_type, name, year
+    return None
+
+
+def classify_document(pdf_path, page_texts):
+    """Return code, document_type, year and document_name metadata for a PDF.
+
+    The title at the top of the first page decides, then the filename. Only
+    when the first page is a gazette cover or unreadable are the next pages
+    searched, since elsewhere they mention other codes in passing.
+    """
+    squeeze = lambda text: re.sub(r"\s+", "", text or "").upper()
+    first_page = page_texts[0] if page_texts else ""
+    head = squeeze(first_page)[:TITLE_CHARS]
+    found = (_match_rules(head)
+             or _match_rules(squeeze(os.path.splitext(os.path.basename(pdf_path))[0].replace("-", " "))))
+    if found is None and (GAZETTE_COVER in head or len(head) < MIN_TITLE_CHARS):
+        found = _match_rules(squeeze(" ".join(page_texts[:TITLE_PAGES])))
+    if found is None:
+        year = YEAR_PATTERN.search(first_page[:1000])
+        metadata = {"document_type": "other", "document_name": "Legal Document"}
+        if year:
+            metadata["year"] = int(year.group(1))
+        return metadata
+
+    code, document_type, name, year = found
+    metadata = {"code": code, "document_type": document_type, "document_name": name}
+    if year:
+        metadata["year"] = year
+    return metadata
+
+
+_CODE_ALTERNATION = "|".join(
+    re.escape(alias).replace(r"\ ", r"\s+") for alias in sorted(CODE_ALIASES, key=len, reverse=True)
+)
+QUERY_CODE_PATTERNS = [
+    (None, re.compile(rf"\b({_CODE_ALTERNATION}|penal\s+code)\b", re.IGNORECASE)),
+    (CONSTITUTION, re.compile(r"\b(constitution(al)?|articles?\s+\d|art\.\s*\d|fundamental\s+rights?|"
+                              r"directive\s+principles?)", re.IGNORECASE)),
+    (SUPREME_COURT, re.compile(r"\b(supreme\s+court|apex\s+court|sc\s+(judgments?|rulings?|cases?)|"
+                               r"landmark\s+(cases?|judgments?)|case\s+laws?|precedents?)\b", re.IGNORECASE)),
+]
+
+
+def detect_query_code(query):
+    """Return the one code a query targets, or None if it names none or several"""
+    codes = set()
+    for code, pattern in QUERY_CODE_PATTERNS:
+        for match in pattern.finditer(query):
+            if code is not None:
+                codes.add(code)
+                continue
+            alias = re.sub(r"\s+", " ", match.group(1).lower())
+            codes.add(CODE_ALIASES.get(alias, "IPC"))
+    return codes.pop() if len(codes) == 1 else None
+
+
+def code_filter(query):
+    """Return a Chroma metadata filter restricting search to the code a query targets, or None"""
+    code = detect_query_code(query)
+    return {"code": code} if code else None
@@ -0,0 +1,92 @@
+"""Alternative embedding backends and the on-disk embedding cache.
+
+The default backend (``utils.get_embeddings_model`` with "huggingface") runs
+all-MiniLM-L6-v2 through the full PyTorch stack. The backends here load the
+same model through ONNX Runtime instead, either as the exported float32 graph
+("onnx") or the int8-quantized one ("onnx-int8"), with explicit thread counts
+and large encode batches for ingestion.
+
+``with_embedding_cache`` wraps any backend in a content-addressed cache keyed
+on the model, backend and chunk text, so re-chunking or re-ingesting unchanged
+text never re-encodes it.
+"""
+import os
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from utils import CACHE_DIR, EMBEDDING_BATCH_SIZE, EMBEDDING_MODEL_NAME
+
+EMBEDDING_CACHE_DIR = os.path.join(CACHE_DIR, "embeddings")
+
+# ONNX graphs shipped in the sentence-transformers model repository
+ONNX_FILES = {
+    "onnx": "onnx/model.onnx",
+    "onnx-int8": os.getenv("EMBEDDING_ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx"),
+}
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """Normalized sentence-transformers embeddings with a configurable runtime"""
+
+    def __init__(self, model_name=EMBEDDING_MODEL_NAME, backend="onnx",
+                 batch_size=EMBEDDING_BATCH_SIZE, num_threads=None):
+        from sentence_transformers import SentenceTransformer
+
+        num_threads = num_threads or int(os.getenv("EMBEDDING_THREADS", "0")) or os.cpu_count() or 1
+        self.batch_size = batch_size
+
+        if backend in ONNX_FILES:
+            import onnxruntime
+
+            session_options = onnxruntime.SessionOptions()
+            session_options.intra_op_num_threads = num_threads
+            session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self.model = SentenceTransformer(
+                model_name,
+                device="cpu",
+                backend="onnx",
+                model_kwargs={
+                    "file_name": ONNX_FILES[backend],
+                    "provider": "CPUExecutionProvider",
+                    "session_options": session_options,
+                },
+            )
+        else:
+            raise ValueError(f"Unknown embedding backend: {backend}")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def create_embeddings_backend(backend):
+    """Return the embeddings implementation for a backend name"""
+    return SentenceTransformerEmbeddings(backend=backend)
+
+
+def with_embedding_cache(embeddings, backend, cache_dir=EMBEDDING_CACHE_DIR):
+    """Wrap embeddings in a content-addressed on-disk cache.
+
+    The namespace includes the backend because quantized and float32 vectors
+    differ slightly and must not be mixed in one cache.
+    """
+    from langchain.embeddings import CacheBackedEmbeddings
+    from langchain.storage import LocalFileStore
+
+    store = LocalFileStore(cache_dir)
+    return CacheBackedEmbeddings.from_bytes_store(
+        embeddings,
+        store,
+        namespace=f"{EMBEDDING_MODEL_NAME}/{backend}/",
+        batch_size=EMBEDDING_BATCH_SIZE * 4,
+    )
@@ -0,0 +1,72 @@
+"""Deterministic offline chat model for load tests and benchmarks.
+
+Selected with ``LLM_BACKEND=fake``. It produces a fixed-shape answer that
+echoes the question and ends with a citations block, sleeps to imitate
+time-to-first-token and per-token generation latency, and streams word by
+word, so the API and benchmarks can be exercised without network access or
+an OpenAI key.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class FakeLegalChatModel(BaseChatModel):
+    """Chat model returning a deterministic answer with configurable latency"""
+
+    first_token_latency: float = float(os.getenv("FAKE_LLM_FIRST_TOKEN_LATENCY", "0.3"))
+    token_latency: float = float(os.getenv("FAKE_LLM_TOKEN_LATENCY", "0.01"))
+    answer_words: int = 60
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-legal"
+
+    def _answer_tokens(self, messages: List[BaseMessage]) -> List[str]:
+        prompt = messages[-1].content if messages else ""
+        question = prompt.rsplit("Question:", 1)[-1].strip()[:200]
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+        words = [f"[offline answer {digest}]", "Regarding:", *question.split()]
+        filler = "Under Indian law this depends on the facts and the applicable provisions .".split()
+        while len(words) < self.answer_words:
+            words.extend(filler)
+        tokens = [word + " " for word in words[:self.answer_words]]
+        # Cite the first context passage, if any, in the same format as a real answer
+        cited = [1] if "\n[1] (" in prompt else []
+        if cited:
+            tokens.append("[1]")
+        tokens.extend(["\n<cit", "ations>", json.dumps({"chunks": cited, "provisions": []}), "</citations>"])
+        return tokens
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        tokens = self._answer_tokens(messages)
+        time.sleep(self.first_token_latency + self.token_latency * len(tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        tokens = self._answer_tokens(messages)
+        await asyncio.sleep(self.first_token_latency + self.token_latency * len(tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.first_token_latency)
+        for token in self._answer_tokens(messages):
+            time.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.first_token_latency)
+        for token in self._answer_tokens(messages):
+            await asyncio.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
@@ -0,0 +1,310 @@
+"""Memory-mapped flat vector index exported from the Chroma collection.
+
+For a corpus of a few tens of thousands of 384-dim vectors, exact search over
+a flat array is fast, and opening a few memory-mapped files is much cheaper
+than starting a Chroma persistent client. Because every file is mapped
+read-only, Streamlit and API worker processes on one machine share the same
+pages through the OS page cache instead of each holding a private copy.
+
+``python flat_index.py`` snapshots the collection into
+``chroma_db/flat_index/``:
+
+- ``vectors.npy``: float16 vectors, or int8 with per-vector ``scales.npy``
+- ``norms.npy``: squared vector norms, for exact L2 distances
+- ``ids.bin``/``texts.bin`` with ``*_offsets.npy``: UTF-8 blobs
+- ``columns/<n>.npy`` with ``meta.json``: metadata as columns, strings
+  dictionary-encoded
+
+``FlatVectorStore`` serves it read-only behind the parts of the Chroma API
+the retrievers use. Select it with ``VECTOR_STORE=flat``; ingestion refreshes
+an existing snapshot.
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import time
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+from utils import CHROMA_DIR
+
+FLAT_INDEX_DIRNAME = "flat_index"
+FLAT_INDEX_VERSION = 1
+PAGE_SIZE = 5000
+SEARCH_BLOCK_SIZE = 16384
+
+
+def flat_index_path(persist_directory=CHROMA_DIR):
+    """Return the directory of the flat index for a vector store directory"""
+    return os.path.join(persist_directory, FLAT_INDEX_DIRNAME)
+
+
+def _write_blob(directory, name, strings):
+    encoded = [value.encode("utf-8") for value in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    with open(os.path.join(directory, f"{name}.bin"), "wb") as f:
+        for value in encoded:
+            f.write(value)
+    np.save(os.path.join(directory, f"{name}_offsets.npy"), offsets)
+
+
+def _encode_column(values):
+    """Return (column spec, array) for one metadata field across all chunks"""
+    present = [value for value in values if value is not None]
+    if present and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in present):
+        kind = "int" if all(isinstance(value, int) for value in present) else "float"
+        array = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+        return {"kind": kind}, array
+    categories = sorted({json.dumps(value) for value in present})
+    codes = {category: i for i, category in enumerate(categories)}
+    array = np.array([-1 if value is None else codes[json.dumps(value)] for value in values], dtype=np.int32)
+    return {"kind": "category", "categories": categories}, array
+
+
+def export_flat_index(collection, persist_directory=CHROMA_DIR, dtype="float16"):
+    """Snapshot every chunk of a Chroma collection into a flat index, replacing any previous one"""
+    if dtype not in ("float16", "int8"):
+        raise ValueError(f"Unsupported dtype: {dtype}")
+    ids, texts, metadatas, vectors = [], [], [], []
+    offset = 0
+    while True:
+        batch = collection.get(include=["documents", "metadatas", "embeddings"], limit=PAGE_SIZE, offset=offset)
+        if not len(batch["ids"]):
+            break
+        ids.extend(batch["ids"])
+        texts.extend(text or "" for text in batch["documents"])
+        metadatas.extend(metadata or {} for metadata in batch["metadatas"])
+        vectors.append(np.asarray(batch["embeddings"], dtype=np.float32))
+        offset += len(batch["ids"])
+    matrix = np.concatenate(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+    path = flat_index_path(persist_directory)
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(os.path.join(tmp_path, "columns"))
+
+    np.save(os.path.join(tmp_path, "norms.npy"), np.einsum("ij,ij->i", matrix, matrix).astype(np.float32))
+    if dtype == "int8":
+        scales = np.maximum(np.abs(matrix).max(axis=1, initial=0.0), 1e-12) / 127.0
+        np.save(os.path.join(tmp_path, "vectors.npy"), np.round(matrix / scales[:, None]).astype(np.int8))
+        np.save(os.path.join(tmp_path, "scales.npy"), scales.astype(np.float32))
+    else:
+        np.save(os.path.join(tmp_path, "vectors.npy"), matrix.astype(np.float16))
+    _write_blob(tmp_path, "ids", ids)
+    _write_blob(tmp_path, "texts", texts)
+
+    columns = {}
+    for i, key in enumerate(sorted({key for metadata in metadatas for key in metadata})):
+        spec, array = _encode_column([metadata.get(key) for metadata in metadatas])
+        spec["file"] = f"{i}.npy"
+        np.save(os.path.join(tmp_path, "columns", spec["file"]), array)
+        columns[key] = spec
+
+    with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": FLAT_INDEX_VERSION,
+            "count": len(ids),
+            "dimensions": int(matrix.shape[1]) if matrix.size else 0,
+            "dtype": dtype,
+            "columns": columns,
+            "exported_at": time.time(),
+        }, f)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return len(ids)
+
+
+class FlatCollection:
+    """Read-only stand-in for the Chroma collection methods the retrievers use"""
+
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")
+        self.vectors = load("vectors.npy")
+        self.norms = load("norms.npy")
+        self.scales = load("scales.npy") if self.meta["dtype"] == "int8" else None
+        self.id_offsets = load("ids_offsets.npy")
+        self.text_offsets = load("texts_offsets.npy")
+        self.id_blob = np.memmap(os.path.join(path, "ids.bin"), dtype=np.uint8, mode="r") \
+            if self.id_offsets[-1] else np.zeros(0, dtype=np.uint8)
+        self.text_blob = np.memmap(os.path.join(path, "texts.bin"), dtype=np.uint8, mode="r") \
+            if self.text_offsets[-1] else np.zeros(0, dtype=np.uint8)
+        self.columns = {
+            key: (spec, load(os.path.join("columns", spec["file"])))
+            for key, spec in self.meta["columns"].items()
+        }
+        self._rows_by_id = None
+
+    def count(self):
+        return self.meta["count"]
+
+    def _string(self, blob, offsets, row):
+        return bytes(blob[offsets[row]:offsets[row + 1]]).decode("utf-8")
+
+    def chunk_id(self, row):
+        return self._string(self.id_blob, self.id_offsets, row)
+
+    def text(self, row):
+        return self._string(self.text_blob, self.text_offsets, row)
+
+    def metadata(self, row):
+        metadata = {}
+        for key, (spec, column) in self.columns.items():
+            value = column[row]
+            if spec["kind"] == "category":
+                if value >= 0:
+                    metadata[key] = json.loads(spec["categories"][value])
+            elif not math.isnan(value):
+                metadata[key] = int(value) if spec["kind"] == "int" else float(value)
+        return metadata
+
+    def vector(self, row):
+        vector = np.asarray(self.vectors[row], dtype=np.float32)
+        return vector * self.scales[row] if self.scales is not None else vector
+
+    def row(self, chunk_id):
+        if self._rows_by_id is None:
+            self._rows_by_id = {self.chunk_id(row): row for row in range(self.count())}
+        return self._rows_by_id.get(chunk_id)
+
+    def get(self, ids=None, include=("documents", "metadatas"), limit=None, offset=None, **kwargs):
+        """Return chunks by ID or by position, in the same shape as Chroma's Collection.get"""
+        if ids is not None:
+            rows = [row for row in (self.row(chunk_id) for chunk_id in ids) if row is not None]
+        else:
+            start = offset or 0
+            end = self.count() if limit is None else min(self.count(), start + limit)
+            rows = range(start, end)
+        result = {"ids": [self.chunk_id(row) for row in rows]}
+        if "documents" in include:
+            result["documents"] = [self.text(row) for row in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [self.metadata(row) for row in rows]
+        if "embeddings" in include:
+            result["embeddings"] = [self.vector(row) for row in rows]
+        return result
+
+    def where_mask(self, where):
+        """Return a boolean row mask for a Chroma-style filter such as {"code": "BNS"} or
+        {"code": {"$in": ["BNS", "IPC"]}} (equality and membership on single fields only)"""
+        mask = np.ones(self.count(), dtype=bool)
+        for key, condition in where.items():
+            if isinstance(condition, dict):
+                (operator, operand), = condition.items()
+                if operator not in ("$eq", "$in"):
+                    raise ValueError(f"Unsupported filter operator for the flat index: {operator}")
+                values = operand if operator == "$in" else [operand]
+            else:
+                values = [condition]
+            if key not in self.columns:
+                return np.zeros(self.count(), dtype=bool)
+            spec, column = self.columns[key]
+            if spec["kind"] == "category":
+                codes = [i for i, category in enumerate(spec["categories"]) if json.loads(category) in values]
+                mask &= np.isin(column, codes)
+            else:
+                mask &= np.isin(column, np.asarray(values, dtype=np.float64))
+        return mask
+
+    def search(self, query_vector, k, where=None):
+        """Return (rows, squared L2 distances) of the k nearest chunks matching where, nearest first"""
+        query = np.asarray(query_vector, dtype=np.float32)
+        count = self.count()
+        if count == 0 or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        dots = np.empty(count, dtype=np.float32)
+        # Blockwise so only one block is ever converted to float32 at a time
+        for start in range(0, count, SEARCH_BLOCK_SIZE):
+            block = np.asarray(self.vectors[start:start + SEARCH_BLOCK_SIZE], dtype=np.float32)
+            dots[start:start + len(block)] = block @ query
+        if self.scales is not None:
+            dots *= self.scales
+        distances = np.maximum(self.norms + float(query @ query) - 2 * dots, 0.0)
+        if where:
+            distances[~self.where_mask(where)] = np.inf
+            k = min(k, int(np.isfinite(distances).sum()))
+            if k == 0:
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        k = min(k, count)
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        return top, distances[top]
+
+
+class FlatVectorStore(VectorStore):
+    """Read-only vector store over a flat index snapshot"""
+
+    def __init__(self, collection, embedding_function=None):
+        self._collection = collection
+        self._embedding_function = embedding_function
+
+    @classmethod
+    def load(cls, persist_directory=CHROMA_DIR, embedding_function=None):
+        """Open the exported snapshot, or return None if there is none"""
+        path = flat_index_path(persist_directory)
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            return None
+        return cls(FlatCollection(path), embedding_function)
+
+    @property
+    def embeddings(self):
+        return self._embedding_function
+
+    def _select_relevance_score_fn(self):
+        # Same distance and relevance scale as the default Chroma collection, so boosts behave alike
+        return self._euclidean_relevance_score_fn
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, filter=None) -> List[Tuple[Document, float]]:
+        rows, distances = self._collection.search(embedding, k, filter)
+        return [
+            (Document(page_content=self._collection.text(row), metadata=self._collection.metadata(row),
+                      id=self._collection.chunk_id(row)), float(distance))
+            for row, distance in zip(rows, distances)
+        ]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(
+            self._embedding_function.embed_query(query), k, kwargs.get("filter")
+        )
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, kwargs.get("filter"))]
+
+    def add_texts(self, texts, metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        raise NotImplementedError("The flat index is a read-only snapshot; ingest into Chroma and re-export")
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError("Build the flat index with export_flat_index()")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the Chroma collection to a memory-mapped flat index")
+    parser.add_argument("--persist-dir", default=CHROMA_DIR)
+    parser.add_argument("--dtype", default="float16", choices=["float16", "int8"])
+    args = parser.parse_args()
+
+    from langchain_chroma import Chroma
+    from index_versions import resolve_index_dir
+    # Exports into the live version in place; new versions inherit the snapshot and ingestion refreshes it
+    persist_dir = resolve_index_dir(args.persist_dir)
+    start = time.time()
+    count = export_flat_index(Chroma(persist_directory=persist_dir)._collection, persist_dir, args.dtype)
+    size = sum(os.path.getsize(os.path.join(root, name))
+               for root, _, files in os.walk(flat_index_path(persist_dir)) for name in files)
+    print(f"Exported {count} chunks ({args.dtype}, {size / (1024 * 1024):.1f} MB) "
+          f"to {flat_index_path(persist_dir)} in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
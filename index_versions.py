@@ -0,0 +1,336 @@
+"""Versioned index directories with an atomic pointer, hot swap and garbage collection.
+
+Each ingestion builds a complete index (Chroma, manifest, BM25, statute and
+flat indexes) off to the side in ``chroma_db/versions/<id>/``, starting from
+a copy of the live version so ingestion stays incremental. It is then
+published by atomically replacing the one-line pointer file
+``chroma_db/CURRENT``. Readers never see a half-written index.
+
+``LiveIndex`` holds the loaded retriever in a running app or API process. A
+background thread polls the pointer; when it moves, the new version is loaded
+and warmed up (embedding model, probe query) before it replaces the old one.
+Requests use the index through ``use()``, so the ones already in flight finish
+on the version they started with.
+
+Every process using a version holds a lease file in it, so old versions are
+deleted only once no process still reads them. A directory without a pointer
+is an unversioned (legacy) index and is used as-is.
+
+Usage:
+    python index_versions.py status
+    python index_versions.py publish <version>     # e.g. roll back
+    python index_versions.py gc [--keep 2]
+"""
+import argparse
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from utils import CHROMA_DIR
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_DIRNAME = "versions"
+POINTER_FILENAME = "CURRENT"
+LEASES_DIRNAME = ".leases"
+BUILDING_SUFFIX = ".building"
+# Versions kept besides the current one, for rollback
+KEEP_VERSIONS = 2
+# Leases not refreshed for this long belong to processes that died without cleaning up
+LEASE_STALE_SECONDS = 600
+WATCH_INTERVAL_SECONDS = float(os.getenv("INDEX_WATCH_INTERVAL", "10"))
+PROBE_QUERY = "What is the punishment for theft?"
+
+
+def versions_path(root=CHROMA_DIR):
+    return os.path.join(root, VERSIONS_DIRNAME)
+
+
+def version_path(version, root=CHROMA_DIR):
+    return os.path.join(versions_path(root), version)
+
+
+def current_version(root=CHROMA_DIR):
+    """Return the published version ID, or None for an unversioned index"""
+    try:
+        with open(os.path.join(root, POINTER_FILENAME), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def resolve_index_dir(root=CHROMA_DIR):
+    """Return the directory holding the live index: the current version, or root itself if unversioned"""
+    version = current_version(root)
+    return version_path(version, root) if version else root
+
+
+def list_versions(root=CHROMA_DIR):
+    """Return the published version IDs, oldest first"""
+    if not os.path.isdir(versions_path(root)):
+        return []
+    return sorted(name for name in os.listdir(versions_path(root))
+                  if not name.endswith(BUILDING_SUFFIX) and os.path.isdir(version_path(name, root)))
+
+
+def publish(version, root=CHROMA_DIR):
+    """Atomically point readers at a built version"""
+    if not os.path.isdir(version_path(version, root)):
+        raise ValueError(f"No index version {version} in {versions_path(root)}")
+    path = os.path.join(root, POINTER_FILENAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _ignore_on_copy(directory, names):
+    skip = {VERSIONS_DIRNAME, POINTER_FILENAME, LEASES_DIRNAME}
+    return [name for name in names if name in skip or name.endswith(".tmp")]
+
+
+def build_version(build, root=CHROMA_DIR, keep=KEEP_VERSIONS):
+    """Build a new version with build(directory) and publish it.
+
+    The directory starts as a copy of the live index. build returns True if
+    it changed anything; otherwise the copy is discarded and nothing is
+    published. Returns the new version ID, or None.
+    """
+    version = time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+    staging = version_path(version, root) + BUILDING_SUFFIX
+    live = resolve_index_dir(root)
+    os.makedirs(versions_path(root), exist_ok=True)
+    if os.path.isdir(live) and os.listdir(live):
+        shutil.copytree(live, staging, ignore=_ignore_on_copy)
+    else:
+        os.makedirs(staging)
+
+    try:
+        changed = build(staging)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    if not changed:
+        shutil.rmtree(staging, ignore_errors=True)
+        return None
+
+    os.replace(staging, version_path(version, root))
+    publish(version, root)
+    print(f"Published index version {version}")
+    removed = gc_versions(root, keep)
+    if removed:
+        print(f"Removed unused index versions: {', '.join(removed)}")
+    return version
+
+
+def _lease_is_live(path):
+    name = os.path.basename(path)
+    host, _, rest = name.partition("--")
+    pid = rest.split("-", 1)[0]
+    if host == socket.gethostname() and pid.isdigit():
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+    try:
+        return time.time() - os.path.getmtime(path) < LEASE_STALE_SECONDS
+    except FileNotFoundError:
+        return False
+
+
+def version_in_use(version, root=CHROMA_DIR):
+    """Return True if any live process holds a lease on a version"""
+    leases = os.path.join(version_path(version, root), LEASES_DIRNAME)
+    if not os.path.isdir(leases):
+        return False
+    return any(_lease_is_live(os.path.join(leases, name)) for name in os.listdir(leases))
+
+
+def gc_versions(root=CHROMA_DIR, keep=KEEP_VERSIONS):
+    """Delete versions that are not current, not among the keep newest others, and not leased"""
+    current = current_version(root)
+    others = [version for version in list_versions(root) if version != current]
+    removed = []
+    for version in others[:max(0, len(others) - keep)]:
+        if version_in_use(version, root):
+            continue
+        shutil.rmtree(version_path(version, root), ignore_errors=True)
+        removed.append(version)
+    # Builds interrupted before publishing
+    if os.path.isdir(versions_path(root)):
+        for name in os.listdir(versions_path(root)):
+            path = os.path.join(versions_path(root), name)
+            if name.endswith(BUILDING_SUFFIX) and time.time() - os.path.getmtime(path) > LEASE_STALE_SECONDS:
+                shutil.rmtree(path, ignore_errors=True)
+    return removed
+
+
+class _Generation:
+    """One loaded version and the requests currently using it"""
+
+    def __init__(self, version, directory, resources):
+        self.version = version
+        self.directory = directory
+        self.resources = resources
+        self.in_flight = 0
+        self.retired = False
+        self.lease = None
+
+
+class LiveIndex:
+    """The loaded index of a serving process, swapped for new versions without downtime.
+
+    load(directory, previous) returns the resources for one index directory
+    (e.g. {"vector_store": ..., "retriever": ...}); previous is the current
+    resources or None, so the embedding model can be reused.
+    """
+
+    def __init__(self, load, root=CHROMA_DIR, interval=WATCH_INTERVAL_SECONDS, probe_query=PROBE_QUERY):
+        self.load = load
+        self.root = root
+        self.interval = interval
+        self.probe_query = probe_query
+        self.lease_name = f"{socket.gethostname()}--{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._generation = self._open(current_version(root))
+
+    @property
+    def version(self):
+        return self._generation.version
+
+    @property
+    def resources(self):
+        return self._generation.resources
+
+    def _open(self, version):
+        directory = version_path(version, self.root) if version else self.root
+        generation = _Generation(version, directory, None)
+        if version:
+            # Leased before loading so a concurrent GC cannot delete it underneath us
+            leases = os.path.join(directory, LEASES_DIRNAME)
+            os.makedirs(leases, exist_ok=True)
+            generation.lease = os.path.join(leases, self.lease_name)
+            open(generation.lease, "w").close()
+        try:
+            previous = self._generation.resources if getattr(self, "_generation", None) else None
+            generation.resources = self.load(directory, previous)
+            retriever = generation.resources.get("retriever")
+            if retriever is not None and self.probe_query:
+                # Warm-up: first-query costs (model, index pages, caches) are paid before the swap
+                retriever.invoke(self.probe_query)
+        except BaseException:
+            self._release(generation)
+            raise
+        return generation
+
+    def _release(self, generation):
+        if generation.lease:
+            try:
+                os.remove(generation.lease)
+            except FileNotFoundError:
+                pass
+            generation.lease = None
+
+    @contextmanager
+    def use(self):
+        """Yield the current resources; the version stays loaded until the block exits"""
+        with self._lock:
+            generation = self._generation
+            generation.in_flight += 1
+        try:
+            yield generation.resources
+        finally:
+            with self._lock:
+                generation.in_flight -= 1
+                done = generation.retired and generation.in_flight == 0
+            if done:
+                self._release(generation)
+
+    def check(self):
+        """Swap in the published version if it changed; return True if a swap happened"""
+        version = current_version(self.root)
+        generation = self._generation
+        if generation.lease:
+            # Heartbeat, so the lease is not mistaken for a stale one
+            try:
+                os.utime(generation.lease)
+            except FileNotFoundError:
+                open(generation.lease, "w").close()
+        if version == generation.version:
+            return False
+
+        start = time.perf_counter()
+        new_generation = self._open(version)
+        with self._lock:
+            old, self._generation = self._generation, new_generation
+            old.retired = True
+            done = old.in_flight == 0
+        if done:
+            self._release(old)
+        logger.info("Swapped index %s -> %s after %.1fs warm-up", old.version, version,
+                    time.perf_counter() - start)
+        gc_versions(self.root)
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                # Keep serving the current version; the next poll retries
+                logger.exception("Loading index version %s failed", current_version(self.root))
+
+    def start(self):
+        """Start polling the pointer in a daemon thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="index-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop polling and drop this process's lease"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._release(self._generation)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect, publish and clean up index versions")
+    parser.add_argument("--root", default=CHROMA_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status")
+    publish_parser = subparsers.add_parser("publish")
+    publish_parser.add_argument("version")
+    gc_parser = subparsers.add_parser("gc")
+    gc_parser.add_argument("--keep", type=int, default=KEEP_VERSIONS)
+    args = parser.parse_args()
+
+    if args.command == "status":
+        current = current_version(args.root)
+        print(f"Current: {current or 'unversioned'} ({resolve_index_dir(args.root)})")
+        for version in list_versions(args.root):
+            marker = "*" if version == current else " "
+            print(f" {marker} {version}{'  (in use)' if version_in_use(version, args.root) else ''}")
+    elif args.command == "publish":
+        publish(args.version, args.root)
+        print(f"Published {args.version}")
+    else:
+        removed = gc_versions(args.root, args.keep)
+        print(f"Removed {len(removed)} versions" + (f": {', '.join(removed)}" if removed else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+"""Incremental ingestion of the PDF corpus into the Chroma vector store.
+
+Every PDF under the data directory (including ``data/bns_data``) is parsed
+once into the page cache (see page_cache.py), then split and embedded in a
+process pool. A manifest of per-file content hashes and chunking parameters is
+kept next to the vector store so that a re-run only touches new or changed PDFs,
+re-splits cached pages when the chunking changes, and removes the chunks of
+PDFs that were deleted. With ``CHUNKING=parent`` small child spans are embedded
+and whole provisions and paragraphs are stored as their parents (see
+parent_documents.py).
+
+Once the store is versioned (see index_versions.py), every run builds a new
+version next to the live one and publishes it atomically, so running apps
+are never read from a directory being written to.
+
+Usage:
+    python ingest.py                 # incremental update
+    python ingest.py --full          # rebuild the collection from scratch
+    python ingest.py --workers 4
+    python ingest.py --new-version   # build and publish a new index version
+    python ingest.py --chunking parent
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+from document_types import classify_document
+from flat_index import export_flat_index, flat_index_path
+from index_versions import build_version, current_version
+from lexical_index import LexicalIndex, lexical_index_path
+from page_cache import PAGE_CACHE_DIR, file_sha256, fill_cache, load_pages
+from parent_documents import CHUNKING_MODE, PARENT_CHUNKING, ParentStore, parent_store_path, split_parents
+from statutes import STATUTE_INDEX_FILENAME, STATUTE_SOURCES, build_statute_index
+from utils import CHROMA_DIR, get_embeddings_model
+
+# Load environment variables
+load_dotenv()
+
+# Constants
+DATA_DIR = "data"
+MANIFEST_FILENAME = "ingest_manifest.json"
+MANIFEST_VERSION = 3
+UPSERT_BATCH_SIZE = 1000
+
+# Chunking parameters (Constitution and BNS use smaller chunks for more granularity)
+DEFAULT_CHUNKING = {"chunk_size": 1000, "chunk_overlap": 200}
+FINE_CHUNKING = {"chunk_size": 800, "chunk_overlap": 150}
+
+
+def text_sha256(text):
+    """Return the SHA-256 hex digest of a chunk's text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def discover_pdfs(data_dir=DATA_DIR):
+    """Return the sorted list of PDF paths under the data directory"""
+    pdf_files = []
+    for root, _, files in os.walk(data_dir):
+        for file in files:
+            if file.lower().endswith(".pdf"):
+                pdf_files.append(os.path.join(root, file))
+    return sorted(pdf_files)
+
+
+def source_metadata(pdf_path, chunking_mode=CHUNKING_MODE):
+    """Return the source-level metadata and chunking parameters for a PDF"""
+    filename = os.path.basename(pdf_path).lower()
+    parent = os.path.basename(os.path.dirname(pdf_path)).lower()
+
+    if filename == "constitutionofindia.pdf":
+        metadata, chunking = {"source_type": "constitution", "priority": "high"}, FINE_CHUNKING
+    elif parent == "bns_data":
+        metadata = {
+            "source_type": "bns_2024",
+            "priority": "high",
+            "document_category": "new_criminal_laws",
+        }
+        chunking = FINE_CHUNKING
+    else:
+        metadata, chunking = {"source_type": "regular", "priority": "normal"}, DEFAULT_CHUNKING
+    if chunking_mode == "parent":
+        chunking = PARENT_CHUNKING
+    return metadata, chunking
+
+
+def chunk_id(source, page, start_index, text):
+    """Return a deterministic ID for a chunk so re-ingestion upserts instead of duplicating"""
+    key = f"{source}|{page}|{start_index}|{text_sha256(text)}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def manifest_path(persist_directory=CHROMA_DIR):
+    """Return the path of the ingestion manifest for a vector store directory"""
+    return os.path.join(persist_directory, MANIFEST_FILENAME)
+
+
+def load_manifest(persist_directory=CHROMA_DIR):
+    """Load the ingestion manifest, returning an empty one if missing or outdated"""
+    path = manifest_path(persist_directory)
+    empty = {"version": MANIFEST_VERSION, "files": {}}
+    if not os.path.exists(path):
+        return empty
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable manifest {path}: {e}")
+        return empty
+    if manifest.get("version") != MANIFEST_VERSION:
+        print("Manifest version changed, re-ingesting all files")
+        return empty
+    return manifest
+
+
+def save_manifest(manifest, persist_directory=CHROMA_DIR):
+    """Atomically write the ingestion manifest"""
+    os.makedirs(persist_directory, exist_ok=True)
+    path = manifest_path(persist_directory)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+# Per-process embeddings model, created once by the pool initializer
+_worker_embeddings = None
+
+
+def _init_worker(torch_threads, embedding_backend, embedding_cache=True):
+    """Load the (cached) embeddings model once per worker process"""
+    global _worker_embeddings
+    os.environ.setdefault("EMBEDDING_THREADS", str(torch_threads))
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    _worker_embeddings = get_embeddings_model(backend=embedding_backend, cache=embedding_cache)
+
+
+def split_pdf(pdf_path, file_hash, page_cache_dir=PAGE_CACHE_DIR, chunking_mode=CHUNKING_MODE):
+    """Split one PDF's (cached) pages into chunk IDs, texts and metadata, plus parents in parent mode"""
+    from langchain_core.documents import Document
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    base_metadata, chunking = source_metadata(pdf_path, chunking_mode)
+    records = load_pages(pdf_path, file_hash, page_cache_dir)
+    # Classified once per file from the raw title pages, so queries can filter on it
+    base_metadata = {**base_metadata, **classify_document(pdf_path, [page["raw"] for page in records])}
+    parents = None
+
+    if chunking.get("mode") == "parent":
+        parents, chunks = split_parents(pdf_path, records, chunking)
+        for parent in parents:
+            parent["metadata"] = {**base_metadata, **parent["metadata"], "source": pdf_path}
+    else:
+        pages = [
+            Document(page_content=page["text"], metadata={**page["metadata"], "source": pdf_path})
+            for page in records
+        ]
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunking["chunk_size"],
+            chunk_overlap=chunking["chunk_overlap"],
+            length_function=len,
+            add_start_index=True,
+        )
+        chunks = [(chunk.page_content, chunk.metadata) for chunk in text_splitter.split_documents(pages)]
+
+    ids, texts, metadatas = [], [], []
+    for text, chunk_metadata in chunks:
+        metadata = dict(chunk_metadata or {})
+        metadata.update(base_metadata)
+        metadata["source"] = pdf_path
+        metadata["file_sha256"] = file_hash
+        metadata["content_hash"] = text_sha256(text)
+        position = metadata.get("start_index", metadata.get("child_index", 0))
+        ids.append(chunk_id(pdf_path, metadata.get("parent_id", metadata.get("page", 0)), position, text))
+        texts.append(text)
+        metadatas.append(metadata)
+
+    return {
+        "path": pdf_path,
+        "sha256": file_hash,
+        "pages": len(records),
+        "chunking": chunking,
+        "ids": ids,
+        "texts": texts,
+        "metadatas": metadatas,
+        "parents": parents,
+    }
+
+
+def process_pdf(pdf_path, file_hash, page_cache_dir=PAGE_CACHE_DIR, chunking_mode=CHUNKING_MODE):
+    """Split and embed one PDF; runs inside a worker process"""
+    result = split_pdf(pdf_path, file_hash, page_cache_dir, chunking_mode)
+    result["embeddings"] = _worker_embeddings.embed_documents(result["texts"]) if result["texts"] else []
+    return result
+
+
+def open_collection(persist_directory=CHROMA_DIR, reset=False):
+    """Open the Chroma collection used by the app, optionally wiping it first"""
+    from langchain_chroma import Chroma
+
+    # Embeddings are computed in the workers, so no embedding function is needed here
+    vector_store = Chroma(persist_directory=persist_directory)
+    if reset:
+        vector_store.delete_collection()
+        vector_store = Chroma(persist_directory=persist_directory)
+    return vector_store._collection
+
+
+def delete_source_chunks(collection, pdf_path):
+    """Delete every chunk that came from a given PDF, including legacy random-ID chunks"""
+    collection.delete(where={"source": pdf_path})
+
+
+def upsert_chunks(collection, result):
+    """Write a processed PDF's chunks to the collection in batches"""
+    for start in range(0, len(result["ids"]), UPSERT_BATCH_SIZE):
+        end = start + UPSERT_BATCH_SIZE
+        collection.upsert(
+            ids=result["ids"][start:end],
+            documents=result["texts"][start:end],
+            metadatas=result["metadatas"][start:end],
+            embeddings=result["embeddings"][start:end],
+        )
+
+
+def plan_ingestion(pdf_files, manifest, chunking_mode=CHUNKING_MODE):
+    """Split the corpus into changed and removed files against the manifest, plus current hashes.
+
+    A file also counts as changed when its chunking parameters differ from
+    the ones it was ingested with.
+    """
+    known = manifest["files"]
+    current = {path: file_sha256(path) for path in pdf_files}
+    changed = {
+        path: sha for path, sha in current.items()
+        if known.get(path, {}).get("sha256") != sha
+        or known[path].get("chunking") != source_metadata(path, chunking_mode)[1]
+    }
+    removed = sorted(path for path in known if path not in current)
+    return changed, removed, current
+
+
+def ingest(data_dir=DATA_DIR, persist_directory=CHROMA_DIR, workers=None, full=False,
+           embedding_backend=None, embedding_cache=True, page_cache_dir=PAGE_CACHE_DIR,
+           chunking_mode=CHUNKING_MODE):
+    """Bring the vector store in line with the PDFs under data_dir.
+
+    With page_cache_dir=None every PDF is parsed afresh and nothing is cached.
+    chunking_mode is "window" or "parent" (see parent_documents.py).
+    """
+    start_time = time.time()
+    manifest = {"version": MANIFEST_VERSION, "files": {}} if full else load_manifest(persist_directory)
+
+    pdf_files = discover_pdfs(data_dir)
+    print(f"Found {len(pdf_files)} PDF files")
+
+    changed, removed, current = plan_ingestion(pdf_files, manifest, chunking_mode)
+    print(f"{len(changed)} new or changed, {len(removed)} removed, "
+          f"{len(pdf_files) - len(changed)} unchanged")
+
+    if changed and page_cache_dir is not None:
+        fill_cache(changed, workers, page_cache_dir)
+
+    statute_files = {filename for filename, _ in STATUTE_SOURCES.values()}
+    statutes_touched = any(os.path.basename(path) in statute_files for path in list(changed) + removed)
+    statute_index_missing = not os.path.exists(os.path.join(persist_directory, STATUTE_INDEX_FILENAME))
+    if statutes_touched or statute_index_missing or full:
+        print("Building statute section/article index")
+        build_statute_index(current, persist_directory, page_cache_dir)
+
+    lexical_index_missing = not os.path.exists(lexical_index_path(persist_directory))
+    if not changed and not removed and not full and not lexical_index_missing:
+        print("Vector store is up to date")
+        return manifest
+
+    collection = open_collection(persist_directory, reset=full)
+    # Kept in window mode too, so parents of files re-chunked or removed are dropped
+    if chunking_mode == "parent":
+        parent_store = ParentStore.open(persist_directory, reset=full)
+    else:
+        parent_store = ParentStore.load(persist_directory)
+
+    for pdf_path in removed:
+        print(f"Removing chunks for deleted file {pdf_path}")
+        delete_source_chunks(collection, pdf_path)
+        if parent_store is not None:
+            parent_store.delete_source(pdf_path)
+        del manifest["files"][pdf_path]
+    save_manifest(manifest, persist_directory)
+
+    if changed:
+        workers = workers or min(len(changed), os.cpu_count() or 1)
+        torch_threads = max(1, (os.cpu_count() or 1) // workers)
+        print(f"Chunking and embedding {len(changed)} files with {workers} workers")
+
+        total_pages = 0
+        total_chunks = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(torch_threads, embedding_backend, embedding_cache)) as executor:
+            futures = {
+                executor.submit(process_pdf, path, sha, page_cache_dir, chunking_mode): path
+                for path, sha in sorted(changed.items())
+            }
+            for future in as_completed(futures):
+                pdf_path = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Error processing {pdf_path}: {e}")
+                    continue
+
+                delete_source_chunks(collection, pdf_path)
+                upsert_chunks(collection, result)
+                if parent_store is not None:
+                    parent_store.replace_source(pdf_path, result["parents"] or [])
+
+                manifest["files"][pdf_path] = {
+                    "sha256": result["sha256"],
+                    "pages": result["pages"],
+                    "chunking": result["chunking"],
+                    "chunks": len(result["ids"]),
+                    "ingested_at": time.time(),
+                }
+                save_manifest(manifest, persist_directory)
+
+                total_pages += result["pages"]
+                total_chunks += len(result["ids"])
+                print(f"  {pdf_path}: {result['pages']} pages, {len(result['ids'])} chunks")
+
+        print(f"Ingested {total_pages} pages into {total_chunks} chunks")
+
+    if parent_store is not None:
+        parents = len(parent_store)
+        parent_store.close()
+        if parents:
+            print(f"Parent store holds {parents} provisions and paragraphs")
+        else:
+            # Nothing is parent-chunked any more; retrieval goes back to context packing
+            os.remove(parent_store_path(persist_directory))
+
+    # The lexical index is rebuilt from the collection so it always matches it exactly
+    print("Building BM25 lexical index")
+    LexicalIndex.build_from_collection(collection).save(persist_directory)
+
+    flat_meta = os.path.join(flat_index_path(persist_directory), "meta.json")
+    if os.path.exists(flat_meta):
+        with open(flat_meta, "r", encoding="utf-8") as f:
+            dtype = json.load(f)["dtype"]
+        print(f"Refreshing {dtype} flat index")
+        export_flat_index(collection, persist_directory, dtype)
+
+    print(f"Vector store now contains {collection.count()} chunks "
+          f"({time.time() - start_time:.1f}s)")
+    return manifest
+
+
+def ingest_new_version(data_dir=DATA_DIR, root=CHROMA_DIR, workers=None, full=False,
+                       embedding_backend=None, page_cache_dir=PAGE_CACHE_DIR, chunking_mode=CHUNKING_MODE):
+    """Ingest into a copy of the live index and publish it as a new version if anything changed"""
+    def statute_index_mtime(directory):
+        path = os.path.join(directory, STATUTE_INDEX_FILENAME)
+        return os.stat(path).st_mtime_ns if os.path.exists(path) else None
+
+    def build(directory):
+        before = load_manifest(directory)
+        statute_index_before = statute_index_mtime(directory)
+        manifest = ingest(data_dir=data_dir, persist_directory=directory, workers=workers, full=full,
+                          embedding_backend=embedding_backend, page_cache_dir=page_cache_dir,
+                          chunking_mode=chunking_mode)
+        # A rebuilt statute index (e.g. one that was missing) is a change even if no PDF changed
+        return full or manifest != before or statute_index_mtime(directory) != statute_index_before
+
+    version = build_version(build, root)
+    if version is None:
+        print(f"Nothing changed; still serving {current_version(root) or root}")
+    return version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest legal PDFs into the Chroma vector store")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="directory scanned recursively for PDFs")
+    parser.add_argument("--persist-dir", default=CHROMA_DIR, help="Chroma persistence directory")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--full", action="store_true", help="drop the collection and re-ingest everything")
+    parser.add_argument("--new-version", action="store_true",
+                        help="build a new index version and publish it (the default once the store is versioned)")
+    parser.add_argument("--chunking", default=CHUNKING_MODE, choices=["window", "parent"],
+                        help="fixed-size chunks or child spans with parent provisions (defaults to the CHUNKING env var)")
+    parser.add_argument("--no-page-cache", action="store_true", help="parse every PDF afresh without the page cache")
+    parser.add_argument("--embedding-backend", default=None, choices=["huggingface", "onnx", "onnx-int8"],
+                        help="embedding backend (defaults to the EMBEDDING_BACKEND env var)")
+    args = parser.parse_args()
+
+    page_cache_dir = None if args.no_page_cache else PAGE_CACHE_DIR
+    if args.new_version or current_version(args.persist_dir):
+        ingest_new_version(data_dir=args.data_dir, root=args.persist_dir, workers=args.workers, full=args.full,
+                           embedding_backend=args.embedding_backend, page_cache_dir=page_cache_dir,
+                           chunking_mode=args.chunking)
+    else:
+        ingest(data_dir=args.data_dir, persist_directory=args.persist_dir, workers=args.workers, full=args.full,
+               embedding_backend=args.embedding_backend, page_cache_dir=page_cache_dir, chunking_mode=args.chunking)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""BM25 inverted index over the vector store's chunks.
+
+Dense MiniLM search misses keyword-heavy queries such as party names in
+judgments, statute titles and Latin terms. Ingestion builds this lexical index
+over the same chunks and persists it next to the Chroma collection so that
+``retrievers.HybridRetriever`` can fuse both result lists.
+
+On disk the index is a directory holding ``meta.json`` (vocabulary, chunk IDs
+and BM25 parameters) and ``postings.npz`` (flattened posting lists).
+"""
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+
+from utils import CHROMA_DIR
+
+LEXICAL_INDEX_DIRNAME = "lexical_index"
+PAGE_SIZE = 5000
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers herself him himself his how i if in into is it its itself just me more most
+my myself no nor not now of off on once only or other our ours ourselves out over own same she
+should so some such than that the their theirs them themselves then there these they this those
+through to too under until up very was we were what when where which while who whom why will with
+would you your yours yourself yourselves shall may
+""".split())
+
+
+def tokenize(text):
+    """Lower-case and split text into index terms, dropping stopwords"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def lexical_index_path(persist_directory=CHROMA_DIR):
+    """Return the directory of the lexical index for a vector store directory"""
+    return os.path.join(persist_directory, LEXICAL_INDEX_DIRNAME)
+
+
+class LexicalIndex:
+    """Okapi BM25 over a fixed set of chunks, with postings held in numpy arrays"""
+
+    def __init__(self, ids, vocabulary, offsets, doc_indices, term_frequencies, doc_lengths,
+                 k1=1.5, b=0.75):
+        self.ids = ids
+        self.vocabulary = vocabulary
+        self.term_index = {term: i for i, term in enumerate(vocabulary)}
+        self.offsets = offsets
+        self.doc_indices = doc_indices
+        self.term_frequencies = term_frequencies
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+
+    @classmethod
+    def build(cls, ids, texts):
+        """Build an index from parallel lists of chunk IDs and texts"""
+        postings = {}
+        doc_lengths = np.zeros(len(ids), dtype=np.int32)
+        for doc_index, text in enumerate(texts):
+            tokens = tokenize(text or "")
+            doc_lengths[doc_index] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                postings.setdefault(token, []).append((doc_index, count))
+
+        vocabulary = sorted(postings)
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        for i, term in enumerate(vocabulary):
+            offsets[i + 1] = offsets[i] + len(postings[term])
+        doc_indices = np.empty(offsets[-1], dtype=np.int32)
+        term_frequencies = np.empty(offsets[-1], dtype=np.uint16)
+        for i, term in enumerate(vocabulary):
+            pairs = np.asarray(postings[term], dtype=np.int64)
+            doc_indices[offsets[i]:offsets[i + 1]] = pairs[:, 0]
+            term_frequencies[offsets[i]:offsets[i + 1]] = np.minimum(pairs[:, 1], np.iinfo(np.uint16).max)
+
+        return cls(list(ids), vocabulary, offsets, doc_indices, term_frequencies, doc_lengths)
+
+    @classmethod
+    def build_from_collection(cls, collection):
+        """Build an index over every chunk in a Chroma collection"""
+        ids, texts = [], []
+        offset = 0
+        while True:
+            batch = collection.get(include=["documents"], limit=PAGE_SIZE, offset=offset)
+            if not batch["ids"]:
+                break
+            ids.extend(batch["ids"])
+            texts.extend(batch["documents"])
+            offset += len(batch["ids"])
+        return cls.build(ids, texts)
+
+    def save(self, persist_directory=CHROMA_DIR):
+        """Write the index next to the vector store, replacing any previous one"""
+        path = lexical_index_path(persist_directory)
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        np.savez(
+            os.path.join(tmp_path, "postings.npz"),
+            offsets=self.offsets,
+            doc_indices=self.doc_indices,
+            term_frequencies=self.term_frequencies,
+            doc_lengths=self.doc_lengths,
+        )
+        with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "vocabulary": self.vocabulary, "k1": self.k1, "b": self.b}, f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, persist_directory=CHROMA_DIR):
+        """Load the persisted index, or return None if ingestion has not built one"""
+        path = lexical_index_path(persist_directory)
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            return None
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = np.load(os.path.join(path, "postings.npz"))
+        return cls(
+            meta["ids"], meta["vocabulary"], arrays["offsets"], arrays["doc_indices"],
+            arrays["term_frequencies"], arrays["doc_lengths"], k1=meta["k1"], b=meta["b"],
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query, k=20):
+        """Return up to k (chunk_id, bm25_score) pairs, best first"""
+        if not self.ids:
+            return []
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        total = len(self.ids)
+        length_norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / max(self.avg_doc_length, 1e-9))
+
+        for term in set(tokenize(query)):
+            term_id = self.term_index.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.doc_indices[start:end]
+            tf = self.term_frequencies[start:end].astype(np.float32)
+            idf = np.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            # Each chunk appears at most once per posting list, so plain fancy indexing is safe
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + length_norm[docs])
+
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[i], float(scores[i])) for i in top]
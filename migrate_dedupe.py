@@ -0,0 +1,97 @@
+"""Collapse duplicated chunks in an existing Chroma vector store.
+
+Older ingestions stored every Constitution chunk three times and every BNS
+chunk twice to weight them in similarity search. That weighting is now applied
+at query time by ``retrievers.BoostedRetriever``, so the copies only cost disk
+space and search time. This script keeps one copy of each (source, page, text)
+chunk, deletes the rest and backfills the ``content_hash`` metadata. A
+versioned index (see index_versions.py) is migrated in a copy of the live
+version, which is then published, so serving processes never see it half done.
+
+Usage:
+    python migrate_dedupe.py [--persist-dir chroma_db] [--dry-run]
+"""
+import argparse
+import hashlib
+import os
+
+from utils import CHROMA_DIR
+
+PAGE_SIZE = 5000
+DELETE_BATCH_SIZE = 1000
+
+
+def find_duplicates(collection):
+    """Return (ids to delete, {kept id: metadata needing a content_hash})"""
+    seen = set()
+    duplicate_ids = []
+    backfill = {}
+
+    offset = 0
+    while True:
+        batch = collection.get(include=["documents", "metadatas"], limit=PAGE_SIZE, offset=offset)
+        if not batch["ids"]:
+            break
+        for chunk_id, text, metadata in zip(batch["ids"], batch["documents"], batch["metadatas"]):
+            metadata = metadata or {}
+            text_hash = hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+            key = (metadata.get("source"), metadata.get("page"), text_hash)
+            if key in seen:
+                duplicate_ids.append(chunk_id)
+                continue
+            seen.add(key)
+            if metadata.get("content_hash") != text_hash:
+                backfill[chunk_id] = dict(metadata, content_hash=text_hash)
+        offset += len(batch["ids"])
+
+    return duplicate_ids, backfill
+
+
+def dedupe_collection(persist_directory, dry_run=False):
+    """De-duplicate the collection in a directory in place; return True if anything changed"""
+    from langchain_chroma import Chroma
+
+    if not os.path.exists(persist_directory):
+        raise ValueError(f"Vector store directory {persist_directory} does not exist.")
+
+    collection = Chroma(persist_directory=persist_directory)._collection
+    before = collection.count()
+    duplicate_ids, backfill = find_duplicates(collection)
+    print(f"Collection has {before} chunks, {len(duplicate_ids)} duplicates, "
+          f"{len(backfill)} chunks missing content_hash")
+
+    if dry_run or not (duplicate_ids or backfill):
+        return False
+
+    for start in range(0, len(duplicate_ids), DELETE_BATCH_SIZE):
+        collection.delete(ids=duplicate_ids[start:start + DELETE_BATCH_SIZE])
+
+    backfill_ids = list(backfill)
+    for start in range(0, len(backfill_ids), DELETE_BATCH_SIZE):
+        ids = backfill_ids[start:start + DELETE_BATCH_SIZE]
+        collection.update(ids=ids, metadatas=[backfill[chunk_id] for chunk_id in ids])
+
+    print(f"Collection now has {collection.count()} chunks")
+    return True
+
+
+def migrate(persist_directory=CHROMA_DIR, dry_run=False):
+    """De-duplicate the live collection, publishing the result as a new version if the index is versioned"""
+    from index_versions import build_version, current_version, resolve_index_dir
+
+    if dry_run or current_version(persist_directory) is None:
+        return dedupe_collection(resolve_index_dir(persist_directory), dry_run)
+    return build_version(dedupe_collection, persist_directory) is not None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove duplicated chunks from the Chroma vector store")
+    parser.add_argument("--persist-dir", default=CHROMA_DIR, help="Chroma persistence directory")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would change")
+    args = parser.parse_args()
+
+    migrate(persist_directory=args.persist_dir, dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
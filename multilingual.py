@@ -0,0 +1,310 @@
+"""Cross-language answer reuse for Hindi and Bengali questions.
+
+The embedding model is English-only, so a question written in Devanagari or
+Bengali script retrieves poorly, and answering each language separately pays
+for a full retrieval-augmented answer per language. With ``CROSS_LANGUAGE=1``:
+
+1. A non-English question is rewritten into an English retrieval query by a
+   short LLM call. The mapping is cached in ``cache/query_translations.sqlite3``.
+2. That query is retrieved and answered once in the canonical language
+   (English), and the answer is kept in the semantic answer cache.
+3. The requested language is served by translating the canonical answer. This
+   needs no context passages, so it costs a fraction of the tokens, and other
+   languages asking the same thing reuse the canonical answer. Translated
+   answers are cached under the English query as well, since the embedding
+   model cannot compare questions written in Indic scripts.
+
+Questions with chat history still retrieve with the English query, but are
+answered directly in their language, since the conversation shapes the answer.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import tracing
+from answer_cache import normalize_question
+from citations import split_citations
+from utils import (
+    CACHE_DIR,
+    AnswerStream,
+    acreate_enhanced_rag_response,
+    count_tokens,
+    create_enhanced_rag_response,
+    get_llm,
+)
+
+logger = logging.getLogger(__name__)
+
+CROSS_LANGUAGE_ENABLED = os.getenv("CROSS_LANGUAGE", "").lower() in ("1", "true", "yes")
+CANONICAL_LANGUAGE = "English"
+QUERY_TRANSLATIONS_PATH = os.path.join(CACHE_DIR, "query_translations.sqlite3")
+# Devanagari and Bengali script; questions without them are already searchable
+INDIC_SCRIPT_PATTERN = re.compile(r"[\u0900-\u097F\u0980-\u09FF]")
+
+QUERY_TRANSLATION_PROMPT = """Translate this question about Indian law into English for searching legal documents.
+Keep section numbers, article numbers, names of acts and case names. Output only the English question.
+
+Question: {question}"""
+
+ANSWER_TRANSLATION_PROMPT = """Translate the following answer about Indian law into {language}.
+Keep section numbers, article numbers, names of acts, case names and bracketed passage numbers such as [1] unchanged.
+Output only the translation.
+
+{answer}"""
+
+
+def uses_canonical_answers(language):
+    """Return True if answers in language are translated from the canonical language"""
+    return CROSS_LANGUAGE_ENABLED and language != CANONICAL_LANGUAGE
+
+
+class QueryTranslationCache:
+    """Persistent map from (question, language) to its English retrieval query"""
+
+    def __init__(self, path=QUERY_TRANSLATIONS_PATH, max_entries=20000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS translations (
+                question_key TEXT NOT NULL,
+                language TEXT NOT NULL,
+                query TEXT NOT NULL,
+                last_used_at REAL NOT NULL,
+                PRIMARY KEY (question_key, language)
+            )"""
+        )
+        self._conn.commit()
+
+    def _key(self, question):
+        return hashlib.sha256(normalize_question(question).encode("utf-8")).hexdigest()
+
+    def get(self, question, language):
+        """Return the cached English query, or None"""
+        key = self._key(question)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT query FROM translations WHERE question_key = ? AND language = ?", (key, language)
+            ).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE translations SET last_used_at = ? WHERE question_key = ? AND language = ?",
+                    (time.time(), key, language),
+                )
+                self._conn.commit()
+        return row[0] if row else None
+
+    def put(self, question, language, query):
+        """Cache a translation, evicting least-recently-used entries beyond max_entries"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations (question_key, language, query, last_used_at) "
+                "VALUES (?, ?, ?, ?)",
+                (self._key(question), language, query, time.time()),
+            )
+            self._conn.execute(
+                "DELETE FROM translations WHERE rowid NOT IN "
+                "(SELECT rowid FROM translations ORDER BY last_used_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+
+_translation_cache = None
+_translation_cache_lock = threading.Lock()
+
+
+def get_translation_cache():
+    """Return the process-wide query translation cache"""
+    global _translation_cache
+    if _translation_cache is None:
+        with _translation_cache_lock:
+            if _translation_cache is None:
+                _translation_cache = QueryTranslationCache()
+    return _translation_cache
+
+
+def needs_translation(question):
+    """Return True if a question must be translated into English before it is searched"""
+    return CROSS_LANGUAGE_ENABLED and bool(INDIC_SCRIPT_PATTERN.search(question))
+
+
+def query_translation_prompt(question):
+    return QUERY_TRANSLATION_PROMPT.format(question=question)
+
+
+def parse_query_translation(content, question):
+    """Return the English query in the model's output, or question if it is empty"""
+    content = (content or "").strip()
+    # The first line, in case the model adds a note after the question
+    return content.splitlines()[0].strip() if content else question
+
+
+def cached_retrieval_query(question, language):
+    """Return the query to search with if no LLM call is needed for it, else None"""
+    if not needs_translation(question):
+        return question
+    return get_translation_cache().get(question, language)
+
+
+def retrieval_query(question, language, llm=None):
+    """Return the query to search the (English) index with for a question asked in language.
+
+    If the translation fails, the question is searched as asked rather than failing the answer.
+    """
+    if not needs_translation(question):
+        return question
+    cache = get_translation_cache()
+    query = cache.get(question, language)
+    with tracing.span("query_translation", cached=query is not None) as span:
+        if query is None:
+            prompt = query_translation_prompt(question)
+            try:
+                content = (llm or get_llm()).invoke(prompt).content
+            except Exception as e:
+                # Not cached, so the next request tries again
+                logger.warning("Query translation failed, searching the question as asked: %s", e)
+                span["error"] = type(e).__name__
+                return question
+            query = parse_query_translation(content, question)
+            cache.put(question, language, query)
+            span["prompt_tokens"] = count_tokens(prompt)
+            span["completion_tokens"] = count_tokens(content)
+    return query
+
+
+def _lookup_translated(answer_cache, question, language, llm, attributes):
+    """Return (English query, cached response or None); translated answers are cached under the English query"""
+    query = retrieval_query(question, language, llm)
+    cached = None
+    with tracing.span("cache_lookup"):
+        found = answer_cache.lookup(query, language) if answer_cache is not None else None
+        if found is not None:
+            cached = {"answer": found["answer"], "references": found["references"], "cached": True}
+    attributes["cached"] = cached is not None
+    return query, cached
+
+
+def _translation_prompt(answer, language):
+    """Return (prompt, prompt_tokens) for translating the canonical answer into language"""
+    prompt = ANSWER_TRANSLATION_PROMPT.format(language=language, answer=answer)
+    return prompt, count_tokens(prompt)
+
+
+def _finish_translated(answer_cache, query, language, canonical, answer, prompt_tokens):
+    """Cache the translated answer and return the response"""
+    if answer_cache is not None:
+        with tracing.span("cache_store"):
+            answer_cache.store(query, language, answer, canonical["references"])
+    # Tokens paid by this request: the canonical prompt only if it was not cached
+    canonical_tokens = 0 if canonical["cached"] else canonical.get("prompt_tokens", 0)
+    return {
+        "answer": answer,
+        "references": canonical["references"],
+        "cached": False,
+        "canonical_cached": canonical["cached"],
+        "prompt_tokens": canonical_tokens + prompt_tokens,
+    }
+
+
+def create_translated_response(retriever, question, language, answer_cache=None, llm=None):
+    """Answer a standalone question by translating the canonical-language answer"""
+    llm = llm or get_llm()
+    with tracing.trace("translated_answer", language=language) as attributes:
+        query, cached = _lookup_translated(answer_cache, question, language, llm, attributes)
+        if cached is not None:
+            return cached
+
+        canonical = create_enhanced_rag_response(retriever, query, "", CANONICAL_LANGUAGE, answer_cache, llm)
+        attributes["canonical_cached"] = canonical["cached"]
+
+        prompt, prompt_tokens = _translation_prompt(canonical["answer"], language)
+        with tracing.span("answer_translation", prompt_tokens=prompt_tokens) as span:
+            response = llm.invoke(prompt)
+            if tracing.enabled():
+                span["completion_tokens"] = count_tokens(response.content)
+        # Drop a citations block, should the model repeat one
+        answer = split_citations(response.content)[0].strip()
+        return _finish_translated(answer_cache, query, language, canonical, answer, prompt_tokens)
+
+
+def stream_translated_response(retriever, question, language, answer_cache=None, llm=None):
+    """Streaming create_translated_response: the translation is streamed, the canonical answer is not"""
+    llm = llm or get_llm()
+    with tracing.trace("translated_answer", language=language, streaming=True) as attributes:
+        query, cached = _lookup_translated(answer_cache, question, language, llm, attributes)
+        if cached is not None:
+            yield {"type": "token", "content": cached["answer"]}
+            yield dict(cached, type="done")
+            return
+
+        canonical = create_enhanced_rag_response(retriever, query, "", CANONICAL_LANGUAGE, answer_cache, llm)
+        attributes["canonical_cached"] = canonical["cached"]
+
+        prompt, prompt_tokens = _translation_prompt(canonical["answer"], language)
+        with tracing.span("answer_translation", prompt_tokens=prompt_tokens) as span:
+            stream = AnswerStream(span)
+            for chunk in llm.stream(prompt):
+                visible = stream.feed(chunk.content)
+                if visible:
+                    yield {"type": "token", "content": visible}
+            rest, answer, _ = stream.finish()
+        if rest:
+            yield {"type": "token", "content": rest}
+        yield dict(_finish_translated(answer_cache, query, language, canonical, answer, prompt_tokens), type="done")
+
+
+async def acreate_translated_response(retriever, question, language, answer_cache=None, llm=None):
+    """Async create_translated_response"""
+    llm = llm or get_llm()
+    with tracing.trace("translated_answer", language=language) as attributes:
+        query, cached = await asyncio.to_thread(_lookup_translated, answer_cache, question, language, llm, attributes)
+        if cached is not None:
+            return cached
+
+        canonical = await acreate_enhanced_rag_response(retriever, query, "", CANONICAL_LANGUAGE, answer_cache, llm)
+        attributes["canonical_cached"] = canonical["cached"]
+
+        prompt, prompt_tokens = _translation_prompt(canonical["answer"], language)
+        with tracing.span("answer_translation", prompt_tokens=prompt_tokens) as span:
+            response = await llm.ainvoke(prompt)
+            if tracing.enabled():
+                span["completion_tokens"] = count_tokens(response.content)
+        answer = split_citations(response.content)[0].strip()
+        return await asyncio.to_thread(_finish_translated, answer_cache, query, language, canonical, answer,
+                                       prompt_tokens)
+
+
+async def astream_translated_response(retriever, question, language, answer_cache=None, llm=None):
+    """Async stream_translated_response, yielding the same events"""
+    llm = llm or get_llm()
+    with tracing.trace("translated_answer", language=language, streaming=True) as attributes:
+        query, cached = await asyncio.to_thread(_lookup_translated, answer_cache, question, language, llm, attributes)
+        if cached is not None:
+            yield {"type": "token", "content": cached["answer"]}
+            yield dict(cached, type="done")
+            return
+
+        canonical = await acreate_enhanced_rag_response(retriever, query, "", CANONICAL_LANGUAGE, answer_cache, llm)
+        attributes["canonical_cached"] = canonical["cached"]
+
+        prompt, prompt_tokens = _translation_prompt(canonical["answer"], language)
+        with tracing.span("answer_translation", prompt_tokens=prompt_tokens) as span:
+            stream = AnswerStream(span)
+            async for chunk in llm.astream(prompt):
+                visible = stream.feed(chunk.content)
+                if visible:
+                    yield {"type": "token", "content": visible}
+            rest, answer, _ = stream.finish()
+        if rest:
+            yield {"type": "token", "content": rest}
+        result = await asyncio.to_thread(_finish_translated, answer_cache, query, language, canonical, answer,
+                                         prompt_tokens)
+        yield dict(result, type="done")
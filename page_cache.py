@@ -0,0 +1,202 @@
+"""Page-level PDF text extraction cache, kept separate from chunking.
+
+Parsing the larger PDFs with PyPDF dominates ingestion time, so every PDF is
+parsed once and its pages are stored in ``cache/pages/`` as gzip-compressed
+JSONL keyed on the file's SHA-256. Each line holds one page:
+
+    {"page": 0, "text": "...", "raw": "...", "metadata": {...}}
+
+``text`` is cleaned once at extraction time: running headers and footers that
+repeat across pages are dropped and words hyphenated across line breaks are
+joined. ``raw`` is the text as PyPDF returned it, for parsers such as the
+statute index that rely on the original layout.
+
+Chunking and embedding read from this cache, so changing the chunk size only
+re-splits cached text (and unchanged chunks are not even re-embedded, see
+embedding_backends.py).
+
+Usage:
+    python page_cache.py                 # extract every PDF under data/ not yet cached
+    python page_cache.py --prune         # also delete entries for PDFs no longer present
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils import CACHE_DIR
+
+PAGE_CACHE_DIR = os.path.join(CACHE_DIR, "pages")
+# Bump when extraction or cleaning changes so stale entries are not reused
+EXTRACTION_VERSION = 1
+
+# Lines within this many non-empty lines of a page's top or bottom may be headers or footers
+EDGE_LINES = 2
+# A line is a running header or footer if it repeats on at least this share of pages
+REPEATED_LINE_FRACTION = 0.3
+MIN_REPEATED_PAGES = 3
+HYPHENATED_BREAK_PATTERN = re.compile(r"(\w)-[ \t]*\n[ \t]*([a-z])")
+
+
+def file_sha256(path):
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_path(file_hash, cache_dir=PAGE_CACHE_DIR):
+    """Return the cache file for a PDF's content hash"""
+    return os.path.join(cache_dir, f"{file_hash}.v{EXTRACTION_VERSION}.jsonl.gz")
+
+
+def _line_key(line):
+    # Page numbers in headers ("Sec. 1] ... 3") differ per page
+    return re.sub(r"\d+", "#", line.strip())
+
+
+def _edge_indexes(lines):
+    """Return the indexes of the first and last EDGE_LINES non-empty lines"""
+    non_empty = [i for i, line in enumerate(lines) if line.strip()]
+    return set(non_empty[:EDGE_LINES] + non_empty[-EDGE_LINES:])
+
+
+def clean_pages(texts):
+    """Drop repeated headers/footers and join hyphenated line breaks across a document's pages"""
+    page_lines = [(text or "").splitlines() for text in texts]
+    counts = Counter()
+    for lines in page_lines:
+        counts.update({_line_key(lines[i]) for i in _edge_indexes(lines)})
+    threshold = max(MIN_REPEATED_PAGES, REPEATED_LINE_FRACTION * len(texts))
+    repeated = {key for key, count in counts.items() if count >= threshold and key.strip("#")}
+
+    cleaned = []
+    for lines in page_lines:
+        edges = _edge_indexes(lines)
+        kept = [line for i, line in enumerate(lines)
+                if not (i in edges and (_line_key(line) in repeated or line.strip().isdigit()))]
+        cleaned.append(HYPHENATED_BREAK_PATTERN.sub(r"\1\2", "\n".join(kept)).strip())
+    return cleaned
+
+
+def extract_pages(pdf_path):
+    """Parse a PDF with PyPDF and return its cleaned page records"""
+    from langchain_community.document_loaders import PyPDFLoader
+
+    docs = PyPDFLoader(pdf_path).load()
+    texts = clean_pages([doc.page_content for doc in docs])
+    pages = []
+    for i, (doc, text) in enumerate(zip(docs, texts)):
+        metadata = {key: value for key, value in doc.metadata.items() if key != "source"}
+        pages.append({"page": metadata.get("page", i), "text": text, "raw": doc.page_content, "metadata": metadata})
+    return pages
+
+
+def write_pages(pages, file_hash, cache_dir=PAGE_CACHE_DIR):
+    """Atomically write a PDF's page records to the cache"""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = cache_path(file_hash, cache_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        for page in pages:
+            f.write(json.dumps(page, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+
+
+def read_pages(file_hash, cache_dir=PAGE_CACHE_DIR):
+    """Return a PDF's cached page records, or None if it has not been extracted"""
+    path = cache_path(file_hash, cache_dir)
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, ValueError) as e:
+        print(f"Ignoring corrupt page cache entry {path}: {e}")
+        return None
+
+
+def load_pages(pdf_path, file_hash=None, cache_dir=PAGE_CACHE_DIR):
+    """Return a PDF's page records, extracting and caching them on a miss.
+
+    With cache_dir=None the PDF is always parsed and nothing is written.
+    """
+    if cache_dir is None:
+        return extract_pages(pdf_path)
+    file_hash = file_hash or file_sha256(pdf_path)
+    pages = read_pages(file_hash, cache_dir)
+    if pages is None:
+        pages = extract_pages(pdf_path)
+        write_pages(pages, file_hash, cache_dir)
+    return pages
+
+
+def _extract_to_cache(pdf_path, file_hash, cache_dir):
+    pages = extract_pages(pdf_path)
+    write_pages(pages, file_hash, cache_dir)
+    return len(pages)
+
+
+def fill_cache(files, workers=None, cache_dir=PAGE_CACHE_DIR):
+    """Extract the PDFs in files ({path: sha256}) that are not cached yet, in a process pool"""
+    missing = {path: sha for path, sha in files.items() if not os.path.exists(cache_path(sha, cache_dir))}
+    if not missing:
+        return 0
+    workers = workers or min(len(missing), os.cpu_count() or 1)
+    print(f"Extracting text from {len(missing)} PDFs with {workers} workers")
+    start = time.time()
+    pages = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_extract_to_cache, path, sha, cache_dir): path
+            for path, sha in sorted(missing.items())
+        }
+        for future in as_completed(futures):
+            try:
+                pages += future.result()
+            except Exception as e:
+                # Left uncached; the chunking step retries it and reports the error
+                print(f"Error extracting {futures[future]}: {e}")
+    print(f"Extracted {pages} pages in {time.time() - start:.1f}s")
+    return pages
+
+
+def prune_cache(file_hashes, cache_dir=PAGE_CACHE_DIR):
+    """Delete cache entries whose hash is not in file_hashes, or from an older extraction version"""
+    if not os.path.isdir(cache_dir):
+        return 0
+    keep = {os.path.basename(cache_path(sha, cache_dir)) for sha in file_hashes}
+    removed = 0
+    for name in os.listdir(cache_dir):
+        if name.endswith(".jsonl.gz") and name not in keep:
+            os.remove(os.path.join(cache_dir, name))
+            removed += 1
+    return removed
+
+
+def main():
+    from ingest import DATA_DIR, discover_pdfs
+
+    parser = argparse.ArgumentParser(description="Fill the page-level PDF text cache")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--cache-dir", default=PAGE_CACHE_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--prune", action="store_true", help="delete entries for PDFs no longer in data-dir")
+    args = parser.parse_args()
+
+    files = {path: file_sha256(path) for path in discover_pdfs(args.data_dir)}
+    print(f"Found {len(files)} PDF files")
+    fill_cache(files, args.workers, args.cache_dir)
+    if args.prune:
+        print(f"Pruned {prune_cache(files.values(), args.cache_dir)} stale cache entries")
+
+
+if __name__ == "__main__":
+    main()
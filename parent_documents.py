@@ -0,0 +1,197 @@
+"""Two-level chunking for parent-document retrieval.
+
+Fixed-size chunks often cut a section or article in half, so the model sees
+half a provision unless k is raised. With ``CHUNKING=parent``, ingestion splits
+each document into parent units instead:
+
+- bare acts (see statutes.STATUTE_SOURCES): one parent per section or article,
+  parsed as for the statute index. Pages before and after the body of the act
+  (table of contents, schedules) fall back to paragraph parents.
+- everything else: paragraphs (judgment paragraphs start "12. ..."), grouped
+  per page up to ``parent_max_chars``.
+
+Each parent is cut into small overlapping child spans. Only the children are
+embedded and searched. The parents are kept by ID in
+``chroma_db/parent_store.sqlite3``. ``retrievers.ParentDocumentRetriever``
+replaces the matched children with their de-duplicated parents under the
+context token budget.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+
+from statutes import STATUTE_SOURCES, parse_provisions, provision_heading, provision_title
+from utils import CHROMA_DIR
+
+# "window" (fixed-size chunks, see ingest.py) or "parent"
+CHUNKING_MODE = os.getenv("CHUNKING", "window")
+PARENT_CHUNKING = {"mode": "parent", "child_size": 400, "child_overlap": 80, "parent_max_chars": 4000}
+PARENT_STORE_FILENAME = "parent_store.sqlite3"
+# A numbered paragraph of a judgment or act starts a line as "12. The appellant ..."
+PARAGRAPH_START_PATTERN = re.compile(r"^\s*\d{1,3}\.\s+(?=[A-Z(\"'])")
+
+
+def parent_store_path(persist_directory=CHROMA_DIR):
+    return os.path.join(persist_directory, PARENT_STORE_FILENAME)
+
+
+def parent_id(source, key):
+    """Return the stable ID of a parent unit within a source PDF"""
+    return hashlib.sha256(f"{source}|{key}".encode("utf-8")).hexdigest()[:32]
+
+
+def _split_text(text, size, overlap):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    return RecursiveCharacterTextSplitter(chunk_size=size, chunk_overlap=overlap, length_function=len).split_text(text)
+
+
+def paragraphs(text):
+    """Split page text into paragraphs at blank lines and numbered paragraph starts"""
+    found, current = [], []
+    for line in (text or "").splitlines():
+        if not line.strip() or PARAGRAPH_START_PATTERN.match(line):
+            if current:
+                found.append("\n".join(current).strip())
+            current = [line] if line.strip() else []
+        else:
+            current.append(line)
+    if current:
+        found.append("\n".join(current).strip())
+    return [paragraph for paragraph in found if paragraph]
+
+
+def group_paragraphs(items, max_chars):
+    """Pack consecutive paragraphs into units of at most max_chars, splitting longer ones"""
+    units, current = [], ""
+    for paragraph in items:
+        if len(paragraph) > max_chars:
+            if current:
+                units.append(current)
+                current = ""
+            units.extend(_split_text(paragraph, max_chars, 0))
+        elif current and len(current) + len(paragraph) + 1 > max_chars:
+            units.append(current)
+            current = paragraph
+        else:
+            current = f"{current}\n{paragraph}" if current else paragraph
+    if current:
+        units.append(current)
+    return units
+
+
+def _provision_units(records, code, max_number, max_chars):
+    """Return (units, body_pages) for a bare act: one unit per provision, split if longer than max_chars"""
+    provisions = parse_provisions([(page["page"], page["raw"]) for page in records], code, max_number)
+    units = []
+    for number, provision in provisions.items():
+        title = provision_title(provision["text"])
+        text = f"{provision_heading(code, number, title)}:\n{provision['text']}"
+        parts = [text] if len(text) <= max_chars else _split_text(text, max_chars, 0)
+        for part_number, part in enumerate(parts, 1):
+            key = f"{code}:{number}" + (f"#{part_number}" if len(parts) > 1 else "")
+            units.append((key, part, {"page": provision["page"], "section": number}))
+    pages = [provision["page"] for provision in provisions.values()]
+    return units, (min(pages), max(pages)) if pages else None
+
+
+def split_parents(pdf_path, records, chunking=PARENT_CHUNKING):
+    """Return (parents, children) for a PDF's cached page records.
+
+    parents are {"id", "text", "metadata"} dicts; children are (text, metadata)
+    pairs whose metadata links them to their parent through "parent_id".
+    """
+    max_chars = chunking["parent_max_chars"]
+    units = []
+    body_pages = None
+    statute = {filename: (code, max_number) for code, (filename, max_number) in STATUTE_SOURCES.items()}
+    if os.path.basename(pdf_path) in statute:
+        code, max_number = statute[os.path.basename(pdf_path)]
+        units, body_pages = _provision_units(records, code, max_number, max_chars)
+
+    for page in records:
+        # Pages at the edges of the act hold the contents and schedules besides provisions
+        if body_pages and body_pages[0] < page["page"] < body_pages[1]:
+            continue
+        for i, text in enumerate(group_paragraphs(paragraphs(page["text"]), max_chars)):
+            units.append((f"page:{page['page']}:{i}", text, {"page": page["page"]}))
+
+    parents, children = [], []
+    for key, text, metadata in units:
+        pid = parent_id(pdf_path, key)
+        parents.append({"id": pid, "text": text, "metadata": metadata})
+        for i, child in enumerate(_split_text(text, chunking["child_size"], chunking["child_overlap"])):
+            children.append((child, {"page": metadata["page"], "parent_id": pid, "child_index": i}))
+    return parents, children
+
+
+class ParentStore:
+    """Parent units by ID in SQLite, next to the vector store"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS parents (
+                id TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                text TEXT NOT NULL,
+                metadata_json TEXT NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS parents_source ON parents (source)")
+        self._conn.commit()
+
+    @classmethod
+    def open(cls, persist_directory=CHROMA_DIR, reset=False):
+        """Open or create the store of a vector store directory, optionally emptying it"""
+        os.makedirs(persist_directory, exist_ok=True)
+        store = cls(parent_store_path(persist_directory))
+        if reset:
+            with store._lock:
+                store._conn.execute("DELETE FROM parents")
+                store._conn.commit()
+        return store
+
+    @classmethod
+    def load(cls, persist_directory=CHROMA_DIR):
+        """Open the store written at ingestion, or return None if the index has none"""
+        path = parent_store_path(persist_directory)
+        return cls(path) if os.path.exists(path) else None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM parents").fetchone()[0]
+
+    def replace_source(self, source, parents):
+        """Replace the parents of one PDF"""
+        with self._lock:
+            self._conn.execute("DELETE FROM parents WHERE source = ?", (source,))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO parents (id, source, text, metadata_json) VALUES (?, ?, ?, ?)",
+                [(parent["id"], source, parent["text"], json.dumps(parent["metadata"], ensure_ascii=False))
+                 for parent in parents],
+            )
+            self._conn.commit()
+
+    def delete_source(self, source):
+        """Delete the parents of a PDF that was removed"""
+        self.replace_source(source, [])
+
+    def get(self, ids):
+        """Return {id: (text, metadata)} for the parents found among ids"""
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, text, metadata_json FROM parents WHERE id IN ({','.join('?' * len(ids))})", ids
+            ).fetchall()
+        return {row[0]: (row[1], json.loads(row[2])) for row in rows}
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,119 @@
+"""Cross-encoder reranking of retrieved candidates.
+
+Bi-encoder retrieval ranks chunks by embedding similarity alone. A small
+cross-encoder reads the query and each chunk together and ranks them far more
+precisely, so fewer chunks can go into the prompt. ``RerankingRetriever``
+(in retrievers.py) over-fetches candidates, scores them here and keeps the
+best few.
+
+Scores are cached per (query, chunk) pair, and scoring runs in batches
+against a latency budget: the first batch is always scored, and once the next
+batch would not finish in time, the remaining candidates keep their retrieval
+order behind the scored ones.
+
+Enable with ``RERANK=1``; ``RERANKER_MODEL``, ``RERANK_CANDIDATES``,
+``RERANK_TOP_N`` and ``RERANK_BUDGET_MS`` tune it.
+"""
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import tracing
+
+RERANK_ENABLED = os.getenv("RERANK", "").lower() in ("1", "true", "yes")
+RERANKER_MODEL_NAME = os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "24"))
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "6"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "400"))
+RERANK_BATCH_SIZE = 8
+# Chunks are truncated to this many characters before scoring (the model reads 512 tokens at most)
+MAX_PASSAGE_CHARS = 2000
+
+
+def sigmoid(score):
+    """Map a cross-encoder logit to (0, 1)"""
+    return 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, score))))
+
+
+class CrossEncoderReranker:
+    """Scores (query, passage) pairs with a CPU cross-encoder, caching scores in memory"""
+
+    def __init__(self, model_name=RERANKER_MODEL_NAME, batch_size=RERANK_BATCH_SIZE,
+                 max_cache_entries=20000, model=None):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_cache_entries = max_cache_entries
+        self._model = model
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # Running estimate of seconds per scored pair, used to stop before overrunning the budget
+        self._seconds_per_pair = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    with tracing.span("load_reranker", model=self.model_name):
+                        self._model = CrossEncoder(self.model_name, device="cpu")
+        return self._model
+
+    def _cache_key(self, query, key):
+        return hashlib.sha256(query.encode("utf-8")).hexdigest()[:16], key
+
+    def _cached(self, cache_key):
+        with self._lock:
+            score = self._cache.get(cache_key)
+            if score is not None:
+                self._cache.move_to_end(cache_key)
+            return score
+
+    def _store(self, cache_key, score):
+        with self._lock:
+            self._cache[cache_key] = score
+            self._cache.move_to_end(cache_key)
+            while len(self._cache) > self.max_cache_entries:
+                self._cache.popitem(last=False)
+
+    def score(self, query, passages, keys, budget_ms=RERANK_BUDGET_MS):
+        """Return (scores, stats) for passages in order, None for any left unscored by the budget.
+
+        keys identify the passages in the cache (e.g. content hashes). The
+        first batch is always scored, so the per-pair estimate keeps being
+        re-measured and one slow batch cannot disable reranking for good.
+        """
+        # Loaded before the clock starts, so the first call does not count model loading as scoring time
+        model = self.model
+        start = time.perf_counter()
+        budget = budget_ms / 1000 if budget_ms is not None else None
+        scores = [None] * len(passages)
+        pending = []
+        for i, key in enumerate(keys):
+            scores[i] = self._cached(self._cache_key(query, key))
+            if scores[i] is None:
+                pending.append(i)
+        stats = {"cached": len(passages) - len(pending), "scored": 0, "skipped": 0}
+
+        for batch_start in range(0, len(pending), self.batch_size):
+            batch = pending[batch_start:batch_start + self.batch_size]
+            if budget is not None and batch_start > 0 and self._seconds_per_pair is not None:
+                expected = time.perf_counter() - start + self._seconds_per_pair * len(batch)
+                if expected > budget:
+                    stats["skipped"] = len(pending) - batch_start
+                    break
+            batch_start_time = time.perf_counter()
+            predicted = model.predict(
+                [(query, passages[i][:MAX_PASSAGE_CHARS]) for i in batch], batch_size=self.batch_size
+            )
+            per_pair = (time.perf_counter() - batch_start_time) / len(batch)
+            self._seconds_per_pair = per_pair if self._seconds_per_pair is None \
+                else 0.8 * self._seconds_per_pair + 0.2 * per_pair
+            for i, value in zip(batch, predicted):
+                scores[i] = float(value)
+                self._store(self._cache_key(query, keys[i]), scores[i])
+            stats["scored"] += len(batch)
+        return scores, stats
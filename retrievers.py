@@ -0,0 +1,414 @@
+"""Retrievers layered on top of the Chroma vector store"""
+import hashlib
+from typing import Any, Dict, List
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from context_packer import CONTEXT_TOKEN_BUDGET, mmr_order, pack_context
+from document_types import code_filter
+import tracing
+from index_versions import resolve_index_dir
+from lexical_index import LexicalIndex
+from parent_documents import ParentStore
+from reranker import (
+    RERANK_BUDGET_MS,
+    RERANK_CANDIDATES,
+    RERANK_ENABLED,
+    RERANK_TOP_N,
+    CrossEncoderReranker,
+    sigmoid,
+)
+from statutes import StatuteIndex
+from utils import CHROMA_DIR, load_vector_store
+
+# Query-time score multipliers, replacing the old practice of storing
+# Constitution chunks 3x and BNS chunks 2x in the collection
+DEFAULT_BOOSTS = {
+    "source_type": {
+        "constitution": 1.10,
+        "bns_2024": 1.05,
+    },
+    "priority": {
+        "high": 1.05,
+        "normal": 1.0,
+    },
+}
+
+
+def content_hash(doc):
+    """Return the content hash of a document, preferring the one stored at ingestion"""
+    stored = (doc.metadata or {}).get("content_hash")
+    if stored:
+        return stored
+    return hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+
+
+def boost_factor(metadata, boosts=DEFAULT_BOOSTS):
+    """Return the combined score multiplier for a chunk's metadata"""
+    factor = 1.0
+    for field, multipliers in boosts.items():
+        value = (metadata or {}).get(field)
+        if value is not None:
+            factor *= multipliers.get(value, 1.0)
+    return factor
+
+
+def boost_and_deduplicate(scored_docs, k, boosts=DEFAULT_BOOSTS):
+    """Apply source boosts to (document, score) pairs, drop repeated content and keep the top k"""
+    best = {}
+    for doc, score in scored_docs:
+        factor = boost_factor(doc.metadata, boosts)
+        # Dividing negative scores keeps a boost from pushing them further down
+        boosted = score * factor if score >= 0 else score / factor
+        key = content_hash(doc)
+        if key not in best or boosted > best[key][1]:
+            best[key] = (doc, boosted)
+
+    ranked = sorted(best.values(), key=lambda pair: pair[1], reverse=True)[:k]
+    results = []
+    for doc, score in ranked:
+        metadata = dict(doc.metadata or {})
+        metadata["relevance_score"] = score
+        results.append(Document(page_content=doc.page_content, metadata=metadata, id=getattr(doc, "id", None)))
+    return results
+
+
+def matches_filter(metadata, where):
+    """Return True if metadata satisfies an equality filter such as {"code": "BNS"}"""
+    return all((metadata or {}).get(key) == value for key, value in where.items())
+
+
+class BoostedRetriever(BaseRetriever):
+    """Similarity retriever that boosts priority sources and de-duplicates results.
+
+    Candidates are over-fetched from the vector store so that duplicated
+    chunks left over from older ingestions cannot crowd out distinct results.
+    A query aimed at one code (see document_types.py) searches only that
+    code's chunks, falling back to the whole store if none match.
+    """
+
+    vector_store: Any
+    k: int = 5
+    fetch_k: int = 20
+    boosts: Dict[str, Dict[str, float]] = DEFAULT_BOOSTS
+    filter_by_code: bool = True
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        where = code_filter(query) if self.filter_by_code else None
+        with tracing.span("vector_search", filter=where and where["code"]):
+            fetch_k = max(self.fetch_k, self.k)
+            scored_docs = []
+            if where:
+                scored_docs = self.vector_store.similarity_search_with_relevance_scores(
+                    query, k=fetch_k, filter=where
+                )
+            if not scored_docs:
+                scored_docs = self.vector_store.similarity_search_with_relevance_scores(query, k=fetch_k)
+        return boost_and_deduplicate(scored_docs, self.k, self.boosts)
+
+
+def reciprocal_rank_fusion(result_lists, k, rrf_k=60):
+    """Fuse ranked document lists by reciprocal rank, keyed on content hash"""
+    scores = {}
+    documents = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results):
+            key = content_hash(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+            documents.setdefault(key, doc)
+
+    ranked = sorted(scores, key=scores.get, reverse=True)[:k]
+    fused = []
+    for key in ranked:
+        doc = documents[key]
+        metadata = dict(doc.metadata or {})
+        metadata["rrf_score"] = scores[key]
+        fused.append(Document(page_content=doc.page_content, metadata=metadata, id=getattr(doc, "id", None)))
+    return fused
+
+
+class HybridRetriever(BaseRetriever):
+    """Fuses dense similarity results with BM25 results by reciprocal rank.
+
+    Keyword-heavy queries (party names, statute titles, Latin terms) that dense
+    search misses are picked up lexically, so a smaller k gives the same or
+    better recall than raising k on dense search alone.
+    """
+
+    dense_retriever: BaseRetriever
+    lexical_index: Any
+    vector_store: Any
+    k: int = 4
+    fetch_k: int = 20
+    rrf_k: int = 60
+    filter_by_code: bool = True
+    # BM25 over-fetch factor when results are filtered to one code afterwards
+    filter_fetch_factor: int = 4
+
+    def _lexical_documents(self, query, where=None):
+        """Return the BM25 top fetch_k chunks (matching where, if any match) as documents, best first"""
+        hits = self.lexical_index.search(query, k=self.fetch_k * (self.filter_fetch_factor if where else 1))
+        if not hits:
+            return []
+        ids = [chunk_id for chunk_id, _ in hits]
+        found = self.vector_store._collection.get(ids=ids, include=["documents", "metadatas"])
+        by_id = {
+            chunk_id: Document(page_content=text, metadata=metadata or {}, id=chunk_id)
+            for chunk_id, text, metadata in zip(found["ids"], found["documents"], found["metadatas"])
+        }
+        docs = [by_id[chunk_id] for chunk_id in ids if chunk_id in by_id]
+        if where:
+            docs = [doc for doc in docs if matches_filter(doc.metadata, where)] or docs
+        return docs[:self.fetch_k]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        dense_docs = self.dense_retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        where = code_filter(query) if self.filter_by_code else None
+        with tracing.span("lexical_search", filter=where and where["code"]):
+            lexical_docs = self._lexical_documents(query, where)
+        return reciprocal_rank_fusion([dense_docs, lexical_docs], self.k, self.rrf_k)
+
+
+class StatuteLookupRetriever(BaseRetriever):
+    """Resolves explicit section/article citations from the statute index.
+
+    Cited provisions are returned verbatim ahead of the wrapped retriever's
+    results. When the query asks for nothing beyond the cited provisions,
+    vector search is skipped; otherwise fewer vector results are kept so the
+    exact provisions do not push the prompt past its usual size.
+    """
+
+    retriever: BaseRetriever
+    statute_index: Any
+    k: int = 5
+    min_vector_results: int = 2
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        with tracing.span("statute_lookup") as span:
+            statute_docs, fully_resolved = self.statute_index.resolve(query)
+            span["provisions"] = len(statute_docs)
+        if fully_resolved:
+            return statute_docs
+
+        vector_docs = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        if statute_docs:
+            vector_docs = vector_docs[:max(self.min_vector_results, self.k - len(statute_docs))]
+        return statute_docs + vector_docs
+
+
+class RerankingRetriever(BaseRetriever):
+    """Reorders over-fetched candidates by cross-encoder score and keeps the top_n.
+
+    Candidates the latency budget leaves unscored follow the scored ones in
+    their retrieval order.
+    """
+
+    retriever: BaseRetriever
+    reranker: Any
+    top_n: int = RERANK_TOP_N
+    budget_ms: float = RERANK_BUDGET_MS
+
+    @property
+    def k(self):
+        return self.top_n
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        docs = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        with tracing.span("rerank", candidates=len(docs)) as span:
+            scores, stats = self.reranker.score(
+                query, [doc.page_content for doc in docs], [content_hash(doc) for doc in docs], self.budget_ms
+            )
+            span["cached"] = stats["cached"]
+            span["scored"] = stats["scored"]
+            span["skipped"] = stats["skipped"]
+        scored = sorted((pair for pair in zip(docs, scores) if pair[1] is not None),
+                        key=lambda pair: pair[1], reverse=True)
+        unscored = [(doc, score) for doc, score in zip(docs, scores) if score is None]
+        results = []
+        for doc, score in (scored + unscored)[:self.top_n]:
+            metadata = dict(doc.metadata or {})
+            if score is not None:
+                metadata["rerank_score"] = score
+            results.append(Document(page_content=doc.page_content, metadata=metadata, id=getattr(doc, "id", None)))
+        return results
+
+
+class ContextPackingRetriever(BaseRetriever):
+    """Selects the chunks that are sent to the model from over-fetched candidates.
+
+    Candidates are ordered by maximal marginal relevance over their stored
+    embeddings, near-duplicates are dropped, overlapping chunks of a page are
+    merged and selection stops at a token budget. Exact statute provisions are
+    kept first. Since the answer's references are built from this retriever's
+    output, they always match the context the model saw.
+    """
+
+    retriever: BaseRetriever
+    vector_store: Any
+    max_tokens: int = CONTEXT_TOKEN_BUDGET
+    max_docs: int = 6
+    lambda_mult: float = 0.7
+    duplicate_threshold: float = 0.95
+
+    def _embeddings(self, docs):
+        """Return embeddings for docs, read from the collection where stored"""
+        ids = [doc.id for doc in docs if getattr(doc, "id", None)]
+        stored = {}
+        if ids:
+            found = self.vector_store._collection.get(ids=ids, include=["embeddings"])
+            stored = dict(zip(found["ids"], found["embeddings"]))
+        missing = [doc.page_content for doc in docs if getattr(doc, "id", None) not in stored]
+        computed = iter(self.vector_store.embeddings.embed_documents(missing) if missing else [])
+        return [
+            stored[doc.id] if getattr(doc, "id", None) in stored else next(computed)
+            for doc in docs
+        ]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        docs = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        with tracing.span("context_packing", candidates=len(docs)):
+            pinned = [doc for doc in docs if doc.metadata.get("source_type") == "statute_lookup"]
+            candidates = [doc for doc in docs if doc.metadata.get("source_type") != "statute_lookup"]
+            if len(candidates) > 1:
+                relevance = None
+                if any("rerank_score" in doc.metadata for doc in candidates):
+                    # Reranked candidates are ordered by the cross-encoder, not embedding similarity
+                    relevance = [sigmoid(doc.metadata["rerank_score"]) if "rerank_score" in doc.metadata else 0.0
+                                 for doc in candidates]
+                elif any("relevance_score" in doc.metadata for doc in candidates):
+                    # Scored by dense search, so the query need not be embedded again. Lexical-only
+                    # hits have no score and count as the weakest dense hit
+                    scores = [doc.metadata.get("relevance_score") for doc in candidates]
+                    floor = min(score for score in scores if score is not None)
+                    relevance = [floor if score is None else score for score in scores]
+                order = mmr_order(
+                    None if relevance is not None else self.vector_store.embeddings.embed_query(query),
+                    self._embeddings(candidates),
+                    self.lambda_mult,
+                    self.duplicate_threshold,
+                    relevance,
+                )
+                candidates = [candidates[i] for i in order]
+            return pack_context(pinned, candidates, self.max_tokens, self.max_docs)
+
+
+class ParentDocumentRetriever(BaseRetriever):
+    """Replaces matched child spans with their whole parent provision or paragraph.
+
+    Each parent takes the rank of its best child and appears once, and parents
+    already returned verbatim by the statute lookup are not repeated. Parents
+    are then packed under the token budget. Children without a parent (chunks
+    ingested in window mode) are kept as they are.
+    """
+
+    retriever: BaseRetriever
+    parent_store: Any
+    max_tokens: int = CONTEXT_TOKEN_BUDGET
+    max_docs: int = 6
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        docs = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        with tracing.span("parent_expansion", children=len(docs)) as span:
+            pinned = [doc for doc in docs if doc.metadata.get("source_type") == "statute_lookup"]
+            pinned_provisions = {(doc.metadata.get("code"), doc.metadata.get("section")) for doc in pinned}
+            children = [doc for doc in docs if doc.metadata.get("source_type") != "statute_lookup"]
+            parents = self.parent_store.get(
+                [doc.metadata["parent_id"] for doc in children if doc.metadata.get("parent_id")]
+            )
+
+            candidates, seen = [], set()
+            for doc in children:
+                parent_id = doc.metadata.get("parent_id")
+                if parent_id not in parents:
+                    candidates.append(doc)
+                    continue
+                if parent_id in seen:
+                    continue
+                seen.add(parent_id)
+                text, metadata = parents[parent_id]
+                if metadata.get("section") and (metadata.get("code"), metadata["section"]) in pinned_provisions:
+                    continue
+                metadata = {**metadata, "parent_id": parent_id}
+                for key in ("relevance_score", "rerank_score"):
+                    if key in doc.metadata:
+                        metadata[key] = doc.metadata[key]
+                candidates.append(Document(page_content=text, metadata=metadata, id=parent_id))
+            span["parents"] = len(seen)
+            return pack_context(pinned, candidates, self.max_tokens, self.max_docs)
+
+
+_reranker = None
+
+
+def get_reranker():
+    """Return the process-wide cross-encoder reranker, so its model and score cache are shared"""
+    global _reranker
+    if _reranker is None:
+        _reranker = CrossEncoderReranker()
+    return _reranker
+
+
+def build_retriever(vector_store, persist_directory=CHROMA_DIR, candidates=12, rerank=None):
+    """Compose the app's retriever: exact statute lookup, then hybrid BM25 + dense search,
+    optionally cross-encoder reranking, then context packing over the candidates
+    (or, for an index with a parent store, expansion of the matches to their parents).
+
+    rerank defaults to the RERANK env var; a reranker instance may also be passed.
+    """
+    persist_directory = resolve_index_dir(persist_directory)
+    if rerank is None:
+        rerank = RERANK_ENABLED
+    if rerank:
+        candidates = RERANK_CANDIDATES
+    lexical_index = LexicalIndex.load(persist_directory)
+    if lexical_index is not None:
+        search_retriever = HybridRetriever(
+            dense_retriever=BoostedRetriever(vector_store=vector_store, k=20),
+            lexical_index=lexical_index,
+            vector_store=vector_store,
+            k=candidates,
+        )
+    else:
+        # Stores ingested before the lexical index existed fall back to dense search
+        search_retriever = BoostedRetriever(vector_store=vector_store, k=candidates)
+
+    if rerank:
+        search_retriever = RerankingRetriever(
+            retriever=search_retriever,
+            reranker=rerank if isinstance(rerank, CrossEncoderReranker) else get_reranker(),
+        )
+
+    statute_retriever = StatuteLookupRetriever(
+        retriever=search_retriever,
+        statute_index=StatuteIndex.load(persist_directory),
+        k=search_retriever.k,
+    )
+    parent_store = ParentStore.load(persist_directory)
+    if parent_store is not None:
+        return ParentDocumentRetriever(retriever=statute_retriever, parent_store=parent_store)
+    return ContextPackingRetriever(retriever=statute_retriever, vector_store=vector_store)
+
+
+def load_index(directory=CHROMA_DIR, previous=None):
+    """Open the vector store and build the retriever for an index directory.
+
+    Used as the loader of index_versions.LiveIndex; previous resources lend
+    their embedding model so a hot swap does not load it again.
+    """
+    embeddings = previous["vector_store"].embeddings if previous else None
+    vector_store = load_vector_store(directory, embeddings=embeddings)
+    return {"vector_store": vector_store, "retriever": build_retriever(vector_store, directory)}
@@ -0,0 +1,284 @@
+"""Structured section/article index for the bare-act PDFs.
+
+Ingestion parses the IPC, BNS, BNSS, BSA and the Constitution into provisions
+keyed by (code, number) and persists them next to the vector store. At query
+time ``find_statute_references`` detects explicit citations such as
+"Section 302 IPC", "BNS s. 103" or "Article 21A" so that the exact provision
+text can be looked up in O(1) instead of relying on dense similarity, which is
+poor at matching numbers.
+"""
+import json
+import os
+import re
+
+from langchain_core.documents import Document
+
+from page_cache import PAGE_CACHE_DIR, load_pages
+from utils import CHROMA_DIR, LEGAL_CODES
+
+STATUTE_INDEX_FILENAME = "statute_index.json"
+CONSTITUTION = "Constitution"
+
+# Bare-act PDFs parsed into the index, with the highest provision number of each
+STATUTE_SOURCES = {
+    "IPC": ("penal_code_India.pdf", 511),
+    "BNS": ("bns_2024.pdf", 358),
+    "BNSS": ("bnss_2024.pdf", 531),
+    "BSA": ("bsa_2024.pdf", 170),
+    CONSTITUTION: ("constitutionOfIndia.pdf", 395),
+}
+
+# A provision starts a line as "302. Murder.—", "1[153AA. ...", "368. 1[Power ..." or "21A. Right to ..."
+HEADING_PATTERN = re.compile(r"^\s*(?:\d+\W?\[)?(\d{1,3})([A-Z]{0,3})\.\s*(?=\d+\[|[^\d\s])")
+FOOTNOTE_RULE_PATTERN = re.compile(r"^\s*_{5,}")
+# Amendment footnotes restart at "1." on every page; provisions use "—" or start with "(1)"
+FOOTNOTE_START_PATTERN = re.compile(
+    r"^\s*1\.\s*(?![(\s])(?!.*—)(?=.*(?:\bSubs\.|\bIns\.|\bRep\.|[Oo]mitted|w\.e\.f|A\.\s?O\.|\bAct\b|ibid))"
+)
+SCHEDULE_PATTERN = re.compile(
+    r"^\s*(?:THE\s+)?(?:(?:FIRST|SECOND|THIRD|FOURTH|FIFTH|SIXTH|SEVENTH|EIGHTH|NINTH|"
+    r"TENTH|ELEVENTH|TWELFTH)\s+)?SCHEDULE\b"
+)
+TITLE_PATTERN = re.compile(r"^(.{3,200}?)\.\s*—")
+# Gap allowed between consecutive headings (omitted or repealed provisions)
+MAX_HEADING_GAP = 10
+
+
+def provision_key(code, number):
+    """Return the index key for a provision"""
+    return f"{code}:{number.upper()}"
+
+
+def _page_lines(text):
+    """Return a page's body lines, dropping footnotes and bare page numbers"""
+    lines = []
+    for line in (text or "").splitlines():
+        if FOOTNOTE_RULE_PATTERN.match(line) or FOOTNOTE_START_PATTERN.match(line):
+            break
+        if line.strip().isdigit():
+            continue
+        lines.append(line)
+    return lines
+
+
+def parse_provisions(pages, code, max_number):
+    """Split a bare act's pages into {number: {"text", "page"}}.
+
+    Headings are accepted only when they continue the running sequence (or
+    restart it at 1), which filters out numbered clauses and list items. Each
+    restart begins a new pass; the table of contents and the schedules form
+    passes of their own, so each number is taken from the pass with the most
+    text, which is the body of the act.
+    """
+    passes = []
+    current = None
+    previous = None
+    closed = False
+
+    def finish():
+        if current is not None:
+            passes[-1][current["number"]] = {
+                "text": "\n".join(current["lines"]).strip(),
+                "page": current["page"],
+            }
+
+    for page_number, page_text in pages:
+        for line in _page_lines(page_text):
+            if previous is not None and previous[0] >= max_number and SCHEDULE_PATTERN.match(line):
+                finish()
+                current = None
+                closed = True
+
+            match = HEADING_PATTERN.match(line)
+            if match:
+                number, suffix = int(match.group(1)), match.group(2)
+                restart = number == 1 and not suffix
+                follows = previous is not None and not closed and (
+                    previous[0] < number <= previous[0] + MAX_HEADING_GAP
+                    or (number == previous[0] and suffix > previous[1])
+                )
+                if restart or follows:
+                    finish()
+                    if restart:
+                        passes.append({})
+                    closed = False
+                    previous = (number, suffix)
+                    current = {
+                        "number": f"{number}{suffix}",
+                        "page": page_number,
+                        "lines": [line[match.end():]],
+                    }
+                    continue
+
+            if current is not None:
+                current["lines"].append(line)
+
+    finish()
+
+    provisions = {}
+    passes.sort(key=lambda found: sum(len(p["text"]) for p in found.values()), reverse=True)
+    for found in passes:
+        for number, provision in found.items():
+            provisions.setdefault(number, provision)
+    return provisions
+
+
+def provision_title(text):
+    """Return the marginal heading of a provision if the text starts with one"""
+    match = TITLE_PATTERN.match(text.replace("\n", " "))
+    return match.group(1).strip() if match else ""
+
+
+def provision_heading(code, number, title=""):
+    """Return the heading a provision's text is shown under, such as 'Section 103 BNS (Murder)'"""
+    heading = f"Article {number}" if code == CONSTITUTION else f"Section {number} {code}"
+    return f"{heading} ({title})" if title else heading
+
+
+def build_statute_index(pdf_files, persist_directory=CHROMA_DIR, page_cache_dir=PAGE_CACHE_DIR):
+    """Parse the bare-act PDFs found in pdf_files ({path: sha256}) and persist the provision index"""
+    by_filename = {os.path.basename(path): path for path in pdf_files}
+    index = {}
+    for code, (filename, max_number) in STATUTE_SOURCES.items():
+        pdf_path = by_filename.get(filename)
+        if pdf_path is None:
+            continue
+        # The raw text keeps the layout the heading and footnote patterns expect
+        pages = [(page["page"], page["raw"])
+                 for page in load_pages(pdf_path, pdf_files[pdf_path], page_cache_dir)]
+        provisions = parse_provisions(pages, code, max_number)
+        for number, provision in provisions.items():
+            index[provision_key(code, number)] = {
+                "code": code,
+                "number": number,
+                "title": provision_title(provision["text"]),
+                "text": provision["text"],
+                "source": pdf_path,
+                "page": provision["page"],
+            }
+        print(f"Indexed {len(provisions)} provisions of {code}")
+
+    os.makedirs(persist_directory, exist_ok=True)
+    path = os.path.join(persist_directory, STATUTE_INDEX_FILENAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return index
+
+
+def _code_aliases():
+    """Map lower-cased abbreviations and full names from LEGAL_CODES to canonical codes"""
+    aliases = {}
+    for code, full_name in LEGAL_CODES.items():
+        aliases[code.lower()] = code
+        aliases[full_name.split(",")[0].lower()] = code
+    return aliases
+
+
+CODE_ALIASES = _code_aliases()
+_CODE_ALTERNATION = "|".join(
+    re.escape(alias).replace(r"\ ", r"\s+") for alias in sorted(CODE_ALIASES, key=len, reverse=True)
+)
+_SECTION_WORD = r"(?:sections?|secs?\.?|s\.|u/s\.?)"
+_NUMBER = r"(\d{1,3}[a-z]{0,3})\b"
+
+# "Section 302 IPC", "s. 103 of the BNS", "Section 35 of Bharatiya Nagarik Suraksha Sanhita"
+SECTION_THEN_CODE = re.compile(
+    rf"\b{_SECTION_WORD}\s*{_NUMBER}\s*(?:,\s*|of\s+(?:the\s+)?)?({_CODE_ALTERNATION})\b",
+    re.IGNORECASE,
+)
+# "IPC 302", "BNS section 103"
+CODE_THEN_SECTION = re.compile(
+    rf"\b({_CODE_ALTERNATION})\s*(?:{_SECTION_WORD}\s*)?{_NUMBER}",
+    re.IGNORECASE,
+)
+# "Article 21", "Art. 21A"
+ARTICLE = re.compile(rf"\b(?:articles?|art\.)\s*{_NUMBER}", re.IGNORECASE)
+
+# Words that may surround a bare citation without asking for anything more
+_FILLER_WORDS = {
+    "what", "is", "are", "the", "of", "under", "explain", "define", "tell", "me", "about",
+    "show", "text", "section", "sections", "article", "articles", "say", "says", "does",
+    "provision", "provisions", "indian", "constitution", "a", "an", "in", "and", "please",
+}
+
+
+def find_statute_references(query):
+    """Return (references, spans) for a query.
+
+    references are the distinct (code, number) pairs cited, in order of
+    appearance; spans are the (start, end) offsets of every citation found.
+    """
+    found = []
+    for match in SECTION_THEN_CODE.finditer(query):
+        code = CODE_ALIASES[re.sub(r"\s+", " ", match.group(2).lower())]
+        found.append((match.start(), code, match.group(1).upper(), match.span()))
+    for match in CODE_THEN_SECTION.finditer(query):
+        code = CODE_ALIASES[re.sub(r"\s+", " ", match.group(1).lower())]
+        found.append((match.start(), code, match.group(2).upper(), match.span()))
+    for match in ARTICLE.finditer(query):
+        found.append((match.start(), CONSTITUTION, match.group(1).upper(), match.span()))
+
+    references = []
+    spans = []
+    for _, code, number, span in sorted(found):
+        if (code, number) not in references:
+            references.append((code, number))
+        spans.append(span)
+    return references, spans
+
+
+class StatuteIndex:
+    """In-memory provision index with O(1) (code, number) lookup"""
+
+    def __init__(self, provisions):
+        self.provisions = provisions
+
+    @classmethod
+    def load(cls, persist_directory=CHROMA_DIR):
+        """Load the index written at ingestion, or an empty one if it is missing"""
+        path = os.path.join(persist_directory, STATUTE_INDEX_FILENAME)
+        if not os.path.exists(path):
+            return cls({})
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def __len__(self):
+        return len(self.provisions)
+
+    def lookup(self, code, number):
+        """Return the provision dict for (code, number), or None"""
+        return self.provisions.get(provision_key(code, number))
+
+    def resolve(self, query):
+        """Return (documents, fully_resolved) for the provisions cited in a query.
+
+        fully_resolved is True when every citation was found and the query asks
+        for nothing beyond the cited provisions, so vector search can be skipped.
+        """
+        references, spans = find_statute_references(query)
+        documents = []
+        for code, number in references:
+            provision = self.lookup(code, number)
+            if provision is None:
+                continue
+            heading = provision_heading(code, provision["number"], provision["title"])
+            documents.append(Document(
+                page_content=f"{heading}:\n{provision['text']}",
+                metadata={
+                    "source": provision["source"],
+                    "page": provision["page"],
+                    "code": code,
+                    "section": provision["number"],
+                    "source_type": "statute_lookup",
+                },
+            ))
+
+        remainder = query
+        for start, end in sorted(spans, reverse=True):
+            remainder = remainder[:start] + " " + remainder[end:]
+        leftover = [word for word in re.findall(r"[a-z]+", remainder.lower()) if word not in _FILLER_WORDS]
+
+        fully_resolved = bool(references) and len(documents) == len(references) and not leftover
+        return documents, fully_resolved
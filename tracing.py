@@ -0,0 +1,224 @@
+"""Lightweight per-stage tracing and metrics for the answer pipeline.
+
+Enable with ``TRACING=1`` (or ``set_enabled(True)``) for the whole process, or
+for the requests run inside a ``collect()`` block only (the app's debug panel
+uses this to trace just the sessions that ask for it). Each answer is recorded
+as a trace of timed spans (model loading, retrieval, prompt assembly, LLM call,
+references) with token counts. Finished traces are logged as one JSON line on
+the ``tracing`` logger, handed to the ``collect()`` block they ran in, and
+span durations and token counts are aggregated into Prometheus-style metrics
+served by ``api.py`` at ``/metrics``.
+
+When disabled, ``span()`` and ``trace()`` return a shared no-op context
+manager, so instrumented code pays a single flag check per stage.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+logger = logging.getLogger("tracing")
+
+METRIC_PREFIX = "legal_assistant"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_enabled = os.getenv("TRACING", "").lower() in ("1", "true", "yes")
+_current_trace = ContextVar("current_trace", default=None)
+_collector = ContextVar("trace_collector", default=None)
+
+
+class _Discard(dict):
+    """Attribute sink handed out by disabled spans"""
+
+    def __setitem__(self, key, value):
+        pass
+
+
+_NOOP = nullcontext(_Discard())
+
+
+def enabled():
+    """Return True if tracing is on for the whole process or inside the current collect() block"""
+    return _enabled or _collector.get() is not None
+
+
+def set_enabled(value):
+    """Turn tracing on or off for the whole process"""
+    global _enabled
+    _enabled = bool(value)
+    if _enabled and not logger.handlers and not logging.getLogger().handlers:
+        # Make traces visible when the host application has not configured logging
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+
+class Trace:
+    """Spans recorded while answering one request"""
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.spans = []
+        self.start = time.perf_counter()
+        self.started_at = time.time()
+        self.duration_ms = None
+
+    def to_dict(self):
+        return {
+            "trace": self.name,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            **self.attributes,
+            "spans": self.spans,
+        }
+
+
+class _Metrics:
+    """Thread-safe histograms and counters rendered in Prometheus text format"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+
+    def observe(self, name, labels, seconds):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {"buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    def increment(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def render(self):
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+        lines = []
+        with self.lock:
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, labels), histogram in sorted(self.histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, count in zip(LATENCY_BUCKETS, histogram["buckets"]):
+                        lines.append(f"{name}_bucket{label_text(labels, [('le', bound)])} {count}")
+                    lines.append(f"{name}_bucket{label_text(labels, [('le', '+Inf')])} {histogram['count']}")
+                    lines.append(f"{name}_sum{label_text(labels)} {histogram['sum']:.6f}")
+                    lines.append(f"{name}_count{label_text(labels)} {histogram['count']}")
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (metric, labels), value in sorted(self.counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{label_text(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = _Metrics()
+
+
+@contextmanager
+def _span(name, attributes):
+    record = {"name": name, **attributes}
+    trace = _current_trace.get()
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        record["duration_ms"] = round(seconds * 1000, 3)
+        metrics.observe(f"{METRIC_PREFIX}_stage_seconds", {"stage": name}, seconds)
+        for key, value in record.items():
+            if key.endswith("_tokens") and isinstance(value, int):
+                metrics.increment(f"{METRIC_PREFIX}_tokens_total", {"stage": name, "kind": key[:-len("_tokens")]}, value)
+        if trace is not None:
+            record["start_ms"] = round((start - trace.start) * 1000, 3)
+            trace.spans.append(record)
+        else:
+            # Spans outside a request, e.g. loading models at startup
+            logger.info(json.dumps({"span": record}, default=str))
+
+
+def span(name, **attributes):
+    """Time a pipeline stage. The yielded dict takes extra attributes, e.g. token counts
+    (keys ending in "_tokens" are also counted in the token metrics)"""
+    if not enabled():
+        return _NOOP
+    return _span(name, attributes)
+
+
+@contextmanager
+def _trace(name, attributes):
+    trace = Trace(name, attributes)
+    token = _current_trace.set(trace)
+    try:
+        yield trace.attributes
+    finally:
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            # A generator finished in a different context than it started in
+            _current_trace.set(None)
+        seconds = time.perf_counter() - trace.start
+        trace.duration_ms = round(seconds * 1000, 3)
+        metrics.observe(f"{METRIC_PREFIX}_request_seconds", {"operation": name}, seconds)
+        record = trace.to_dict()
+        logger.info(json.dumps(record, default=str))
+        collector = _collector.get()
+        if collector is not None:
+            collector.append(record)
+
+
+def trace(name, **attributes):
+    """Record every span inside the block as one request trace.
+
+    Inside another trace (e.g. the canonical answer of a translated one) it is
+    recorded as a span of that trace instead.
+    """
+    if not enabled():
+        return _NOOP
+    if _current_trace.get() is not None:
+        return _span(name, attributes)
+    return _trace(name, attributes)
+
+
+@contextmanager
+def collect(traces):
+    """Trace the requests run inside the block, in this context, appending each finished trace to traces"""
+    token = _collector.set(traces)
+    try:
+        yield traces
+    finally:
+        try:
+            _collector.reset(token)
+        except ValueError:
+            # A generator finished in a different context than it started in
+            _collector.set(None)
+
+
+def render_metrics():
+    """Return all metrics in the Prometheus text exposition format"""
+    return metrics.render()
+
+
+if _enabled:
+    set_enabled(True)
@@ -1,12 +1,14 @@
+import asyncio
+import hashlib
+import logging
 import os
+import re
+import threading
+import time
 from dotenv import load_dotenv
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
-from langchain_openai import ChatOpenAI
-from langchain.chains import create_retrieval_chain
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain.prompts import ChatPromptTemplate
-from langchain.memory import ConversationBufferMemory
+
+import tracing
+from citations import CITATION_INSTRUCTIONS, CitationStreamParser, cited_chunks, split_citations
 
 # Language configurations
 LANGUAGES = {
@@ -24,113 +26,196 @@ LEGAL_CODES = {
     "BSA": "Bharatiya Sakshya Adhiniyam, 2024"
 }
 
+# Language-specific instructions appended to the system prompt
+LANGUAGE_INSTRUCTIONS = {
+    "English": "Respond in English.",
+    "Hindi": "Respond in Hindi (हिंदी में उत्तर दें).",
+    "Bengali": "Respond in Bengali (বাংলায় উত্তর দিন)."
+}
+
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Constants
 CHROMA_DIR = "chroma_db"
+CACHE_DIR = "cache"
+
+# Embeddings configuration
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "huggingface")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
 
-def get_embeddings_model():
-    """Initialize and return the HuggingFace embeddings model"""
-    model_name = "sentence-transformers/all-MiniLM-L6-v2"
+def get_embeddings_model(backend=None, cache=False):
+    """Initialize and return the embeddings model.
+
+    backend is "huggingface" (the default PyTorch path), "onnx" or "onnx-int8"
+    (see embedding_backends.py); it defaults to the EMBEDDING_BACKEND env var.
+    With cache=True, document embeddings are stored in a content-addressed
+    on-disk cache so unchanged chunks are never re-encoded.
+    """
+    backend = backend or EMBEDDING_BACKEND
     
-    # Initialize the embeddings model
-    embeddings = HuggingFaceEmbeddings(
-        model_name=model_name,
-        model_kwargs={'device': 'cpu'},
-        encode_kwargs={'normalize_embeddings': True}
-    )
+    if backend == "huggingface":
+        # Imported here: torch and transformers take seconds to load
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        
+        # Initialize the embeddings model
+        embeddings = HuggingFaceEmbeddings(
+            model_name=EMBEDDING_MODEL_NAME,
+            model_kwargs={'device': 'cpu'},
+            encode_kwargs={'normalize_embeddings': True, 'batch_size': EMBEDDING_BATCH_SIZE}
+        )
+    else:
+        from embedding_backends import create_embeddings_backend
+        embeddings = create_embeddings_backend(backend)
+    
+    if cache:
+        from embedding_backends import with_embedding_cache
+        embeddings = with_embedding_cache(embeddings, backend)
     
     return embeddings
 
-def load_vector_store():
-    """Load the existing vector store"""
-    embeddings = get_embeddings_model()
+# "chroma" (default) or "flat" for the memory-mapped snapshot in flat_index.py
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE", "chroma")
+
+# LLM configuration
+LLM_MODEL_NAME = "gpt-4o-mini"
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+
+_llm = None
+_llm_lock = threading.Lock()
+
+def get_llm():
+    """Return the process-wide chat model, creating it on first use.
+
+    Reusing one instance keeps a single pooled HTTP client to the OpenAI API
+    instead of opening a new one per request. LLM_BACKEND=fake selects the
+    offline model from fake_llm.py for load tests and benchmarks.
+    """
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                if LLM_BACKEND == "fake":
+                    from fake_llm import FakeLegalChatModel
+                    _llm = FakeLegalChatModel()
+                else:
+                    from langchain_openai import ChatOpenAI
+                    _llm = ChatOpenAI(model=LLM_MODEL_NAME)
+    return _llm
+
+_token_encoder = None
+
+def count_tokens(text):
+    """Count tokens as the LLM sees them, estimating 4 characters per token if tiktoken is unavailable"""
+    global _token_encoder
+    if _token_encoder is None:
+        try:
+            import tiktoken
+            _token_encoder = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _token_encoder = False
+    if _token_encoder is False:
+        return len(text) // 4 + 1
+    return len(_token_encoder.encode(text, disallowed_special=()))
+
+def load_vector_store(persist_directory=CHROMA_DIR, embeddings=None):
+    """Load the existing vector store (the published version, if the directory is versioned).
+
+    Pass embeddings to reuse an already loaded model.
+    """
+    from index_versions import resolve_index_dir
     
-    if not os.path.exists(CHROMA_DIR):
-        raise ValueError(f"Vector store directory {CHROMA_DIR} does not exist. Please run ingest.py first.")
+    if embeddings is None:
+        with tracing.span("load_embeddings_model", backend=EMBEDDING_BACKEND):
+            embeddings = get_embeddings_model()
     
-    vector_store = Chroma(
-        persist_directory=CHROMA_DIR,
-        embedding_function=embeddings
-    )
+    persist_directory = resolve_index_dir(persist_directory)
+    if not os.path.exists(persist_directory):
+        raise ValueError(f"Vector store directory {persist_directory} does not exist. Please run ingest.py first.")
+    
+    with tracing.span("open_vector_store", backend=VECTOR_STORE_BACKEND):
+        if VECTOR_STORE_BACKEND == "flat":
+            from flat_index import FlatVectorStore
+            vector_store = FlatVectorStore.load(persist_directory, embeddings)
+            if vector_store is None:
+                raise ValueError(f"No flat index in {persist_directory}. Please run flat_index.py first.")
+        else:
+            from langchain_chroma import Chroma
+            vector_store = Chroma(
+                persist_directory=persist_directory,
+                embedding_function=embeddings
+            )
     
     return vector_store
 
+def get_index_fingerprint(persist_directory=CHROMA_DIR):
+    """Return a fingerprint that changes whenever the vector store is rebuilt or updated"""
+    from index_versions import resolve_index_dir
+    
+    persist_directory = resolve_index_dir(persist_directory)
+    manifest = os.path.join(persist_directory, "ingest_manifest.json")
+    if os.path.exists(manifest):
+        with open(manifest, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()[:16]
+    
+    # Stores built before ingest.py have no manifest, so fall back to the database file
+    database = os.path.join(persist_directory, "chroma.sqlite3")
+    if os.path.exists(database):
+        stat = os.stat(database)
+        return hashlib.sha256(f"{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+    return "missing"
+
 def extract_document_name(source_path):
-    """Extract document name from file path"""
+    """Extract document name from file path, for chunks ingested without a document_name"""
     if not source_path:
         return "Unknown Document"
     
     filename = os.path.basename(source_path).lower()
+    words = set(re.split(r"[^a-z0-9]+", filename))
     
     if "constitution" in filename:
         return "Constitution of India"
-    elif "bns" in filename and "2024" in filename:
-        return "Bharatiya Nyaya Sanhita (BNS) 2024"
-    elif "bnss" in filename and "2024" in filename:
+    elif "bnss" in words:
         return "Bharatiya Nagarik Suraksha Sanhita (BNSS) 2024"
-    elif "bsa" in filename and "2024" in filename:
+    elif "bns" in words:
+        return "Bharatiya Nyaya Sanhita (BNS) 2024"
+    elif "bsa" in words:
         return "Bharatiya Sakshya Adhiniyam (BSA) 2024"
-    elif "penal" in filename or "ipc" in filename:
+    elif "penal" in words or "ipc" in words:
         return "Indian Penal Code (IPC) 1860"
-    elif "crpc" in filename or "criminal" in filename:
+    elif "crpc" in words or "criminal" in words:
         return "Code of Criminal Procedure (CrPC) 1973"
-    elif "supreme" in filename or "sc" in filename:
+    elif "supreme" in words or "sc" in words:
         return "Supreme Court Judgments"
-    elif "high" in filename or "hc" in filename:
+    elif "high" in words or "hc" in words:
         return "High Court Cases"
     else:
         return "Legal Document"
 
-def generate_synthetic_reference(question, answer, language="English"):
-    """Generate synthetic reference when no chunks are found"""
-    llm = ChatOpenAI(model="gpt-4o-mini")
-    
-    reference_prompt = f"""Based on the legal question and answer provided, generate a realistic legal reference citation.
-
-Question: {question}
-Answer: {answer}
+def document_label(doc):
+    """Return a short human-readable label for a retrieved chunk"""
+    metadata = doc.metadata or {}
+    name = metadata.get("document_name") or extract_document_name(metadata.get('source', ''))
+    if metadata.get("section"):
+        label = "Article" if metadata.get("code") == "Constitution" else "Section"
+        return f"{name}, {label} {metadata['section']}"
+    if metadata.get("page") is not None:
+        return f"{name}, page {metadata['page'] + 1}"
+    return name
 
-Generate a reference in this format:
-- Document: [Most likely Indian legal document name]
-- Section/Article: [Relevant section or article number]
-- Content: [Brief excerpt that would support the answer]
-
-Use these document types when appropriate:
-- Constitution of India (for fundamental rights, articles)
-- Indian Penal Code (IPC) 1860 (for criminal offenses)
-- Code of Criminal Procedure (CrPC) 1973 (for procedures)
-- Bharatiya Nyaya Sanhita (BNS) 2024 (for new criminal laws)
-- Supreme Court Judgments (for landmark cases)
+def format_context(retrieved_docs):
+    """Number the retrieved chunks so the model can cite them"""
+    return "\n\n".join(
+        f"[{i}] ({document_label(doc)})\n{doc.page_content}"
+        for i, doc in enumerate(retrieved_docs, 1)
+    )
 
-Respond in {language}."""
-    
-    try:
-        response = llm.invoke(reference_prompt)
-        return response.content
-    except:
-        return "Reference: Based on general knowledge of Indian law"
-
-def create_enhanced_rag_response(retriever, question, chat_history="", language="English"):
-    """Create enhanced RAG response with references"""
-    llm = ChatOpenAI(model="gpt-4o-mini")
-    
-    # Language-specific instructions
-    language_instructions = {
-        "English": "Respond in English.",
-        "Hindi": "Respond in Hindi (हिंदी में उत्तर दें).",
-        "Bengali": "Respond in Bengali (বাংলায় উত্তর দিন)."
-    }
-    
-    # Retrieve relevant documents
-    retrieved_docs = retriever.invoke(question)
-    
-    # Create context from retrieved documents
-    context = "\n\n".join([doc.page_content for doc in retrieved_docs])
-    
-    # Create the main response prompt
-    system_template = f"""You are an expert legal assistant specializing in Indian law. 
+def build_rag_prompt(question, context, chat_history="", language="English"):
+    """Build the main answer prompt from the numbered context and chat history"""
+    return f"""You are an expert legal assistant specializing in Indian law. 
 You MUST ONLY answer questions related to Indian law, legal matters, including but not limited to:
 - The Indian Constitution and its provisions
 - Indian Penal Code (IPC) sections and offenses
@@ -142,7 +227,7 @@ You MUST ONLY answer questions related to Indian law, legal matters, including b
 
 For any questions not related to Indian legal matters, politely inform the user that you can only assist with Indian legal topics.
 
-{language_instructions.get(language, "Respond in English.")}
+{LANGUAGE_INSTRUCTIONS.get(language, "Respond in English.")}
 
 Use the following pieces of context to answer the user's question about Indian legal matters.
 Prioritize information from the provided context when available.
@@ -156,6 +241,8 @@ When referencing legal provisions, always specify:
 
 When using your general knowledge, clearly indicate this in your response.
 
+{CITATION_INSTRUCTIONS}
+
 Previous conversation:
 {chat_history}
 
@@ -163,49 +250,289 @@ Context:
 {context}
 
 Question: {question}"""
+
+def render_chat_history(chat_history, history_manager=None):
+    """Return chat history as prompt text.
+
+    chat_history is either preformatted text or a list of {"role", "content"}
+    messages, which are rendered within a token budget by history_manager.
+    """
+    if isinstance(chat_history, str):
+        return chat_history
+    if not chat_history:
+        return ""
+    if history_manager is None:
+        from chat_history import ChatHistoryManager
+        history_manager = ChatHistoryManager()
+    return history_manager.render(chat_history)
+
+def prepare_rag_prompt(retriever, question, chat_history="", language="English", history_manager=None, llm=None):
+    """Retrieve documents for a question and return (prompt, retrieved_docs)"""
+    with tracing.span("chat_history"):
+        chat_history = render_chat_history(chat_history, history_manager)
+    
+    # Questions in Hindi or Bengali script are searched with an English query (see multilingual.py)
+    from multilingual import retrieval_query
+    search_query = retrieval_query(question, language, llm)
+    
+    # Retrieve relevant documents
+    with tracing.span("retrieval") as span:
+        retrieved_docs = retriever.invoke(search_query)
+        span["documents"] = len(retrieved_docs)
     
-    # Generate main response
-    response = llm.invoke(system_template)
-    answer = response.content
+    # Create context from retrieved documents
+    with tracing.span("prompt_assembly"):
+        context = format_context(retrieved_docs)
+        prompt = build_rag_prompt(question, context, chat_history, language)
     
-    # Process references
+    return prompt, retrieved_docs
+
+def build_references(retrieved_docs, answer, citations):
+    """Build the reference list shown under an answer from what the model cited"""
     references = []
-    if retrieved_docs:
-        # Use actual retrieved documents as references
-        for doc in retrieved_docs[:4]:  # Top 4 references
-            doc_name = extract_document_name(doc.metadata.get('source', ''))
-            content_preview = doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content
-            references.append({
-                "document": doc_name,
-                "content": content_preview,
-                "type": "retrieved"
-            })
-    else:
-        # Generate synthetic reference if no chunks found but question is legal
-        synthetic_ref = generate_synthetic_reference(question, answer, language)
+    for number in cited_chunks(answer, citations, len(retrieved_docs)):
+        doc = retrieved_docs[number - 1]
+        content_preview = doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content
         references.append({
-            "document": "Generated Reference",
-            "content": synthetic_ref,
-            "type": "synthetic"
+            "document": document_label(doc),
+            "content": content_preview,
+            "type": "retrieved",
+            "chunk": number
         })
+    # Provisions the model cited from general knowledge rather than the context
+    for provision in citations["provisions"]:
+        references.append({
+            "document": provision,
+            "content": "Cited from general knowledge; not found in the indexed documents.",
+            "type": "general_knowledge"
+        })
+    return references
+
+def _lookup_cached_answer(answer_cache, question, chat_history, language, attributes):
+    """Return a cached response for a standalone question, or None, noting the outcome in the trace"""
+    cached = None
+    with tracing.span("cache_lookup"):
+        if answer_cache is not None and not chat_history:
+            cached = answer_cache.lookup(question, language)
+    attributes["cached"] = cached is not None
+    if cached is None:
+        return None
+    return {"answer": cached["answer"], "references": cached["references"], "cached": True}
+
+def _cached_events(cached):
+    """Yield a cached response as one token event and the done event"""
+    yield {"type": "token", "content": cached["answer"]}
+    yield dict(cached, type="done")
+
+def _uses_canonical_answer(chat_history, language):
+    """Return True if a standalone question is answered by translating the canonical-language answer"""
+    if chat_history:
+        return False
+    from multilingual import uses_canonical_answers
+    return uses_canonical_answers(language)
+
+def _prepare_answer(retriever, question, chat_history, language, history_manager, llm):
+    """Retrieve and build the prompt; return (prompt, retrieved_docs, prompt_tokens)"""
+    prompt, retrieved_docs = prepare_rag_prompt(retriever, question, chat_history, language, history_manager, llm)
+    prompt_tokens = count_tokens(prompt)
+    logger.info("Prompt tokens: %d", prompt_tokens)
+    return prompt, retrieved_docs, prompt_tokens
+
+def _finish_answer(answer_cache, question, chat_history, language, retrieved_docs, answer, citations, prompt_tokens):
+    """Build the references, cache a standalone answer and return the response"""
+    with tracing.span("references"):
+        references = build_references(retrieved_docs, answer, citations)
+    
+    if answer_cache is not None and not chat_history:
+        with tracing.span("cache_store"):
+            answer_cache.store(question, language, answer, references)
     
     return {
         "answer": answer,
-        "references": references
+        "references": references,
+        "cached": False,
+        "prompt_tokens": prompt_tokens
     }
 
+class AnswerStream:
+    """Collects a streamed LLM answer, holding back its trailing citations block.
+
+    span is the tracing span of the LLM call; it gets the time to the first visible
+    token and, when tracing, the completion token count.
+    """
+
+    def __init__(self, span):
+        self.span = span
+        self.tokens = []
+        self.output = []
+        self.parser = CitationStreamParser()
+        self.start = time.perf_counter()
+
+    def feed(self, content):
+        """Return the part of a chunk that is shown, possibly empty"""
+        if not content:
+            return ""
+        self.output.append(content)
+        visible = self.parser.feed(content)
+        if visible:
+            if not self.tokens:
+                self.span["first_token_ms"] = round((time.perf_counter() - self.start) * 1000, 3)
+            self.tokens.append(visible)
+        return visible
+
+    def finish(self):
+        """Return (text still to show, answer, citations) once the stream has ended"""
+        if tracing.enabled():
+            self.span["completion_tokens"] = count_tokens("".join(self.output))
+        rest, citations = self.parser.finish()
+        if rest:
+            self.tokens.append(rest)
+        return rest, "".join(self.tokens).strip(), citations
+
+
+def create_enhanced_rag_response(retriever, question, chat_history="", language="English", answer_cache=None, llm=None,
+                                 history_manager=None):
+    """Create enhanced RAG response with references.
+
+    If an answer_cache is given, standalone questions (no chat history) are
+    answered from it when a near-duplicate was answered before. With
+    CROSS_LANGUAGE=1 they are answered in English and translated (see multilingual.py).
+    """
+    if _uses_canonical_answer(chat_history, language):
+        from multilingual import create_translated_response
+        return create_translated_response(retriever, question, language, answer_cache, llm)
+    with tracing.trace("answer", language=language) as attributes:
+        cached = _lookup_cached_answer(answer_cache, question, chat_history, language, attributes)
+        if cached is not None:
+            return cached
+        
+        llm = llm or get_llm()
+        prompt, retrieved_docs, prompt_tokens = _prepare_answer(
+            retriever, question, chat_history, language, history_manager, llm
+        )
+        
+        # Generate main response
+        with tracing.span("llm", prompt_tokens=prompt_tokens) as span:
+            response = llm.invoke(prompt)
+            if tracing.enabled():
+                span["completion_tokens"] = count_tokens(response.content)
+        answer, citations = split_citations(response.content)
+        
+        return _finish_answer(answer_cache, question, chat_history, language, retrieved_docs, answer, citations,
+                              prompt_tokens)
+
+def stream_enhanced_rag_response(retriever, question, chat_history="", language="English", answer_cache=None, llm=None,
+                                 history_manager=None):
+    """Stream an enhanced RAG response token by token.
+
+    Yields {"type": "token", "content": str} events as the LLM produces them,
+    followed by a single {"type": "done", "answer": str, "references": list,
+    "cached": bool, "prompt_tokens": int} event once the answer is complete.
+    A cached answer is yielded as one token event.
+    """
+    if _uses_canonical_answer(chat_history, language):
+        from multilingual import stream_translated_response
+        yield from stream_translated_response(retriever, question, language, answer_cache, llm)
+        return
+    with tracing.trace("answer", language=language, streaming=True) as attributes:
+        cached = _lookup_cached_answer(answer_cache, question, chat_history, language, attributes)
+        if cached is not None:
+            yield from _cached_events(cached)
+            return
+        
+        llm = llm or get_llm()
+        prompt, retrieved_docs, prompt_tokens = _prepare_answer(
+            retriever, question, chat_history, language, history_manager, llm
+        )
+        
+        with tracing.span("llm", prompt_tokens=prompt_tokens) as span:
+            stream = AnswerStream(span)
+            for chunk in llm.stream(prompt):
+                visible = stream.feed(chunk.content)
+                if visible:
+                    yield {"type": "token", "content": visible}
+            rest, answer, citations = stream.finish()
+        if rest:
+            yield {"type": "token", "content": rest}
+        
+        yield dict(_finish_answer(answer_cache, question, chat_history, language, retrieved_docs, answer, citations,
+                                  prompt_tokens), type="done")
+
+async def acreate_enhanced_rag_response(retriever, question, chat_history="", language="English", answer_cache=None, llm=None,
+                                        history_manager=None):
+    """Async create_enhanced_rag_response: blocking retrieval and cache work run in worker threads"""
+    if _uses_canonical_answer(chat_history, language):
+        from multilingual import acreate_translated_response
+        return await acreate_translated_response(retriever, question, language, answer_cache, llm)
+    with tracing.trace("answer", language=language) as attributes:
+        cached = await asyncio.to_thread(_lookup_cached_answer, answer_cache, question, chat_history, language,
+                                         attributes)
+        if cached is not None:
+            return cached
+        
+        llm = llm or get_llm()
+        prompt, retrieved_docs, prompt_tokens = await asyncio.to_thread(
+            _prepare_answer, retriever, question, chat_history, language, history_manager, llm
+        )
+        
+        with tracing.span("llm", prompt_tokens=prompt_tokens) as span:
+            response = await llm.ainvoke(prompt)
+            if tracing.enabled():
+                span["completion_tokens"] = count_tokens(response.content)
+        answer, citations = split_citations(response.content)
+        
+        return await asyncio.to_thread(
+            _finish_answer, answer_cache, question, chat_history, language, retrieved_docs, answer, citations,
+            prompt_tokens
+        )
+
+async def astream_enhanced_rag_response(retriever, question, chat_history="", language="English", answer_cache=None, llm=None,
+                                        history_manager=None):
+    """Async stream_enhanced_rag_response, yielding the same events"""
+    if _uses_canonical_answer(chat_history, language):
+        from multilingual import astream_translated_response
+        async for event in astream_translated_response(retriever, question, language, answer_cache, llm):
+            yield event
+        return
+    with tracing.trace("answer", language=language, streaming=True) as attributes:
+        cached = await asyncio.to_thread(_lookup_cached_answer, answer_cache, question, chat_history, language,
+                                         attributes)
+        if cached is not None:
+            for event in _cached_events(cached):
+                yield event
+            return
+        
+        llm = llm or get_llm()
+        prompt, retrieved_docs, prompt_tokens = await asyncio.to_thread(
+            _prepare_answer, retriever, question, chat_history, language, history_manager, llm
+        )
+        
+        with tracing.span("llm", prompt_tokens=prompt_tokens) as span:
+            stream = AnswerStream(span)
+            async for chunk in llm.astream(prompt):
+                visible = stream.feed(chunk.content)
+                if visible:
+                    yield {"type": "token", "content": visible}
+            rest, answer, citations = stream.finish()
+        if rest:
+            yield {"type": "token", "content": rest}
+        
+        result = await asyncio.to_thread(
+            _finish_answer, answer_cache, question, chat_history, language, retrieved_docs, answer, citations,
+            prompt_tokens
+        )
+        yield dict(result, type="done")
+
 def create_rag_chain(retriever, language="English"):
     """Create a RAG chain with the retriever and LLM (legacy function for compatibility)"""
     # This is kept for backward compatibility
     # The new enhanced function should be used instead
-    llm = ChatOpenAI(model="gpt-4o-mini")
+    from langchain.chains import create_retrieval_chain
+    from langchain.chains.combine_documents import create_stuff_documents_chain
+    from langchain.prompts import ChatPromptTemplate
+    from langchain_openai import ChatOpenAI
     
-    # Language-specific instructions
-    language_instructions = {
-        "English": "Respond in English.",
-        "Hindi": "Respond in Hindi (हिंदी में उत्तर दें).",
-        "Bengali": "Respond in Bengali (বাংলায় উত্তর দিন)."
-    }
+    llm = ChatOpenAI(model="gpt-4o-mini")
     
     # Create the prompt with conversation history context and language support
     system_template = f"""You are an expert legal assistant specializing in Indian law. 
@@ -220,7 +547,7 @@ You MUST ONLY answer questions related to Indian law, legal matters, including b
 
 For any questions not related to Indian legal matters, politely inform the user that you can only assist with Indian legal topics.
 
-{language_instructions.get(language, "Respond in English.")}
+{LANGUAGE_INSTRUCTIONS.get(language, "Respond in English.")}
 
 Use the following pieces of context to answer the user's question about Indian legal matters.
 Prioritize information from the provided context when available.
@@ -0,0 +1,119 @@
+"""Background warm-up of the serving resources, so a cold process renders at once.
+
+Loading the embedding model (torch and transformers), opening the index and
+answering its first query take seconds. The Streamlit app used to do this
+before drawing anything, and the first question paid for whatever was still
+cold. ``Warmup`` runs the loading in a daemon thread instead: the page renders
+straight away, the sidebar shows the warm-up stage, and a question asked
+before it finishes waits for it. The time taken is observed as the
+``legal_assistant_warmup_seconds`` histogram.
+"""
+import logging
+import threading
+import time
+
+import tracing
+
+logger = logging.getLogger(__name__)
+
+
+def load_serving_resources(report=lambda stage: None):
+    """Load the live index, answer cache and LLM client; report(stage) names each step"""
+    # Imported here: retrievers pulls in langchain_core, answer_cache numpy
+    from answer_cache import SemanticAnswerCache
+    from index_versions import LiveIndex
+    from retrievers import load_index
+    from utils import get_llm
+
+    # The embedding model and the index's first query (see LiveIndex's probe)
+    report("index")
+    live_index = LiveIndex(load_index).start()
+
+    report("answer_cache")
+    answer_cache, answer_cache_error = None, None
+    try:
+        answer_cache = SemanticAnswerCache(live_index.resources["vector_store"].embeddings)
+    except Exception as e:
+        answer_cache_error = e
+        logger.warning("Answer cache disabled: %s", e)
+
+    report("llm")
+    try:
+        get_llm()
+    except Exception as e:
+        # Not fatal: the error is raised again, and shown, with the first question
+        logger.warning("LLM client not created: %s", e)
+
+    return {"index": live_index, "answer_cache": answer_cache, "answer_cache_error": answer_cache_error}
+
+
+class Warmup:
+    """Runs load(report) once in a daemon thread and reports its progress.
+
+    state is "loading", "ready" or "failed"; wait() returns what load returned
+    or raises its error.
+    """
+
+    def __init__(self, load=load_serving_resources):
+        self.load = load
+        self.state = "loading"
+        self.stage = None
+        self.error = None
+        self.resources = None
+        self.stages = {}
+        self._started_at = None
+        self._finished_at = None
+        self._done = threading.Event()
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        threading.Thread(target=self._run, name="warmup", daemon=True).start()
+        return self
+
+    def _report(self, stage):
+        now = time.perf_counter()
+        self.stage = stage
+        self.stages[stage] = round(now - self._started_at, 3)
+        logger.info("Warm-up: %s (%.1fs)", stage, now - self._started_at)
+
+    def _run(self):
+        try:
+            self.resources = self.load(self._report)
+            self.state = "ready"
+        except BaseException as e:
+            self.error = e
+            self.state = "failed"
+            logger.exception("Warm-up failed")
+        finally:
+            self._finished_at = time.perf_counter()
+            tracing.metrics.observe(f"{tracing.METRIC_PREFIX}_warmup_seconds", {"state": self.state},
+                                    self._finished_at - self._started_at)
+            self._done.set()
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def elapsed(self):
+        """Return the seconds the warm-up took, or has taken so far"""
+        if self._started_at is None:
+            return 0.0
+        return (self._finished_at or time.perf_counter()) - self._started_at
+
+    def status(self):
+        """Return the state, current stage, elapsed seconds, stage start times and error"""
+        return {
+            "state": self.state,
+            "stage": self.stage,
+            "seconds": round(self.elapsed(), 3),
+            "stages": dict(self.stages),
+            "error": str(self.error) if self.error is not None else None,
+        }
+
+    def wait(self, timeout=None):
+        """Block until the warm-up is done and return its resources"""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Warm-up still at {self.stage!r} after {self.elapsed():.1f}s")
+        if self.error is not None:
+            raise self.error
+        return self.resources